@@ -0,0 +1,54 @@
+"""Route planning on grid maps and graphs.
+
+The planners and tools are loaded on first use, e.g. routeplanner.Dijkstra
+imports routeplanner.planner.dijkstra, so importing the package is cheap.
+"""
+import importlib
+
+# mapping exported name to the module defining it
+_EXPORTS = {
+    'Dijkstra': 'planner.dijkstra',
+    'AStar': 'planner.astar',
+    'BestFirst': 'planner.bestfirst',
+    'BreadthFirst': 'planner.breadthfirst',
+    'BiDijkstra': 'planner.bi_dijkstra',
+    'BiAStar': 'planner.bi_astar',
+    'BiBestFirst': 'planner.bi_bestfirst',
+    'JumpPointSearch': 'planner.jps',
+    'HPAStar': 'planner.hpastar',
+    'CHPlanner': 'planner.chplanner',
+    'DStarLite': 'planner.dstarlite',
+    'ARAStar': 'planner.arastar',
+    'CooperativeAStar': 'planner.cooperative',
+    'CSRGraph': 'utils.csrgraph',
+    'GridMap': 'utils.gridmap',
+    'arr2grid': 'utils.misc',
+    'img2grid': 'utils.misc',
+    'save_grid': 'utils.misc',
+    'load_grid': 'utils.misc',
+    'distance_field': 'utils.misc',
+    'field_path': 'utils.misc',
+    'RouteCache': 'utils.cache',
+    'Landmarks': 'utils.landmarks',
+    'TiledRaster': 'utils.tiles',
+    'TiledGraph': 'utils.tiles',
+    'ReservationTable': 'utils.reservation',
+    'AsyncPlanner': 'utils.service',
+    'PlanServer': 'utils.service',
+    'PlanClient': 'utils.service',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
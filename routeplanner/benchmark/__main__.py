@@ -0,0 +1,46 @@
+"""Run the benchmark, e.g.
+
+    python -m routeplanner.benchmark --sizes 64 128 --output results.json
+    python -m routeplanner.benchmark --sizes 64 128 --baseline results.json
+
+With a baseline, the regressions are printed and the exit status is 1 if any.
+"""
+import argparse
+import sys
+
+from .maps import FAMILIES
+from .runner import PLANNERS, TOLERANCES, run, save_results, load_results, compare
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m routeplanner.benchmark', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--families', nargs='+', choices=list(FAMILIES), default=None)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[64, 128, 256])
+    parser.add_argument('--planners', nargs='+', choices=list(PLANNERS), default=None)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--four', action='store_true', help='four-connected grids')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='compare with the results of a previous run')
+    for measure, tol in TOLERANCES.items():
+        parser.add_argument('--%s-tol' % measure.split('_')[0], type=float, default=tol,
+                            dest=measure, help='relative tolerance of %s' % measure)
+    args = parser.parse_args(argv)
+
+    results = run(args.families, args.sizes, args.planners, args.queries, args.seed,
+                  diagonal=not args.four, memory=not args.no_memory, verbose=True)
+    if args.output:
+        save_results(results, args.output)
+    if args.baseline:
+        tolerances = {measure: getattr(args, measure) for measure in TOLERANCES}
+        regressions = compare(results, load_results(args.baseline), tolerances)
+        for line in regressions:
+            print('REGRESSION', line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Measure the import time of the package in fresh interpreters, e.g.
+
+    python -m routeplanner.benchmark.imports
+    python -m routeplanner.benchmark.imports --budget 20 --output imports.json
+
+Every module is imported in a new process after numpy, which the planners
+need anyway, and the best of several runs is kept. The exit status is 1 if a
+module imports one of the optional dependencies in HEAVY, or takes longer than
+the budget on top of numpy.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# modules a short-lived program imports
+MODULES = ('routeplanner', 'routeplanner.planner.dijkstra', 'routeplanner.planner.astar',
+           'routeplanner.planner.bi_astar', 'routeplanner.planner.jps',
+           'routeplanner.planner.chplanner', 'routeplanner.planner.hpastar',
+           'routeplanner.planner.dstarlite', 'routeplanner.utils.misc')
+# dependencies which must only be loaded when they are used
+HEAVY = ('cv2', 'networkx', 'numba', 'multiprocessing', 'asyncio')
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import numpy
+middle = time.perf_counter()
+import %s
+end = time.perf_counter()
+print(json.dumps({'seconds': end - start, 'overhead': end - middle,
+                  'heavy': [m for m in %r if m in sys.modules]}))
+"""
+
+
+def _probe(module):
+    """ import module in a new interpreter, return its times and the heavy modules loaded"""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    out = subprocess.run([sys.executable, '-c', _PROBE % (module, HEAVY)], env=env,
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def measure(modules=MODULES, repeat=5):
+    """Import every module in fresh interpreters.
+    Params:
+    modules: names of the modules (default: MODULES)
+    repeat: number of runs of every module, the fastest is kept (default: 5)
+    Returns:
+    a list of {'module', 'seconds', 'overhead', 'heavy'} where seconds is the time
+    of the imports of numpy and module, and overhead the time of module alone
+    """
+    res = []
+    for module in modules:
+        runs = [_probe(module) for _ in range(repeat)]
+        res.append({'module': module,
+                    'seconds': min(run['seconds'] for run in runs),
+                    'overhead': min(run['overhead'] for run in runs),
+                    'heavy': sorted(set().union(*(run['heavy'] for run in runs)))})
+    return res
+
+
+def check(results, budget):
+    """Find the regressions of measure results.
+    Params:
+    results: the output of measure
+    budget: seconds allowed on top of the import of numpy
+    Returns:
+    a list of messages, empty when there is no regression
+    """
+    problems = []
+    for item in results:
+        if item['heavy']:
+            problems.append('%s imports %s' % (item['module'], ', '.join(item['heavy'])))
+        if item['overhead'] > budget:
+            problems.append('%s takes %.1f ms over numpy, the budget is %.1f ms'
+                            % (item['module'], 1000*item['overhead'], 1000*budget))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m routeplanner.benchmark.imports',
+                                     description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=list(MODULES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=15,
+                        help='milliseconds allowed on top of numpy (default: 15)')
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = measure(args.modules, args.repeat)
+    for item in results:
+        print('%-36s %7.1f ms  +%6.1f ms over numpy  %s' % (
+            item['module'], 1000*item['seconds'], 1000*item['overhead'], ' '.join(item['heavy'])))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    problems = check(results, args.budget/1000)
+    for problem in problems:
+        print('REGRESSION', problem)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
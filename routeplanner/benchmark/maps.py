@@ -0,0 +1,122 @@
+import numpy as np
+
+# side lengths of the benchmark maps
+SIZES = (64, 128, 256, 512, 1024, 2048, 4096)
+# fractions of blocked cells of the random obstacle maps
+DENSITIES = (0.1, 0.2, 0.3)
+
+
+def random_obstacles(size, density=0.2, seed=0):
+    """Map with cells blocked independently at random.
+    Params:
+    size: side length of the square map
+    density: fraction of blocked cells (default: 0.2)
+    seed: seed of the generator (default: 0)
+    Returns:
+    (array, weight): the binarized map (1 is walkable, 0 is block) and the cell
+        weights, 1 for every cell.
+    """
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) >= density).astype(np.uint8)
+    return array, 1
+
+
+def maze(size, seed=0):
+    """Perfect maze with corridors one cell wide, carved by a randomized depth
+    first search on the cells of odd coordinates.
+    Params:
+    size: side length of the square map
+    seed: seed of the generator (default: 0)
+    Returns:
+    (array, weight) as in random_obstacles
+    """
+    rng = np.random.default_rng(seed)
+    k = (size-1) // 2
+    array = np.zeros((size, size), dtype=np.uint8)
+    visited = np.zeros((k, k), dtype=bool)
+    steps = ((-1, 0), (1, 0), (0, -1), (0, 1))
+    stack = [(0, 0)]
+    visited[0, 0] = True
+    array[1, 1] = 1
+    while stack:
+        r, c = stack[-1]
+        options = [(r+dr, c+dc) for dr, dc in steps
+                   if 0 <= r+dr < k and 0 <= c+dc < k and not visited[r+dr, c+dc]]
+        if not options:
+            stack.pop()
+            continue
+        i, j = options[rng.integers(len(options))]
+        visited[i, j] = True
+        # open the cell and the wall between both cells
+        array[2*i+1, 2*j+1] = 1
+        array[r+i+1, c+j+1] = 1
+        stack.append((i, j))
+    return array, 1
+
+
+def rooms(size, room=16, door=3, seed=0):
+    """Map of square rooms separated by walls one cell thick, with one door per
+    wall between two rooms.
+    Params:
+    size: side length of the square map
+    room: side length of the rooms, walls included (default: 16)
+    door: width of the doors (default: 3)
+    seed: seed of the generator (default: 0)
+    Returns:
+    (array, weight) as in random_obstacles
+    """
+    rng = np.random.default_rng(seed)
+    array = np.ones((size, size), dtype=np.uint8)
+    array[room::room, :] = 0
+    array[:, room::room] = 0
+    door = min(door, room-1)
+    walls = range(room, size, room)
+    for w in walls:
+        for start in range(0, size, room):
+            end = min(start+room, size)
+            # doors are cut between two wall crossings
+            lo, hi = start+1 if start else 0, end - door
+            if hi <= lo:
+                continue
+            d = int(rng.integers(lo, hi+1))
+            array[w, d:d+door] = 1
+            d = int(rng.integers(lo, hi+1))
+            array[d:d+door, w] = 1
+    return array, 1
+
+
+def traffic(size, seed=0, scale=32, roads=64):
+    """Open map whose cell weights vary smoothly between 1 and 10, crossed by
+    arterial roads of weight 1.
+    Params:
+    size: side length of the square map
+    seed: seed of the generator (default: 0)
+    scale: side length of the patches of the weight field (default: 32)
+    roads: spacing of the arterial roads (default: 64)
+    Returns:
+    (array, weight): the map with every cell walkable and the cell weights
+    """
+    rng = np.random.default_rng(seed)
+    coarse = rng.random((-(-size // scale) + 1,)*2)
+    field = np.kron(coarse, np.ones((scale, scale)))
+    # box blur with cumulative sums smooths the patch borders
+    c = np.cumsum(np.cumsum(np.pad(field, ((1, 0), (1, 0))), axis=0), axis=1)
+    s = scale
+    field = (c[s:, s:] - c[:-s, s:] - c[s:, :-s] + c[:-s, :-s]) / (s*s)
+    field = field[:size, :size]
+    field = (field - field.min()) / max(field.max() - field.min(), 1e-12)
+    weight = np.round(1 + 9*field, 2)
+    weight[roads//2::roads, :] = 1
+    weight[:, roads//2::roads] = 1
+    return np.ones((size, size), dtype=np.uint8), weight
+
+
+# map families of the benchmark: name -> function(size, seed) -> (array, weight)
+FAMILIES = {
+    'random10': lambda size, seed=0: random_obstacles(size, 0.1, seed),
+    'random20': lambda size, seed=0: random_obstacles(size, 0.2, seed),
+    'random30': lambda size, seed=0: random_obstacles(size, 0.3, seed),
+    'maze': maze,
+    'rooms': rooms,
+    'traffic': traffic,
+}
@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def random_queries(array, n=20, seed=0, min_distance=0):
+    """Draw source-target pairs among the walkable cells of a map.
+    Params:
+    array: the binarized map (1 is walkable, 0 is block)
+    n: number of pairs (default: 20)
+    seed: seed of the generator (default: 0)
+    min_distance: minimum manhattan distance between source and target
+        (default: 0). Pairs closer than that are drawn again, a bounded number
+        of times.
+    Returns:
+    a list of (source, target) tuples of coordinates. Pairs may be unaccessible
+        from each other on maps with obstacles.
+    """
+    rng = np.random.default_rng(seed)
+    cells = np.argwhere(np.asarray(array) != 0)
+    if len(cells) == 0:
+        return []
+    pairs = []
+    for _ in range(100*n):
+        if len(pairs) == n:
+            break
+        s, t = cells[rng.integers(len(cells), size=2)]
+        if abs(s - t).sum() < min_distance:
+            continue
+        pairs.append((tuple(int(x) for x in s), tuple(int(x) for x in t)))
+    return pairs
+
+
+def query_sets(array, n=20, seed=0):
+    """ the standard query sets of a map: uniform pairs and long pairs at least
+    half the side of the map apart"""
+    size = max(np.shape(array))
+    return {'uniform': random_queries(array, n, seed),
+            'long': random_queries(array, n, seed+1, min_distance=size//2)}
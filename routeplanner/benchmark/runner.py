@@ -0,0 +1,203 @@
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from ..utils.misc import arr2grid
+from ..utils.csrgraph import CSRGraph
+from ..planner.dijkstra import Dijkstra
+from ..planner.astar import AStar
+from ..planner.bestfirst import BestFirst
+from ..planner.breadthfirst import BreadthFirst
+from ..planner.bi_dijkstra import BiDijkstra
+from ..planner.bi_astar import BiAStar
+from ..planner.bi_bestfirst import BiBestFirst
+from .maps import FAMILIES
+from .queries import query_sets
+
+# planners of the benchmark: name -> function returning a new planner
+PLANNERS = {
+    'Dijkstra': lambda: Dijkstra(),
+    'AStar': lambda: AStar(heuristic='octile'),
+    'BestFirst': lambda: BestFirst(heuristic='octile'),
+    'BreadthFirst': lambda: BreadthFirst(),
+    'BiDijkstra': lambda: BiDijkstra(heuristic='null'),
+    'BiAStar': lambda: BiAStar(heuristic='octile'),
+    'BiBestFirst': lambda: BiBestFirst(heuristic='octile'),
+}
+
+# measures compared with the baseline and the default relative tolerances
+TOLERANCES = {'time_mean': 0.25, 'expansions_mean': 0.05, 'peak_kib': 0.25}
+# absolute tolerance of the optimality gap
+GAP_TOLERANCE = 1e-6
+
+
+class _Counter(object):
+    """ counts the calls of the neighbors method of a graph, one per expansion"""
+
+    def __init__(self, neighbors):
+        self.neighbors = neighbors
+        self.count = 0
+
+    def __call__(self, node):
+        self.count += 1
+        return self.neighbors(node)
+
+
+def _measure(planner, graph, source, target, memory):
+    """Plan one query.
+    Returns:
+    (route, seconds, expansions, peak bytes or None)
+    """
+    counter = _Counter(graph.neighbors)
+    # an instance attribute shadows the method for this query only
+    graph.neighbors = counter
+    try:
+        start = time.perf_counter()
+        route = planner.plan(source, target, graph)
+        seconds = time.perf_counter() - start
+    finally:
+        del graph.neighbors
+    peak = None
+    if memory:
+        # traced separately, tracemalloc slows the search down
+        tracemalloc.start()
+        try:
+            planner.plan(source, target, graph)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return route, seconds, counter.count, peak
+
+
+def path_cost(graph, path):
+    """ sum of the edge weights along a path of coordinates of a CSRGraph"""
+    ids = [graph.to_id(node) for node in path]
+    return sum(dict(graph.neighbors(u))[v] for u, v in zip(ids[:-1], ids[1:]))
+
+
+def _summary(times, expansions, peaks, gaps, failures):
+    return {'queries': len(times),
+            'time_total': float(np.sum(times)),
+            'time_mean': float(np.mean(times)) if times else 0.0,
+            'time_max': float(np.max(times)) if times else 0.0,
+            'expansions_mean': float(np.mean(expansions)) if expansions else 0.0,
+            'peak_kib': float(np.max(peaks))/1024 if peaks else None,
+            'gap_mean': float(np.mean(gaps)) if gaps else 0.0,
+            'gap_max': float(np.max(gaps)) if gaps else 0.0,
+            'failures': failures}
+
+
+def run(families=None, sizes=(64, 128, 256), planners=None, queries=20, seed=0,
+        diagonal=True, memory=True, verbose=False):
+    """Run the benchmark.
+    Every map is generated from the seed, converted once with arr2grid and all
+    the planners answer the same query sets on it. Dijkstra's algorithm gives the
+    reference costs of the optimality gap.
+    Params:
+    families: list of names of FAMILIES (default: None, all of them)
+    sizes: side lengths of the maps (default: (64, 128, 256)), see maps.SIZES
+    planners: list of names of PLANNERS (default: None, all of them)
+    queries: number of pairs of every query set (default: 20)
+    seed: seed of the maps and queries (default: 0)
+    diagonal: connectivity of the grids (default: True)
+    memory: measure the peak memory of every query with tracemalloc (default: True)
+    verbose: print a line per result (default: False)
+    Returns:
+    a dictionary {'meta': {...}, 'results': [{...}, ...]} which can be written
+        as JSON by save_results. Every result holds the map family, size, query
+        set and planner with the wall time, expansions (nodes whose neighbors
+        were relaxed), peak memory in KiB and the gap (cost / optimal cost - 1)
+        of the query set.
+    """
+    families = list(FAMILIES) if families is None else list(families)
+    planners = list(PLANNERS) if planners is None else list(planners)
+    results = []
+    for family in families:
+        for size in sizes:
+            array, weight = FAMILIES[family](size, seed=seed)
+            graph = arr2grid(array, diagonal, weight, create_using=CSRGraph)
+            for name, pairs in query_sets(array, queries, seed).items():
+                reference = Dijkstra()
+                optimal = [reference.plan(s, t, graph)[1] for s, t in pairs]
+                for planner_name in planners:
+                    planner = PLANNERS[planner_name]()
+                    times, expansions, peaks, gaps = [], [], [], []
+                    failures = 0
+                    for (s, t), best in zip(pairs, optimal):
+                        (path, cost), seconds, count, peak = _measure(planner, graph, s, t, memory)
+                        times.append(seconds)
+                        expansions.append(count)
+                        if peak is not None:
+                            peaks.append(peak)
+                        if best is None:
+                            continue
+                        if cost is None:
+                            failures += 1
+                        else:
+                            # the cost of the path on the graph, some planners
+                            # report a cost of their own (e.g. BreadthFirst)
+                            cost = path_cost(graph, path)
+                            gaps.append(cost/best - 1 if best > 0 else 0.0)
+                    row = {'family': family, 'size': size, 'queryset': name,
+                           'planner': planner_name}
+                    row.update(_summary(times, expansions, peaks, gaps, failures))
+                    results.append(row)
+                    if verbose:
+                        print('%-9s %5d %-8s %-12s %9.4fs %10.1f exp  gap %.4f'
+                              % (family, size, name, planner_name, row['time_mean'],
+                                 row['expansions_mean'], row['gap_max']))
+    meta = {'seed': seed, 'queries': queries, 'diagonal': diagonal,
+            'sizes': list(sizes), 'python': platform.python_version(),
+            'numpy': np.__version__, 'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    return {'meta': meta, 'results': results}
+
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=1)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _key(row):
+    return (row['family'], row['size'], row['queryset'], row['planner'])
+
+
+def compare(results, baseline, tolerances=None, gap_tolerance=GAP_TOLERANCE):
+    """Compare results with a baseline run.
+    Params:
+    results, baseline: dictionaries returned by run or load_results
+    tolerances: a dictionary {measure: relative tolerance} (default: TOLERANCES).
+        A measure regresses when it exceeds the baseline by more than the tolerance.
+    gap_tolerance: absolute tolerance of the maximum optimality gap
+    Returns:
+    a list of messages, one per regression. Results missing in the baseline are
+        not compared.
+    """
+    tolerances = TOLERANCES if tolerances is None else tolerances
+    base = {_key(row): row for row in baseline['results']}
+    regressions = []
+    for row in results['results']:
+        old = base.get(_key(row))
+        if old is None:
+            continue
+        name = '%s/%d/%s/%s' % _key(row)
+        for measure, tol in tolerances.items():
+            new_val, old_val = row.get(measure), old.get(measure)
+            if new_val is None or old_val is None:
+                continue
+            if new_val > old_val*(1+tol):
+                regressions.append('%s: %s %.6g > %.6g (+%d%% allowed)'
+                                   % (name, measure, new_val, old_val, round(100*tol)))
+        if row['gap_max'] > old['gap_max'] + gap_tolerance:
+            regressions.append('%s: gap_max %.6g > %.6g' % (name, row['gap_max'], old['gap_max']))
+        if row['failures'] > old['failures']:
+            regressions.append('%s: failures %d > %d' % (name, row['failures'], old['failures']))
+    return regressions
@@ -1,12 +1,12 @@
 import numpy as np
-from utils.misc import arr2grid
-from planner.astar import AStar
-from planner.dijkstra import Dijkstra
-from planner.bestfirst import BestFirst
-from planner.breadthfirst import BreadthFirst
-from planner.bi_astar import BiAStar
-from planner.bi_dijkstra import BiDijkstra
-from planner.bi_bestfirst import BiBestFirst
+from routeplanner.utils.misc import arr2grid
+from routeplanner.planner.astar import AStar
+from routeplanner.planner.dijkstra import Dijkstra
+from routeplanner.planner.bestfirst import BestFirst
+from routeplanner.planner.breadthfirst import BreadthFirst
+from routeplanner.planner.bi_astar import BiAStar
+from routeplanner.planner.bi_dijkstra import BiDijkstra
+from routeplanner.planner.bi_bestfirst import BiBestFirst
 
 # e.g [[1, 0, 1],
 #      [1, 0, 1],
@@ -0,0 +1,209 @@
+import math
+import time
+
+from .astar import AStar
+
+
+class ARAStar(AStar):
+    # the heuristic values of the nodes of the last search
+    _TRANSIENT = AStar._TRANSIENT + ('_hval',)
+
+    def __init__(self, heuristic='octile', alpha=0.5, step=0.1):
+        """
+        Anytime repairing A* (ARA*). It first runs a greedy weighted A* to find a
+        path quickly, then repeats the search with alpha increased by step until
+        alpha is 1, reusing the g values and the open list of the previous search,
+        so only the nodes whose g values improved are expanded again. The search
+        stops at a deadline or a budget of expansions with the best path so far.
+        Params:
+        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null','landmarks'} (default: 'octile')
+            methods to compute heuristic. It must not overestimate for the bounds
+            to hold.
+        alpha: a number in range of (0, 1] (default: 0.5)
+            alpha of the first search. With f = alpha*g + (2-alpha)*h, a path found
+            with alpha costs at most (2-alpha)/alpha times the shortest one, e.g.
+            3 for 0.5 and 1 for A*.
+        step: increase of alpha between searches (default: 0.1)
+
+        Attributes:
+        bound: the suboptimality bound of the last path returned by plan, i.e. its
+            weight is at most bound times the weight of the shortest path.
+        incons: set of the closed nodes whose g values improved during the current
+            search, expanded again by the next one.
+        """
+        if not 0 < alpha <= 1:
+            raise ValueError('alpha of ARA* must be in (0, 1]')
+        super().__init__(heuristic=heuristic, alpha=alpha)
+        self.step = step
+        self.bound = None
+
+    def _key(self, v, g_val=None):
+        """ f value of node v (with g value g_val, default: its own), the
+        heuristic of a node is computed once per plan"""
+        if g_val is None:
+            g_val = self.nodes.g(v)
+        h_val = self._hval.get(v)
+        if h_val is None:
+            h_val = self._hval[v] = self.h(self.graph.to_node(v), self.target)
+        return self._alpha*g_val + (2-self._alpha)*h_val
+
+    def _relax(self, u, v, weight):
+        """Perform edge relaxation. Closed nodes are kept in incons instead of
+        being opened again in the same search.
+        Params: see RoutePlanner._relax
+        """
+        nodes = self.nodes
+        g_val = nodes.g(u) + weight
+        if g_val < nodes.g(v):
+            f_val = self._key(v, g_val)
+            nodes.set(v, g_val, f_val, u)
+            if v in self._targets and g_val < nodes.g(self._goal):
+                self._goal = v
+            if v in self.close:
+                self.incons.add(v)
+            else:
+                self.open.add(v, f_val)
+
+    def _improvePath(self, stop):
+        """Expand nodes until no open node can improve the path to the goal.
+        Params:
+        stop: a function returning True when the search must be interrupted
+        Returns:
+        False if the search was interrupted, else True
+        """
+        while self.open.cnt > 0:
+            priority, _ = self.open.peek()
+            if priority >= self._alpha*self.nodes.g(self._goal):
+                return True
+            if stop():
+                return False
+            node = self.open.pop()
+            self.close.add(node)
+            self._expand(node)
+        return True
+
+    def _lowerBound(self):
+        """ the lowest g+h of the open and inconsistent nodes, a lower bound of the
+        weight of the shortest path"""
+        lower = self.MAX
+        nodes = self.nodes
+        for v in nodes.reached():
+            g_val = nodes.g(v)
+            if g_val < self.MAX and (v not in self.close or v in self.incons):
+                lower = min(lower, g_val + self._hval[v])
+        return lower
+
+    def _bound(self, limit):
+        """Suboptimality bound of the current path.
+        Params:
+        limit: the bound guaranteed by the weight of the last complete search,
+            it holds for the better paths found since
+        """
+        weight = self.nodes.g(self._goal)
+        lower = self._lowerBound()
+        # lower and weight are equal up to the rounding of the sums of weights
+        if lower*(1+1e-9) >= weight:
+            return 1.0
+        if lower > 0:
+            limit = min(limit, weight/lower)
+        return float(max(limit, 1.0))
+
+    def anytime(self, source, target, graph=None, deadline=None, budget=None):
+        """Find paths from source to target, each better than the previous one.
+        Params:
+        source, target, graph: see Dijkstra.plan
+        deadline: seconds (default: None)
+            time limit of the whole search from the call, None for no limit.
+        budget: integer (default: None)
+            maximum number of nodes expanded over all the searches, None for no limit.
+        Yields:
+        (path, weight, bound) after every search which improves the path or its
+        bound, the last one with bound 1 unless the search was interrupted.
+        For an unaccessible target ([], None, 1.0) is yielded.
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        self.source = source
+        if self.source not in self.graph:
+            raise ValueError('Invalid source. Source not in the graph')
+        self._setTarget(target)
+
+        clock = time.perf_counter
+        end = None if deadline is None else clock() + deadline
+        expanded = [0]
+        def stop():
+            expanded[0] += 1
+            if budget is not None and expanded[0] > budget:
+                return True
+            # reading the clock at every expansion is as slow as the expansion
+            return end is not None and expanded[0] % 64 == 0 and clock() >= end
+
+        self._alpha = self.alpha
+        self._init()
+        self._callHeuristic(step=1.0, diag=1.4)
+        self._hval = {}
+        self._key(self._source)
+        # the target with the best g value so far
+        self._goal = next(iter(self._targets))
+        self.close = set()
+        self.incons = set()
+
+        if self._source in self._targets:
+            self._goal = self._source
+
+        alpha, bound, last = self.alpha, math.inf, None
+        while True:
+            done = self._improvePath(stop)
+            weight = self.nodes.g(self._goal)
+            if weight == self.MAX:
+                if done:
+                    yield ([], None, 1.0)
+                return
+            # an interrupted search only guarantees the bound of the previous one
+            bound = self._bound(min(bound, (2-alpha)/alpha) if done else bound)
+            if (weight, bound) != last:
+                last = (weight, bound)
+                path, weight = self._findPath(self._goal, self.nodes)
+                yield (path, weight, bound)
+            if not done or bound <= 1.0:
+                return
+
+            # next search: reopen the inconsistent nodes and sort the open list again
+            # rounded, so that repeated steps end at 1 exactly
+            alpha = self._alpha = min(1.0, round(alpha + self.step, 12))
+            opened = [v for v in self.nodes.reached()
+                      if self.nodes.g(v) < self.MAX and (v not in self.close or v in self.incons)]
+            self.open = self._queue()
+            for v in opened:
+                self.open.add(v, self._key(v))
+            self.close = set()
+            self.incons = set()
+
+    def plan(self, source, target, graph=None, deadline=None, budget=None):
+        """Find the best path from source to target within a deadline or a budget.
+        Params: see anytime
+        Returns:
+        (path, weight): see Dijkstra.plan. bound is set to the suboptimality bound
+            of the path, math.inf when no path was found before the deadline.
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        self.source = source
+        if self.source not in self.graph:
+            raise ValueError('Invalid source. Source not in the graph')
+        self._setTarget(target)
+        target = self.target
+
+        route = self._lookup(source, target)
+        if route is not None:
+            self.bound = 1.0
+            return route
+        route, self.bound = ([], None), math.inf
+        for path, weight, bound in self.anytime(source, target, None, deadline, budget):
+            route, self.bound = (path, weight), bound
+        # only paths proved to be the shortest are cached
+        if self.bound == 1.0:
+            self._store(source, target, route)
+        return route
@@ -1,12 +1,13 @@
-from multiprocessing import Pool
+import numpy as np
 
-from planner.routeplanner import RoutePlanner as rp
+from .routeplanner import RoutePlanner as rp
+from ..utils.parallel import parallel_plan
 
 class BiDijkstra(rp):
     def __init__(self, heuristic='manhattan', alpha=2):
         """
         Params:
-        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null'} (default: 'manhattan')
+        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null','landmarks'} (default: 'manhattan')
             methods to compute heuristic.
         alpha: a number in range of [0, 2] (default: 1)
             if alpha is 0, it becomes best first search; if alpha is 1, it is A*;
@@ -17,115 +18,183 @@ class BiDijkstra(rp):
         super().__init__(heuristic=heuristic, alpha=alpha)
 
 
-    def _relax(self, u, v, table, to_target=True):
+    def _relax(self, u, v, weight, table, to_target=True):
         """Perform edge relaxation. 
         Params:
-        u: a tuple representing the coordinates of the node u
-        v: a tuple representing the coordinates of the node v
-        table: a nested default dictionary {(coordinate): {'g':, 'f':, 'parent':}}
+        u: an integer id of the node u
+        v: an integer id of the node v
+        weight: an integer/float number, weight of the edge (u, v)
+        table: a SearchTable of the g values and parents
         to_target: bool (default: True)
             if True, the corresponding lookup table should be self.nodes and it 
             relaxes nodes from source to target; otherwise, corresponding table 
             should be self.nodes_inv and it relaxes nodes from target to source.
         """
         # g_val is the tentative actual distance from node v to source node via u.
-        g_val = table[u]['g'] + self.graph[u][v]['weight']
+        g_val = table.g(u) + weight
                
         # Relax node v from node u.
-        if g_val < table[v]['g']:
+        if g_val < table.g(v):
             
             # If to_target is True, h_val is the heuristic (a guess value) of distance 
             # from v to target. Otherwise, h_val is the heuristic from v to source.
             if to_target:
-                h_val = self.h(v, self.target)
+                h_val = self.h(self.graph.to_node(v), self.target)
             else:
-                h_val = self.h(v, self.source)
+                h_val = self.h(self.graph.to_node(v), self.source)
             
             # f_val is the combined score of both distances.
             # f_val is slightly different from the textbook version by a alpha factor.
             f_val = self.alpha*g_val + (2-self.alpha)*h_val            
             
             # update lookup table
-            table[v]['g'] = g_val
-            table[v]['f'] = f_val
-            table[v]['parent'] = u
+            table.set(v, g_val, f_val, u)
             
             # if node is unvisited or is closed but can be accessed in a cheaper way,
-            # add it to open priority queue.
-            if to_target and (v not in self.open):
+            # add it to open priority queue. If it is already open, update its priority.
+            if to_target:
                 self.open.add(v, f_val)
                 # if node v reopens, it should be remove from the close set
                 if v in self.close:
                     self.close.remove(v)
-            if not to_target and (v not in self.open_inv):
+            else:
                 self.open_inv.add(v, f_val)
                 # if node v reopens, it should be removed from the close_inv set
                 if v in self.close_inv:
                     self.close_inv.remove(v)
     
+    def _expand(self, node):
+        """Relax all the neighbors of node from source"""
+        for neighbor, weight in self.graph.neighbors(node):
+            self._relax(node, neighbor, weight, self.nodes, True)
+
+    def _stop(self, top, top_inv, best):
+        """Whether the search can stop with the best meeting cost found so far.
+        Params:
+        top, top_inv: the lowest priorities of open and open_inv
+        best: the cost of the best path found through a meeting of both searches
+        """
+        if best == self.MAX:
+            return False
+        if self.alpha == 2:
+            # f is 2g: every unexplored path costs at least top/2 + top_inv/2
+            return (top + top_inv)/2 >= best
+        if self.alpha >= 1:
+            # with a consistent heuristic f <= alpha*cost on a path, so one side
+            # whose lowest priority reaches alpha*best cannot improve it.
+            return max(top, top_inv) >= self.alpha*best
+        # best first searches are not optimal, stop at the first meeting
+        return True
+
     def plan(self, source, target, graph=None):
-        """Find path from a single source with Dijkstra's algorithm
-        dijkstra is the only method capable for one-to-many search in this library
+        """Find path with a bidirectional search
+        The frontier with fewer open nodes is expanded first, and the cost of the
+        best path through a node reached by both searches is kept up to date.
+        The search stops when the lowest priorities of both open lists show that
+        no better path remains, see _stop. It is optimal when alpha is 2.
         Params:
-        graph: a networkx graph object
+        graph: a CSRGraph object or a networkx graph object
         source: a tuple representing the coordinates of the source node
-        target: a tuple representing the coordinates of the target node
+        target: a tuple representing the coordinates of the target node, or a list
+            (or set) of them. The reverse search starts from all of them and the
+            path to the cheapest one is returned.
         Returns:
-
+        (path, weight): a tuple
+            path is a list of nodes in the path from source to target, and
+            weight is an integer/float number denoting the cumulative weights of the path.
+            For an unaccessible target return [] as path and None as weight.
         """
-        if graph is not None:
-            self.graph = graph
+        self._setGraph(graph)
         if self.graph is None:
             raise ValueError('graph is not initialized')
         self.source = source
-        self.target = target
 
         # check source and target in graph for early stop.
         if self.source not in self.graph:
             raise ValueError('Invalid source. Source not in the graph')
-        if self.target not in self.graph:
-            raise ValueError('Invalid target. Target not in the graph')
-        
+        self._setTarget(target)
+        target = self.target
+
+        route = self._lookup(source, target)
+        if route is not None:
+            return route
+
+        args = self._kernelArgs(BiDijkstra._relax)
+        if args is not None:
+            return self._store(source, target, self._kernelPlan(*args))
+
         # initialize both source and target
         self._init(bi_direct=True)
         
         self._callHeuristic(step=1.0, diag=1.4)
-        
+        if self._source in self._targets:
+            return self._store(source, target, self._findPath(self._source, self.nodes))
+
+        # best meeting: cost and the edge (u, v, weight), u reached from source and
+        # v from target
+        best, meet = self.MAX, None
         while self.open.cnt > 0 and self.open_inv.cnt > 0:
-            node = self.open.pop()
-            node_inv = self.open_inv.pop()
-            self.close.add(node)
-            self.close_inv.add(node_inv)
-            #print('open: ', node, end='\t')
-            #print('open_inv: ', node_inv, end='\n')
-            if node in self.close_inv:
-                path, weight = self._findPath(node, self.nodes)
-                path_inv, weight_inv = self._findPath(node, self.nodes_inv)
+            if self._stop(self.open.peek()[0], self.open_inv.peek()[0], best):
+                break
+            # expand the smaller frontier
+            to_target = self.open.cnt <= self.open_inv.cnt
+            if to_target:
+                queue, table, other, close = self.open, self.nodes, self.nodes_inv, self.close
+            else:
+                queue, table, other, close = self.open_inv, self.nodes_inv, self.nodes, self.close_inv
+            node = queue.pop()
+            close.add(node)
+            for neighbor, weight in self.graph.neighbors(node):
+                self._relax(node, neighbor, weight, table, to_target)
+                # a path through the edge (node, neighbor) when both searches met
+                if neighbor in other:
+                    cost = table.g(node) + weight + other.g(neighbor)
+                    if cost < best:
+                        best = cost
+                        meet = (node, neighbor, weight) if to_target else (neighbor, node, weight)
 
-                return (path[:-1]+path_inv[::-1], weight+weight_inv)
-            if node_inv in self.close:
-                path, weight = self._findPath(node_inv, self.nodes)
-                path_inv, weight_inv = self._findPath(node_inv, self.nodes_inv)
-                return (path[:-1]+path_inv[::-1], weight+weight_inv)
-                
-            # relax from source
-            for neighbor in self.graph.adj[node]:
-                self._relax(node, neighbor, self.nodes, True)
-            # relax from target
-            for neighbor in self.graph.adj[node_inv]:
-                self._relax(node_inv, neighbor, self.nodes_inv, False)
         # if no such path exists return None
-        return ([],None)      
+        if meet is None:
+            return self._store(source, target, ([], None))
+        u, v, w = meet
+        path, weight = self._findPath(u, self.nodes)
+        path_inv, weight_inv = self._findPath(v, self.nodes_inv)
+        return self._store(source, target, (path + path_inv[::-1], weight + w + weight_inv))
+
+    def _kernelPlan(self, arrays, coords, target_coords, h_args):
+        """ plan with the compiled kernel, see RoutePlanner._kernelArgs"""
+        from ..utils import kernel
+        graph = self.graph
+        source = graph.to_id(self.source)
+        # the reverse search starts from the targets in the order of _init
+        targets = list({graph.to_id(t) for t in self._targetNodes()})
+        if source in targets:
+            return ([self.source], 0)
+        rows, cols = coords
+        u, v, w, g, parent, g_inv, parent_inv = kernel.bisearch(
+            *arrays, source, np.array(targets, dtype=np.int64), rows, cols, *target_coords,
+            rows[[source]], cols[[source]], *h_args)
+        if u < 0:
+            return ([], None)
+        path = self._kernelPath(parent, u)
+        path_inv = self._kernelPath(parent_inv, v)
+        return (path + path_inv[::-1], float(g[u]) + float(w) + float(g_inv[v]))
 
-    def multi_plan(self, pairs, graph):
-        """ Process multiple pairs of source-target in one map
+    def multi_plan(self, pairs, graph, workers=None, chunksize=None):
+        """ Process multiple source-target pairs in one map
+        Pairs sharing a source reuse one search tree when alpha is 2.
         Params:
-        pair: list of tuple in the form of [(source_1, target_1),(source_2, target_2)...]
+        pairs: list of tuple in the form of [(source_1, target_1),(source_2, target_2)...]
+        graph: a CSRGraph object or a networkx graph object
+        workers: integer (default: None)
+            number of processes to spread the pairs across. None or 1 plans in
+            the current process.
+        chunksize: integer (default: None)
+            number of pairs sent to a worker at once, see parallel_plan.
         Returns:
-        map: a dictionary in the form of {(source, target): (path, weight)}
+        routes: a list of (path, weight) in the same order as pairs
         """
-        self.graph = graph
-        res = []
-        for pair in pairs:
-            res.append(self.plan(pair[0], pair[1]))
-        return res
+        self._setGraph(graph)
+        if workers is not None and workers > 1:
+            return parallel_plan(self, pairs, workers, chunksize)
+        return self._multiPlan(pairs)
@@ -1,15 +1,14 @@
-import numpy as np
-import networkx as nx
+import math
 
-from planner.dijkstra import Dijkstra
-from utils.heuristic import heuristic2D
+from .dijkstra import Dijkstra
+from ..utils.heuristic import heuristic2D
 
 
 class BreadthFirst(Dijkstra):
     def __init__(self, heuristic='octile', alpha=2):
         """
         Params:
-        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null'} (default: 'manhattan')
+        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null','landmarks'} (default: 'manhattan')
             methods to compute heuristic.
         alpha: a number in range of [0, 2] (default: 1)
             if alpha is 0, it becomes best first search; if alpha is 1, it is A*;
@@ -19,26 +18,29 @@ class BreadthFirst(Dijkstra):
         """
         super().__init__(heuristic=heuristic, alpha=alpha)
         
-    def _relax(self, u, v):
+    def _relax(self, u, v, weight):
         """Perform edge relaxation. 
         Params:
-        u: a tuple representing the coordinates of the node u
-        v: a tuple representing the coordinates of the node v
+        u: an integer id of the node u
+        v: an integer id of the node v
+        weight: an integer/float number, weight of the edge (u, v). It is ignored
+            since breadth first search counts steps instead of weights, except
+            that edges of a non-finite weight (e.g. to the blocked cells of a
+            GridMap) are not followed.
 
         """
+        if not math.isfinite(weight):
+            return
         
         # g_val is the tentative actual distance from node v to source node via u.
-        g_val = self.nodes[u]['g'] + self.h(u, v)
+        g_val = self.nodes.g(u) + self.h(self.graph.to_node(u), self.graph.to_node(v))
         # Relax node v from node u.
         # update g_val 
-        if g_val < self.nodes[v]['g']:
+        if g_val < self.nodes.g(v):
             f_val = g_val        
             
-            self.nodes[v]['g'] = g_val
-            self.nodes[v]['f'] = f_val
-            self.nodes[v]['parent'] = u
+            self.nodes.set(v, g_val, f_val, u)
             
             # if node is unvisited or is closed but can be accessed in a cheaper way,
-            # add to open priority queue.
-            if v not in self.open:
-                self.open.add(v, f_val)
+            # add to open priority queue. If it is already open, update its priority.
+            self.open.add(v, f_val)
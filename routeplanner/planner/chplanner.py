@@ -0,0 +1,241 @@
+import os
+from collections import defaultdict as dd
+
+import numpy as np
+
+from .routeplanner import RoutePlanner as rp
+from ..utils.ch import ContractionHierarchy
+
+
+class CHPlanner(rp):
+    def __init__(self, heuristic='null', alpha=2, settle_limit=50):
+        """
+        Query planner on a contraction hierarchy. The hierarchy is built once per
+        map, and every query is a bidirectional Dijkstra's search which only
+        follows edges to higher ranked nodes. It is exact.
+        Params:
+        heuristic: kept for the interface of the other planners, the query does
+            not use one.
+        alpha: kept for the interface of the other planners.
+        settle_limit: integer (default: 50)
+            witness search limit used when the hierarchy is built.
+
+        Attributes:
+        hierarchy: the ContractionHierarchy of the current graph. It is built when
+            a graph is set, or loaded from the map directory of graphs opened by
+            load_grid when it was saved there for this map, and built again when
+            the map changes (see ContractionHierarchy.digest).
+        """
+        super().__init__(heuristic=heuristic, alpha=alpha)
+        self.settle_limit = settle_limit
+        self.hierarchy = None
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['hierarchy'] = None
+        return state
+
+    def _setGraph(self, graph):
+        super()._setGraph(graph)
+        if self.graph is None:
+            return
+        # the graph may have been mutated since the hierarchy was built
+        digest = self.graph.digest()
+        if self.hierarchy is not None and self.hierarchy.digest == digest:
+            return
+        path = self.graph.path
+        if path is not None and os.path.exists(os.path.join(path, 'ch.npz')):
+            hierarchy = ContractionHierarchy.load(path)
+            if hierarchy.digest == digest:
+                self.hierarchy = hierarchy
+                return
+        self.hierarchy = ContractionHierarchy.build(self.graph, self.settle_limit)
+
+    def _search(self, source, targets):
+        """Bidirectional upward search, the backward search starts from every
+        target id.
+        Returns:
+        (weight, meeting node id), weight is MAX if target is unaccessible.
+        """
+        ch = self.hierarchy
+        self.nodes, self.nodes_inv = self._workspace(2)
+        self.open = self._queue()
+        self.open_inv = self._queue()
+        self.nodes.set(source, 0, 0, None)
+        self.open.add(source, 0)
+        for target in targets:
+            self.nodes_inv.set(target, 0, 0, None)
+            self.open_inv.add(target, 0)
+
+        best, meet = self.MAX, None
+        while self.open.cnt > 0 or self.open_inv.cnt > 0:
+            top = self.open.peek()[0] if self.open.cnt > 0 else self.MAX
+            top_inv = self.open_inv.peek()[0] if self.open_inv.cnt > 0 else self.MAX
+            # no path through the unsettled nodes can beat the best meeting
+            if min(top, top_inv) >= best:
+                break
+            if top <= top_inv:
+                queue, table, other = self.open, self.nodes, self.nodes_inv
+            else:
+                queue, table, other = self.open_inv, self.nodes_inv, self.nodes
+            node = queue.pop()
+            g_node = table.g(node)
+            if node in other and g_node + other.g(node) < best:
+                best, meet = g_node + other.g(node), node
+            for neighbor, weight in ch.upward(node):
+                self._relax(node, neighbor, weight, table, queue)
+        return best, meet
+
+    def _relax(self, u, v, weight, table, queue):
+        """Perform relaxation of an upward edge.
+        Params:
+        u, v: integer ids of the nodes u and v
+        weight: an integer/float number, weight of the edge (u, v)
+        table, queue: the SearchTable and the open list of the search direction
+        """
+        g_val = table.g(u) + weight
+        if g_val < table.g(v):
+            table.set(v, g_val, g_val, u)
+            queue.add(v, g_val)
+
+    def _unpack(self, meet):
+        """ path of node ids through the meeting node, shortcuts expanded"""
+        up = [meet]
+        while self.nodes.parent(up[-1]) is not None:
+            up.append(self.nodes.parent(up[-1]))
+        down = [meet]
+        while self.nodes_inv.parent(down[-1]) is not None:
+            down.append(self.nodes_inv.parent(down[-1]))
+        return self._expandPoints(up[::-1] + down[1:])
+
+    def _expandPoints(self, points):
+        """ path of node ids along a chain of upward edges, shortcuts expanded"""
+        path = [points[0]]
+        weight = 0
+        for u, v in zip(points[:-1], points[1:]):
+            for node, w in self.hierarchy.unpack(u, v):
+                path.append(node)
+                weight += w
+        return path, weight
+
+    def _upwardSearch(self, node):
+        """Dijkstra's search from node over the upward edges, until exhausted.
+        Returns:
+        (dist, parent): dictionaries of the g values and the parents of the nodes
+            reached
+        """
+        dist = {node: 0}
+        parent = {node: None}
+        queue = self._queue()
+        queue.add(node, 0)
+        while queue.cnt > 0:
+            u = queue.pop()
+            g_u = dist[u]
+            for v, weight in self.hierarchy.upward(u):
+                g_val = g_u + weight
+                if g_val < dist.get(v, self.MAX):
+                    dist[v] = g_val
+                    parent[v] = u
+                    queue.add(v, g_val)
+        return dist, parent
+
+    def distance_matrix(self, sources, targets, graph=None, paths=False):
+        """Compute the costs of the shortest paths between all sources and targets
+        with bucket-based many-to-many queries on the hierarchy. An upward search
+        from every target leaves (target, distance) entries in a bucket at every
+        node it reaches. An upward search from every source then scans the
+        buckets of the nodes it reaches; the best sum is the cost.
+        Params: see RoutePlanner.distance_matrix
+        Returns:
+        matrix, or (matrix, route) if paths is True
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        source_ids, target_ids = self._checkNodes(sources, targets)
+
+        buckets = dd(list)
+        backward = {}
+        for j, target in enumerate(target_ids):
+            if target not in backward:
+                backward[target] = self._upwardSearch(target)
+            for node, d in backward[target][0].items():
+                buckets[node].append((j, d))
+
+        matrix = np.full((len(sources), len(targets)), self.MAX)
+        # meeting node of every pair, -1 if target is unaccessible
+        meet = np.full((len(sources), len(targets)), -1, dtype=np.int64)
+        forward = {}
+        for i, source in enumerate(source_ids):
+            if source not in forward:
+                forward[source] = self._upwardSearch(source)
+            row = [self.MAX]*len(target_ids)
+            via = [-1]*len(target_ids)
+            for node, d_node in forward[source][0].items():
+                for j, d in buckets.get(node, ()):
+                    if d_node + d < row[j]:
+                        row[j] = d_node + d
+                        via[j] = node
+            matrix[i] = row
+            meet[i] = via
+        if not paths:
+            return matrix
+
+        def route(i, j):
+            node = int(meet[i, j])
+            if node < 0:
+                return ([], None)
+            up_parent = forward[source_ids[i]][1]
+            down_parent = backward[target_ids[j]][1]
+            up = [node]
+            while up_parent[up[-1]] is not None:
+                up.append(up_parent[up[-1]])
+            down = [node]
+            while down_parent[down[-1]] is not None:
+                down.append(down_parent[down[-1]])
+            path, weight = self._expandPoints(up[::-1] + down[1:])
+            return ([self.graph.to_node(n) for n in path], weight)
+        return matrix, route
+
+    def plan(self, source, target, graph=None):
+        """Find path with a query on the contraction hierarchy
+        Params:
+        source: a tuple representing the coordinates of the source node
+        target: a tuple representing the coordinates of the target node, or a list
+            (or set) of them to find the path to the cheapest one
+        graph: an undirected CSRGraph object or a networkx graph object
+        Returns:
+        (path, weight): a tuple
+            path is a list of nodes in the shortest path from source to target, and
+            weight is an integer/float number denoting the cumulative weights of the path.
+            For an unaccessible target return [] as path and None as weight.
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        self.source = source
+
+        # check source and target
+        if self.source not in self.graph:
+            raise ValueError('Invalid source. Source not in the graph')
+        self._setTarget(target)
+        self._source = self.graph.to_id(self.source)
+        self._targets = {self.graph.to_id(t) for t in self._targetNodes()}
+        self._startStats()
+
+        best, meet = self._search(self._source, self._targets)
+        if meet is None:
+            return ([], None)
+        path, weight = self._unpack(meet)
+        return ([self.graph.to_node(node) for node in path], weight)
+
+    def multi_plan(self, pairs, graph):
+        """ Process multiple source-target pairs in one map
+        Params:
+        pairs: list of tuple in the form of [(source_1, target_1),(source_2, target_2)...]
+        graph: an undirected CSRGraph object or a networkx graph object
+        Returns:
+        routes: a list of (path, weight) in the same order as pairs
+        """
+        self._setGraph(graph)
+        return [self.plan(source, target) for source, target in pairs]
@@ -0,0 +1,283 @@
+import itertools
+from collections import Counter
+
+import numpy as np
+
+from .astar import AStar
+from ..utils.csrgraph import CSRGraph
+from ..utils.gridmap import GridMap
+from ..utils.misc import distance_field
+from ..utils.reservation import ReservationTable
+
+
+class CooperativeAStar(AStar):
+    # reservations and distance fields belong to a graph
+    _TRANSIENT = AStar._TRANSIENT + ('reservations', 'fields', '_h', '_fieldKey', '_static',
+                                       '_arrive', '_step')
+
+    def __init__(self, alpha=1, horizon=None, wait=1.0, max_fields=64):
+        """
+        Cooperative A*: several agents move on the same graph one step per time
+        unit without colliding. They are planned one after the other in priority
+        order by A* over (node, time) states, and every path found is reserved in
+        a ReservationTable the next agents avoid: two agents are never on the
+        same node at the same time, nor swap nodes along an edge. An agent parks
+        at its goal once it arrives, so it must only stop there when no agent
+        passes later.
+        The heuristic is the exact distance to the goal ignoring the other
+        agents, a distance field computed once per goal and shared by the agents
+        going there.
+        Params:
+        alpha: a number in range of [0, 2] (default: 1)
+            see RoutePlanner. With 1 every path is the shortest one given the
+            reservations of the agents before it.
+        horizon: integer (default: None)
+            number of time steps searched, None for no limit. The states after the
+            latest reservation are merged, so the search ends without limit too,
+            but an agent which cannot reach its goal costs a search of all the
+            (node, time) states until then.
+        wait: a number (default: 1.0)
+            cost of staying on a node for one time step.
+        max_fields: integer (default: 64)
+            number of distance fields kept between calls of plan.
+
+        Attributes:
+        reservations: the ReservationTable of the agents planned on the graph.
+        fields: dictionary of the distance fields kept, by goal ids.
+        """
+        super().__init__(heuristic='null', alpha=alpha)
+        self.horizon = horizon
+        self.wait = wait
+        self.max_fields = max_fields
+        self.reservations = None
+        self.fields = {}
+        self._fieldKey = None
+        # number of agents planned against the reservations
+        self._agents = 0
+
+    def _reset(self):
+        """ empty the reservations, and drop the fields when the graph changed"""
+        self.reservations = ReservationTable(len(self.graph))
+        self._agents = 0
+        key = (self.graph.token, self.graph.version)
+        if key != self._fieldKey:
+            self.fields = {}
+            self._fieldKey = key
+
+    def _field(self, goals):
+        """Distances of all the nodes to the nearest goal.
+        Params:
+        goals: a tuple of integer ids of the goal nodes
+        Returns:
+        a float array indexed by node ids, inf for the nodes which cannot reach a goal
+        """
+        field = self.fields.get(goals)
+        if field is not None:
+            return field
+        graph = self.graph
+        if isinstance(graph, CSRGraph) and graph.cellweight is not None and (
+                graph.version == 0 or isinstance(graph, GridMap)):
+            # grids whose edges follow their cells: a vectorized wavefront
+            dist, _ = distance_field(graph.walkable, [graph.to_node(g) for g in goals],
+                                     graph.diagonal, graph.cellweight)
+            field = dist.ravel()[graph.cells]
+        else:
+            if isinstance(graph, CSRGraph) and graph.directed:
+                # distances to the goals are searched over the reversed edges
+                tails = np.repeat(np.arange(len(graph)), np.diff(graph.indptr))
+                graph = CSRGraph.from_edges(len(graph), graph.indices, tails, graph.weights,
+                                            directed=True, labels=range(len(graph)))
+            field = np.full(len(graph), self.MAX)
+            queue = self.queue()
+            for goal in goals:
+                field[goal] = 0
+                queue.add(goal, 0)
+            while queue.cnt > 0:
+                node = queue.pop()
+                g_node = field[node]
+                for neighbor, weight in graph.neighbors(node):
+                    g_val = g_node + weight
+                    if g_val < field[neighbor]:
+                        field[neighbor] = g_val
+                        queue.add(neighbor, g_val)
+        self.fields[goals] = field
+        return field
+
+    def _tableSize(self):
+        """ the ids of the (node, time) states are not bounded"""
+        return None
+
+    def _relax(self, u, v, weight):
+        """Perform edge relaxation between states (node, time) packed as
+        time*len(graph) + node. The heuristic is read in the distance field.
+        Params: see RoutePlanner._relax
+        """
+        g_val = self.nodes.g(u) + weight
+        if g_val < self.nodes.g(v):
+            t, node = divmod(v, len(self._h))
+            # the goal is free from the time arrive on, every step costs at least step
+            h_val = max(self._h[node], self._step*(self._arrive - t))
+            f_val = self.alpha*g_val + (2-self.alpha)*h_val
+            self.nodes.set(v, g_val, f_val, u)
+            # among equal f values, the states closer to the goal first
+            self.open.add(v, f_val, (-g_val, v))
+
+    def _expandState(self, state, agent):
+        """ relax the moves and the wait of state which do not collide with the
+        reservations of the other agents"""
+        size = len(self._h)
+        t, u = divmod(state, size)
+        table = self.reservations
+        h = self._h
+        # after the last reservation only the parked agents remain, so the states
+        # of later times are merged: waiting there cannot help
+        after = min(t+1, self._static)*size
+        # the agent which comes to u next, it must not come from the node left
+        back = table.owner(u, t+1)
+        if back == agent:
+            back = -1
+        moves = itertools.chain(self.graph.neighbors(u), ((u, self.wait),))
+        for v, weight in moves:
+            if h[v] == self.MAX:
+                continue
+            owner = table.owner(v, t+1)
+            if owner != -1 and owner != agent:
+                continue
+            if back != -1 and v != u and table.owner(v, t) == back:
+                continue
+            self._relax(state, after + v, weight)
+
+    def _findPath(self, state, table):
+        """ the nodes of the path to state, one per time step, and its weight"""
+        size = len(self._h)
+        path = [state]
+        while table.parent(path[-1]) is not None:
+            path.append(table.parent(path[-1]))
+        return ([self.graph.to_node(s % size) for s in path[::-1]], table.g(state))
+
+    def _planAgent(self, source, target, agent):
+        """Find the path of one agent against the reservations and reserve it.
+        An agent without path stays on its source when no other agent is to
+        cross it.
+        Returns:
+        (path, weight): see plan
+        """
+        self.source = source
+        self._setTarget(target)
+        self._init()
+        table = self.reservations
+        # the agent leaves the source multi_agent_plan kept for it
+        if table.parked(self._source) == agent:
+            table.unpark(self._source)
+        goals = tuple(sorted(self._targets))
+        self._h = self._field(goals)
+        size = len(self._h)
+        self._static = table.horizon + 1
+        horizon = self.MAX if self.horizon is None else self.horizon
+        # a goal where another agent parked is never free again
+        free = [g for g in goals if table.parked(g) == -1]
+        self._arrive = min([int(table.last[g]) + 1 for g in free], default=0)
+        self._step = 0
+        if isinstance(self.graph, CSRGraph) and len(self.graph.weights):
+            self._step = max(0.0, min(float(self.wait), float(self.graph.weights.min())))
+
+        route = ([], None)
+        if free and self._h[self._source] != self.MAX:
+            while self.open.cnt > 0:
+                state = self.open.pop()
+                t, node = divmod(state, size)
+                # parking on a goal must not block the agents passing later
+                if node in self._targets and table.last[node] <= t and table.parked(node) == -1:
+                    route = self._findPath(state, self.nodes)
+                    break
+                if t < horizon:
+                    self._expandState(state, agent)
+        if route[1] is None:
+            # staying would collide with the agents planned earlier crossing it
+            if table.last[self._source] <= 0:
+                table.park(self._source, 0, agent)
+        else:
+            table.reserve_path([self.graph.to_id(node) for node in route[0]], agent)
+        return route
+
+    def multi_agent_plan(self, agents, graph=None):
+        """Plan the paths of several agents which must not collide.
+        The reservations of previous calls are discarded.
+        Params:
+        agents: a list of (source, target) tuples in priority order, the first
+            agent is planned first. target may be a list of nodes, see Dijkstra.plan.
+        graph: a CSRGraph object or a networkx graph object
+        Returns:
+        a list of (path, weight) in the order of agents. path lists the node of the
+            agent at every time step from 0, waits included, and ends on its goal
+            where it stays. For an agent without path return [] as path and None
+            as weight; it stays on its source. The agents occupy their source
+            until they are planned, so the agents planned before one which finds
+            no path never cross its source.
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        for source, target in agents:
+            if source not in self.graph:
+                raise ValueError('Invalid source. Source not in the graph')
+            self._setTarget(target)
+        self._reset()
+        # the agents occupy their source until they are planned, so the agents
+        # planned first never cross the source of an agent which may not move
+        for agent, (source, _) in enumerate(agents):
+            source_id = self.graph.to_id(source)
+            owner = self.reservations.owner(source_id, 0)
+            if owner != -1:
+                raise ValueError('Invalid source. Source occupied by agent %d' % owner)
+            self.reservations.reserve(source_id, 0, agent)
+            self.reservations.park(source_id, 0, agent)
+
+        # the fields are shared by the agents of a goal, and dropped after the last one
+        keys = []
+        for _, target in agents:
+            self._setTarget(target)
+            keys.append(tuple(sorted(self.graph.to_id(t) for t in self._targetNodes())))
+        left = Counter(keys)
+        kept = set(self.fields)
+
+        res = []
+        for agent, (source, target) in enumerate(agents):
+            res.append(self._planAgent(source, target, agent))
+            key = keys[agent]
+            left[key] -= 1
+            if left[key] == 0 and key not in kept:
+                del self.fields[key]
+        self._agents = len(agents)
+        return res
+
+    def plan(self, source, target, graph=None):
+        """Find the path of one more agent, after those of the last calls of
+        multi_agent_plan and plan on the same graph.
+        Params: see Dijkstra.plan
+        Returns:
+        (path, weight): see multi_agent_plan. The agents planned before were not
+            kept off the source, so an agent without path whose source they cross
+            cannot stay there: it is not reserved, and should be planned again
+            with a higher priority.
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        if source not in self.graph:
+            raise ValueError('Invalid source. Source not in the graph')
+        self._setTarget(target)
+        if (self.reservations is None or self.reservations.size != len(self.graph)
+                or self._fieldKey != (self.graph.token, self.graph.version)):
+            self._reset()
+        agent = self._agents
+        source_id = self.graph.to_id(source)
+        owner = self.reservations.owner(source_id, 0)
+        if owner != -1:
+            raise ValueError('Invalid source. Source occupied by agent %d' % owner)
+        self.reservations.reserve(source_id, 0, agent)
+        self._agents += 1
+        route = self._planAgent(source, target, agent)
+        while len(self.fields) > self.max_fields:
+            del self.fields[next(iter(self.fields))]
+        return route
@@ -1,11 +1,13 @@
-from planner.routeplanner import RoutePlanner as rp
-from multiprocessing import Pool
+import numpy as np
+
+from .routeplanner import RoutePlanner as rp
+from ..utils.parallel import parallel_plan
 
 class Dijkstra(rp):
     def __init__(self, heuristic='null', alpha=2):
         """
         Params:
-        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null'} (default: 'manhattan')
+        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null','landmarks'} (default: 'manhattan')
             methods to compute heuristic.
         alpha: a number in range of [0, 2] (default: 1)
             if alpha is 0, it becomes best first search; if alpha is 1, it is A*;
@@ -19,9 +21,10 @@ class Dijkstra(rp):
         """Find path from a single source with Dijkstra's algorithm
         dijkstra is the only method capable for one-to-many search in this library
         Params:
-        graph: a networkx graph object
+        graph: a CSRGraph object or a networkx graph object
         source: a tuple representing the coordinates of the source node
-        target: a tuple representing the coordinates of the target node
+        target: a tuple representing the coordinates of the target node, or a list
+            (or set) of them to find the path to the cheapest one in one search
         Returns:
         (path, weight): a tuple 
             path is a list of nodes in the shortest path from source to target, and 
@@ -30,44 +33,66 @@ class Dijkstra(rp):
             e.g. ([(2, 0), (1, 0), (0, 1), (1, 2), (2, 2)], 4.8),
             ([], None), ([(2, 0), (2, 0)], 0)
         """
-        if graph is not None:
-            self.graph = graph
+        self._setGraph(graph)
         if self.graph is None:
             raise ValueError('graph is not initialized')
         self.source = source
-        self.target = target
-        
+
         # check source and target
         if self.source not in self.graph:
             raise ValueError('Invalid source. Source not in the graph')
-        if self.target not in self.graph:
-                raise ValueError('Invalid target. Target not in the graph')
+        self._setTarget(target)
+        target = self.target
         
+        route = self._lookup(source, target)
+        if route is not None:
+            return route
+
+        args = self._kernelArgs(rp._relax)
+        if args is not None:
+            return self._store(source, target, self._kernelPlan(*args))
+
         # initialize single source
         self._init()
         self._callHeuristic(step=1.0, diag=1.4)
         
         while self.open.cnt > 0:
             node = self.open.pop()
-            if node == self.target:
-                path, weight = self._findPath(node, self.nodes)
-                return (path, weight)
+            if node in self._targets:
+                return self._store(source, target, self._findPath(node, self.nodes))
             # relaxation
-            for neighbor in self.graph.adj[node]:
-                self._relax(node, neighbor)
+            self._expand(node)
         
         # if no such path exists return None
-        return ([], None)
+        return self._store(source, target, ([], None))
+
+    def _kernelPlan(self, arrays, coords, target_coords, h_args):
+        """ plan with the compiled kernel, see RoutePlanner._kernelArgs"""
+        from ..utils import kernel
+        graph = self.graph
+        targets = np.zeros(len(graph), dtype=np.bool_)
+        targets[[graph.to_id(t) for t in self._targetNodes()]] = True
+        node, g, parent = kernel.search(*arrays, graph.to_id(self.source), targets,
+                                        *coords, *target_coords, *h_args)
+        if node < 0:
+            return ([], None)
+        return (self._kernelPath(parent, node), float(g[node]))
 
-    def multi_plan(self, pairs, graph):
+    def multi_plan(self, pairs, graph, workers=None, chunksize=None):
         """ Process multiple source-target pairs in one map
+        Pairs sharing a source reuse one search tree when alpha is 2.
         Params:
-        pair: list of tuple in the form of [(source_1, target_1),(source_2, target_2)...]
+        pairs: list of tuple in the form of [(source_1, target_1),(source_2, target_2)...]
+        graph: a CSRGraph object or a networkx graph object
+        workers: integer (default: None)
+            number of processes to spread the pairs across. None or 1 plans in
+            the current process.
+        chunksize: integer (default: None)
+            number of pairs sent to a worker at once, see parallel_plan.
         Returns:
-        map: a dictionary in the form of {(source, target): (path, weight)}
+        routes: a list of (path, weight) in the same order as pairs
         """
-        self.graph=graph
-        res = []
-        for pair in pairs:
-            res.append(self.plan(pair[0], pair[1]))
-        return res
+        self._setGraph(graph)
+        if workers is not None and workers > 1:
+            return parallel_plan(self, pairs, workers, chunksize)
+        return self._multiPlan(pairs)
@@ -0,0 +1,315 @@
+from collections import defaultdict as dd
+
+import numpy as np
+
+from .routeplanner import RoutePlanner as rp, _adapt
+from ..utils.priorq import priorq
+from ..utils.csrgraph import CSRGraph
+from ..utils.misc import DIAG_FACTOR, distance_field, field_path, _gridEdges
+
+# value of update_cells which blocks a cell
+BLOCKED = None
+
+_ACCEPTED = ('D* Lite needs the cell weights of a grid: give a binarized array, a '
+             'CSRGraph built by arr2grid(..., create_using=CSRGraph), a GridMap, or '
+             'a networkx graph from arr2grid with uniform weights')
+
+
+def _cellWeights(graph, walk):
+    """ the cell weights and the connectivity of a grid graph without cell weights,
+    e.g. adapted from networkx. Its edges must be those of arr2grid with uniform
+    weights, the only case where the cell weights can be recovered."""
+    weights = np.unique(graph.weights)
+    step = weights[0] if len(weights) else 1.0
+    diagonal = bool(np.any(weights == DIAG_FACTOR*step))
+    # both directions of every edge between adjacent walkable cells
+    expected = 2*len(_gridEdges(walk, walk.astype(np.float64), diagonal)[0])
+    if not np.all(np.isin(weights, [step, DIAG_FACTOR*step])) or len(graph.indices) != expected:
+        raise TypeError(_ACCEPTED)
+    return np.where(walk, float(step), 0.0), diagonal
+
+
+class DStarLite(rp):
+    _TRANSIENT = rp._TRANSIENT + ('_heap',)
+
+    def __init__(self, heuristic='octile', diagonal=True):
+        """
+        Incremental planner (D* Lite). It searches from the target back to the
+        source, so when cells change or the source moves along the path only the
+        affected part of the search is repaired instead of planning from scratch.
+        Params:
+        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null'} (default: 'octile')
+            methods to compute heuristic. It must not overestimate.
+        diagonal: bool (default: True)
+            connectivity used when the graph is given as an array. Graphs built by
+            arr2grid carry their own connectivity.
+
+        Attributes:
+        nodes: a nested default dictionary {(cell): {'g':, 'rhs':}} where rhs is the
+            one step lookahead of g. Cells are flat (row-major) indices.
+        open: priority queue of the inconsistent cells (g != rhs) keyed by
+            (min(g, rhs) + h + km, min(g, rhs)).
+        stats: when the planner is profiled, the SearchStats of the last search:
+            plan, or the repair of update_cells or move_start. Relaxations are
+            not counted, D* Lite updates the lookahead of cells instead.
+        km: accumulated heuristic offset of the moves of the source.
+        """
+        super().__init__(heuristic=heuristic, alpha=1)
+        self.diagonal = diagonal
+        self.km = 0
+
+    def _setGraph(self, graph):
+        """ copy the cells of a grid, so they can be updated in place
+        Params:
+        graph: a binarized array (1 is walkable, 0 is block), a CSRGraph built by
+            arr2grid or a GridMap, or a networkx graph from arr2grid. update_cells
+            changes the copy, not the graph object. The cell weights of graphs
+            without them (networkx graphs) are only recovered when the edge
+            weights are uniform, else TypeError is raised.
+        """
+        if graph is None:
+            return
+        if isinstance(graph, (np.ndarray, list)):
+            data = np.asarray(graph)
+            self._walk = data != 0
+            self._weight = np.where(self._walk, 1.0, 0.0)
+            self._diagonal = self.diagonal
+        else:
+            grid = graph if isinstance(graph, CSRGraph) or hasattr(graph, 'to_id') else _adapt(graph)
+            if not isinstance(grid, CSRGraph) or grid.cells is None:
+                raise TypeError(_ACCEPTED)
+            self._walk = np.asarray(grid.walkable)
+            if grid.cellweight is not None:
+                self._weight = np.array(grid.cellweight, dtype=np.float64)
+                self._diagonal = bool(grid.diagonal)
+            else:
+                self._weight, self._diagonal = _cellWeights(grid, self._walk)
+        self.graph = graph
+        self._shape = self._walk.shape
+        offsets = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+        if self._diagonal:
+            offsets += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+        self._offsets = offsets
+
+    def _node(self, cell):
+        return divmod(cell, self._shape[1])
+
+    def _neighbors(self, cell):
+        """ iterate (neighbor cell, edge weight), inf weight for blocked cells"""
+        m, n = self._shape
+        r, c = divmod(cell, n)
+        walk = self._walk
+        weight = self._weight
+        for dr, dc in self._offsets:
+            i, j = r+dr, c+dc
+            if 0 <= i < m and 0 <= j < n:
+                if walk[r, c] and walk[i, j]:
+                    w = (weight[r, c]+weight[i, j])/2
+                    if dr and dc:
+                        w = DIAG_FACTOR*w
+                    yield i*n + j, float(w)
+                else:
+                    yield i*n + j, self.MAX
+
+    def _key(self, cell):
+        g = min(self.nodes[cell]['g'], self.nodes[cell]['rhs'])
+        return (g + self.h(self._node(cell), self.source) + self.km, g)
+
+    def _updateVertex(self, cell):
+        """ recompute the lookahead of a cell and queue it if it is inconsistent"""
+        table = self.nodes
+        if cell not in self._targets:
+            table[cell]['rhs'] = min((w + table[v]['g'] for v, w in self._neighbors(cell)),
+                                     default=self.MAX)
+        if cell in self.open:
+            self.open.remove(cell)
+        if table[cell]['g'] != table[cell]['rhs']:
+            self.open.add(cell, self._key(cell))
+
+    def _computeShortestPath(self):
+        table = self.nodes
+        start = self._source
+        while self.open.cnt > 0 and (self.open.peek()[0] < self._key(start) or
+                                     table[start]['rhs'] != table[start]['g']):
+            k_old = self.open.peek()[0]
+            node = self.open.pop()
+            k_new = self._key(node)
+            if k_old < k_new:
+                self.open.add(node, k_new)
+            elif table[node]['g'] > table[node]['rhs']:
+                table[node]['g'] = table[node]['rhs']
+                for v, _ in self._neighbors(node):
+                    self._updateVertex(v)
+            else:
+                table[node]['g'] = self.MAX
+                self._updateVertex(node)
+                for v, _ in self._neighbors(node):
+                    self._updateVertex(v)
+
+    def _extractPath(self):
+        """ follow the cheapest successors from the source to the target"""
+        table = self.nodes
+        node = self._source
+        if table[node]['g'] == self.MAX:
+            return ([], None)
+        path = [node]
+        weight = 0
+        while node not in self._targets:
+            node, w = min(self._neighbors(node), key=lambda vw: vw[1] + table[vw[0]]['g'])
+            if w == self.MAX or len(path) > self._walk.size:
+                return ([], None)
+            path.append(node)
+            weight += w
+        return ([self._node(cell) for cell in path], weight)
+
+    def _check(self, node, name):
+        m, n = self._shape
+        r, c = node
+        if not (0 <= r < m and 0 <= c < n and self._walk[r, c]):
+            raise ValueError('Invalid %s. %s not in the graph' % (name, name.capitalize()))
+
+    def plan(self, source, target, graph=None):
+        """Find path from scratch and keep the search for later repairs
+        Params:
+        source: a tuple representing the coordinates of the source node
+        target: a tuple representing the coordinates of the target node, or a list
+            (or set) of them to find the path to the cheapest one
+        graph: a binarized array or a CSRGraph built by arr2grid
+        Returns:
+        (path, weight): a tuple
+            path is a list of nodes in the shortest path from source to target, and
+            weight is an integer/float number denoting the cumulative weights of the path.
+            For an unaccessible target return [] as path and None as weight.
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        self._check(source, 'source')
+        if isinstance(target, (list, set, frozenset)):
+            target = list(target)
+            if not target:
+                raise ValueError('Invalid target. No target given')
+        targets = target if isinstance(target, list) else [target]
+        for node in targets:
+            self._check(node, 'target')
+        self.source = source
+        self.target = target
+        n = self._shape[1]
+        self._source = source[0]*n + source[1]
+        self._targets = {r*n + c for r, c in targets}
+
+        self.km = 0
+        self._last = source
+        self.nodes = dd(lambda: {'g': self.MAX, 'rhs': self.MAX})
+        self._heap = priorq()
+        self._startRepair()
+        # the search runs backward, from every target
+        for cell in self._targets:
+            self.nodes[cell]['rhs'] = 0
+            self.open.add(cell, self._key(cell))
+        self._computeShortestPath()
+        return self._extractPath()
+
+    def _startRepair(self):
+        """ count a new search into a new SearchStats when the planner is profiled,
+        the open list is kept"""
+        self._startStats(self._node)
+        self._callHeuristic(step=1.0, diag=1.4)
+        self.open = self._queue(self._heap)
+
+    def _moved(self):
+        """ account for the move of the source since the last repair"""
+        self.km += self.h(self._last, self.source)
+        self._last = self.source
+
+    def update_cells(self, changes):
+        """Change cells and repair the current solution.
+        Params:
+        changes: a list of (cell, value) where cell is a tuple of coordinates and
+            value is the new weight of the cell, or BLOCKED (None) to block it.
+            A blocked cell given a weight becomes walkable again. Raise ValueError,
+            without changing any cell, if a cell is out of the grid.
+        Returns:
+        (path, weight) from the current source to the target
+        """
+        if self.source is None:
+            raise ValueError('plan a path before updating cells')
+        m, n = self._shape
+        # negative indices would wrap around to other cells
+        for (r, c), _ in changes:
+            if not (0 <= r < m and 0 <= c < n):
+                raise ValueError('Invalid cell. Cell not in the grid')
+        self._startRepair()
+        self._moved()
+        touched = set()
+        for (r, c), value in changes:
+            if value is BLOCKED:
+                self._walk[r, c] = False
+                self._weight[r, c] = 0
+            else:
+                self._walk[r, c] = True
+                self._weight[r, c] = value
+            cell = r*n + c
+            touched.add(cell)
+            touched.update(v for v, _ in self._neighbors(cell))
+        for cell in touched:
+            self._updateVertex(cell)
+        self._computeShortestPath()
+        return self._extractPath()
+
+    def move_start(self, source):
+        """Move the source, e.g. as the robot advances along its path.
+        Params:
+        source: a tuple representing the coordinates of the new source
+        Returns:
+        (path, weight) from the new source to the target
+        """
+        if self.source is None:
+            raise ValueError('plan a path before moving the source')
+        self._check(source, 'source')
+        self._startRepair()
+        self.source = source
+        self._source = source[0]*self._shape[1] + source[1]
+        self._moved()
+        self._computeShortestPath()
+        return self._extractPath()
+
+    def distance_matrix(self, sources, targets, graph=None, paths=False):
+        """Compute the costs of the shortest paths between all sources and targets
+        on the current cells, updates included, with one distance_field per source.
+        Params: see RoutePlanner.distance_matrix
+        Returns:
+        matrix, or (matrix, route) if paths is True
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        for source in sources:
+            self._check(source, 'source')
+        for target in targets:
+            self._check(target, 'target')
+        rows = tuple(np.array(targets, dtype=np.int64).reshape(-1, 2).T)
+
+        matrix = np.full((len(sources), len(targets)), self.MAX)
+        fields = {}
+        for i, source in enumerate(sources):
+            field = fields.get(source)
+            if field is None:
+                field = distance_field(self._walk, source, self._diagonal, self._weight)
+                if paths:
+                    fields[source] = field
+            matrix[i] = field[0][rows]
+        if not paths:
+            return matrix
+        return matrix, lambda i, j: field_path(*fields[sources[i]], targets[j])
+
+    def multi_plan(self, pairs, graph):
+        """ Process multiple source-target pairs in one map, each from scratch
+        Params:
+        pairs: list of tuple in the form of [(source_1, target_1),(source_2, target_2)...]
+        graph: a binarized array or a CSRGraph built by arr2grid
+        Returns:
+        routes: a list of (path, weight) in the same order as pairs
+        """
+        self._setGraph(graph)
+        return [self.plan(source, target) for source, target in pairs]
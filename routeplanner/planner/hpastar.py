@@ -0,0 +1,233 @@
+import os
+from collections import defaultdict as dd
+
+from .routeplanner import RoutePlanner as rp
+from ..utils.abstraction import ClusterAbstraction
+
+
+class HPAStar(rp):
+    def __init__(self, heuristic='octile', alpha=1, size=16):
+        """
+        Hierarchical path-finding. The map is split into clusters of size x size
+        cells, and queries are answered on the small graph of the cluster entrances
+        before the path is refined inside each cluster. Paths are near optimal:
+        they only cross cluster borders at the entrances.
+        Params:
+        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null','landmarks'} (default: 'octile')
+            methods to compute heuristic on the abstract graph.
+        alpha: a number in range of [0, 2] (default: 1)
+            if alpha is 0, it becomes best first search; if alpha is 1, it is A*;
+            if alpha is 2, it becomes dijkstra algorithm.
+            Warning: be really careful to select alpha, because it trades off between
+            accuracy and speed.
+        size: integer (default: 16)
+            side length of the clusters in cells.
+
+        Attributes:
+        abstraction: the ClusterAbstraction of the current graph. It is built when
+            a graph is set, loaded from the map directory of graphs opened by
+            load_grid when it was saved there, and updated for the clusters whose
+            cells changed when another map of the same shape, or a new version of
+            the map (e.g. after GridMap.block), is searched. Graphs without cell
+            weights get a new abstraction instead, as their changes cannot be
+            located. save writes it to the map directory.
+        """
+        super().__init__(heuristic=heuristic, alpha=alpha)
+        self.size = size
+        self.abstraction = None
+
+    def _setGraph(self, graph):
+        super()._setGraph(graph)
+        if self.graph is None:
+            return
+        if self.graph.cells is None:
+            raise ValueError('hierarchical path-finding needs a graph laid on a grid')
+        if self.abstraction is not None and self.abstraction.digest == self.graph.digest():
+            return
+
+        abstraction = self.abstraction
+        if abstraction is None or abstraction.shape != self.graph.shape:
+            path = self.graph.path
+            if path is not None and os.path.exists(os.path.join(path, 'abstraction.npz')):
+                abstraction = ClusterAbstraction.load(path)
+            else:
+                abstraction = None
+        if (abstraction is None or abstraction.size != self.size
+                or self.graph.cellweight is None):
+            self.abstraction = ClusterAbstraction(self.graph, self.size)
+        else:
+            abstraction.update(self.graph)
+            self.abstraction = abstraction
+
+    def save(self, path=None):
+        """Save the abstraction of the current graph next to its map, so that the
+        planners of other processes load it instead of building it again.
+        Params:
+        path: str (default: None)
+            the map directory written by save_grid, default the directory the
+            graph was opened from by load_grid.
+        """
+        if self.abstraction is None:
+            raise ValueError('graph is not initialized')
+        path = self.graph.path if path is None else path
+        if path is None:
+            raise ValueError('the graph was not opened by load_grid, give the map directory')
+        self.abstraction.save(path)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['abstraction'] = None
+        return state
+
+    def _cell(self, node):
+        return node[0]*self.graph.shape[1] + node[1]
+
+    def _node(self, cell):
+        return divmod(cell, self.graph.shape[1])
+
+    def _connect(self, cell):
+        """ edges from a cell to the entrances of its cluster"""
+        cluster = self.abstraction.cluster(cell)
+        entrances = self.abstraction.entrances(cluster)
+        dist, _ = self.abstraction.search(self.graph, cell, cluster, entrances)
+        return [(e, dist[e]) for e in entrances if e in dist]
+
+    def _tableSize(self):
+        """ the abstract graph is small and sparse among the cells, so the searches
+        use dictionaries"""
+        return None
+
+    def _abstractSearch(self, source, target):
+        """A* search on the abstract graph with the source and target inserted.
+        Returns:
+        a list of cells from source to target, or None if none is found.
+        """
+        adj = self.abstraction.graph()
+        extra = dd(list)
+        for e, d in self._connect(source):
+            extra[source].append((e, d))
+        for e, d in self._connect(target):
+            extra[e].append((target, d))
+
+        self.nodes = self._workspace(1)[0]
+        self.open = self._queue()
+        self.open.add(source, 0)
+        self.nodes.set(source, 0, 0, None)
+        while self.open.cnt > 0:
+            node = self.open.pop()
+            if node == target:
+                path = [node]
+                while self.nodes.parent(path[-1]) is not None:
+                    path.append(self.nodes.parent(path[-1]))
+                return path[::-1]
+            for neighbor, weight in adj.get(node, []) + extra.get(node, []):
+                self._relax(node, neighbor, weight)
+        return None
+
+    def _relax(self, u, v, weight):
+        """Perform edge relaxation on the abstract graph.
+        Params:
+        u, v: flat cell indices of the nodes u and v
+        weight: an integer/float number, weight of the edge (u, v)
+        """
+        g_val = self.nodes.g(u) + weight
+        if g_val < self.nodes.g(v):
+            h_val = self.h(self._node(v), self.target)
+            f_val = self.alpha*g_val + (2-self.alpha)*h_val
+            self.nodes.set(v, g_val, f_val, u)
+            self.open.add(v, f_val)
+
+    def _localPath(self, u, v):
+        """ cells of the shortest path from u to v inside the cluster of u"""
+        cluster = self.abstraction.cluster(u)
+        dist, parent = self.abstraction.search(self.graph, u, cluster, {v})
+        if v not in dist:
+            return None
+        path = [v]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        return path[::-1]
+
+    def _refine(self, points):
+        """ expand a path on the abstract graph into a path of cells, None if a
+        cluster cannot be crossed"""
+        cluster = self.abstraction.cluster
+        path = [points[0]]
+        for u, v in zip(points[:-1], points[1:]):
+            if u == v:
+                continue
+            if cluster(u) == cluster(v):
+                local = self._localPath(u, v)
+                if local is None:
+                    return None
+                path.extend(local[1:])
+            else:
+                # transitions connect two adjacent cells
+                path.append(v)
+        return path
+
+    def _weight(self, path):
+        """ sum the edge weights along a path of cells step by step"""
+        weight = 0
+        for u, v in zip(path[:-1], path[1:]):
+            v = self.graph.to_id(self._node(v))
+            weight += dict(self.graph.neighbors(self.graph.to_id(self._node(u))))[v]
+        return weight
+
+    def plan(self, source, target, graph=None):
+        """Find path with hierarchical path-finding
+        Params:
+        source: a tuple representing the coordinates of the source node
+        target: a tuple representing the coordinates of the target node
+        graph: a CSRGraph laid on a grid or a networkx graph from arr2grid
+        Returns:
+        (path, weight): a tuple
+            path is a list of nodes in the path from source to target, and
+            weight is an integer/float number denoting the cumulative weights of the path.
+            For an unaccessible target return [] as path and None as weight.
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        if isinstance(target, (list, set, frozenset)):
+            raise ValueError('hierarchical path-finding plans to a single target')
+        self.source = source
+        self.target = target
+
+        # check source and target
+        if self.source not in self.graph:
+            raise ValueError('Invalid source. Source not in the graph')
+        if self.target not in self.graph:
+            raise ValueError('Invalid target. Target not in the graph')
+        # the search on the abstract graph is profiled, not the ones in clusters
+        self._startStats(self._node)
+        self._callHeuristic(step=1.0, diag=1.4)
+
+        s, t = self._cell(source), self._cell(target)
+        candidates = []
+        # inside one cluster, the direct path may beat the one through entrances.
+        if self.abstraction.cluster(s) == self.abstraction.cluster(t):
+            local = self._localPath(s, t)
+            if local is not None:
+                candidates.append(local)
+        points = self._abstractSearch(s, t)
+        if points is not None:
+            points = self._refine(points)
+        if points is not None:
+            candidates.append(points)
+        if not candidates:
+            return ([], None)
+
+        routes = [([self._node(c) for c in path], self._weight(path)) for path in candidates]
+        return min(routes, key=lambda route: route[1])
+
+    def multi_plan(self, pairs, graph):
+        """ Process multiple source-target pairs in one map
+        Params:
+        pairs: list of tuple in the form of [(source_1, target_1),(source_2, target_2)...]
+        graph: a CSRGraph laid on a grid or a networkx graph from arr2grid
+        Returns:
+        routes: a list of (path, weight) in the same order as pairs
+        """
+        self._setGraph(graph)
+        return [self.plan(source, target) for source, target in pairs]
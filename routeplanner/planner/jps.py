@@ -0,0 +1,309 @@
+import numpy as np
+
+from .astar import AStar
+from ..utils.csrgraph import CSRGraph
+from ..utils.misc import arr2grid, DIAG_FACTOR
+
+
+class JumpPointSearch(AStar):
+    def __init__(self, heuristic='octile', alpha=1, diagonal=True):
+        """
+        Jump point search on uniform-cost grids. Instead of pushing every neighbor,
+        it jumps along straight and diagonal lines and only adds the cells where
+        the optimal path may turn (jump points) to the open list.
+        Params:
+        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null','landmarks'} (default: 'octile')
+            methods to compute heuristic.
+        alpha: a number in range of [0, 2] (default: 1)
+            if alpha is 0, it becomes best first search; if alpha is 1, it is A*;
+            if alpha is 2, it becomes dijkstra algorithm.
+            Warning: be really careful to select alpha, because it trades off between
+            accuracy and speed.
+        diagonal: bool (default: True)
+            connectivity used when the graph is given as an array. Graphs built by
+            arr2grid carry their own connectivity.
+        """
+        super().__init__(heuristic=heuristic, alpha=alpha)
+        self.diagonal = diagonal
+        self._array = None
+        self._walk = None
+        # (token, version) of the graph _walk was compiled from
+        self._compiled = None
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_array'] = None
+        state['_walk'] = None
+        state['_compiled'] = None
+        return state
+
+    def _setGraph(self, graph):
+        """ set the grid to search on
+        Params:
+        graph: a binarized array (1 is walkable, 0 is block), a CSRGraph built by
+            arr2grid or a networkx graph. The weight of the walkable cells must be
+            uniform. The grid is compiled again when the graph is mutated (a new
+            version, e.g. GridMap.block) or an array with other cells is given.
+        """
+        if isinstance(graph, (np.ndarray, list)):
+            if self._array is None or not np.array_equal(self._array, graph):
+                self._array = np.array(graph)
+                super()._setGraph(arr2grid(graph, self.diagonal, 1, create_using=CSRGraph))
+        elif graph is not None:
+            if graph is not self.graph:
+                self._array = None
+            super()._setGraph(graph)
+        if self.graph is not None and self._compiled != (self.graph.token, self.graph.version):
+            self._compile()
+
+    def _compile(self):
+        """ lay the walkable cells of the graph out as a padded flat byte string"""
+        graph = self.graph
+        if graph.cells is None:
+            raise ValueError('jump point search needs a graph laid on a grid')
+        walkable = graph.walkable
+
+        if graph.cellweight is not None:
+            cost = np.unique(np.asarray(graph.cellweight)[walkable])
+            if len(cost) > 1:
+                raise ValueError('jump point search needs uniform cell weights')
+            cost = cost[0] if len(cost) else 1
+            step = (cost+cost)/2
+            diag = DIAG_FACTOR*step
+            diagonal = bool(graph.diagonal)
+        else:
+            # graphs adapted from networkx only have edge weights.
+            weights = np.unique(graph.weights)
+            step = weights[0] if len(weights) else 1
+            diag = DIAG_FACTOR*step
+            if not np.all(np.isin(weights, [step, diag])):
+                raise ValueError('jump point search needs uniform cell weights')
+            diagonal = bool(np.any(weights == diag))
+
+        m, n = graph.shape
+        # pad one blocked cell on every side so that neighbors never leave the grid.
+        padded = np.zeros((m+2, n+2), dtype=np.uint8)
+        padded[1:-1, 1:-1] = walkable
+        self._walk = padded.tobytes()
+        self._width = n+2
+        self._step = float(step)
+        self._diag = float(diag)
+        self._diagonal = diagonal
+        self._compiled = (graph.token, graph.version)
+
+    def _index(self, node):
+        """ flat index of a cell in the padded grid, a Python integer also for
+        numpy coordinates (e.g. from np.argwhere)"""
+        return (int(node[0])+1)*self._width + int(node[1])+1
+
+    def _cell(self, i):
+        """ coordinates of a flat index in the padded grid"""
+        r, c = divmod(i, self._width)
+        return (r-1, c-1)
+
+    def _tableSize(self):
+        """ the searches run over the flat indices of the padded grid"""
+        return len(self._walk)
+
+    def _jump(self, i, dr, dc):
+        """Walk from cell i in direction (dr, dc) until a jump point is found.
+        Returns:
+        the flat index of the jump point, or None if the walk hits a block.
+        """
+        walk = self._walk
+        W = self._width
+        goals = self._targets
+        d = dr*W + dc
+        while True:
+            if not walk[i]:
+                return None
+            if i in goals:
+                return i
+            if self._diagonal:
+                if dr and dc:
+                    if ((walk[i+dr*W-dc] and not walk[i-dc]) or
+                            (walk[i-dr*W+dc] and not walk[i-dr*W])):
+                        return i
+                    # a diagonal move stops where a straight jump finds a jump point
+                    if (self._jump(i+dc, 0, dc) is not None or
+                            self._jump(i+dr*W, dr, 0) is not None):
+                        return i
+                elif dc:
+                    if ((walk[i+W+dc] and not walk[i+W]) or
+                            (walk[i-W+dc] and not walk[i-W])):
+                        return i
+                else:
+                    if ((walk[i+d+1] and not walk[i+1]) or
+                            (walk[i+d-1] and not walk[i-1])):
+                        return i
+            else:
+                if dc:
+                    if ((walk[i-W] and not walk[i-W-dc]) or
+                            (walk[i+W] and not walk[i+W-dc])):
+                        return i
+                else:
+                    if ((walk[i-1] and not walk[i-1-d]) or
+                            (walk[i+1] and not walk[i+1-d])):
+                        return i
+                    # a vertical move stops where a horizontal jump finds a jump point
+                    if (self._jump(i+1, 0, 1) is not None or
+                            self._jump(i-1, 0, -1) is not None):
+                        return i
+            i += d
+
+    def _directions(self, i):
+        """Directions to jump to from node i after pruning the neighbors which
+        are reached at least as cheaply through its parent."""
+        walk = self._walk
+        W = self._width
+        parent = self.nodes.parent(i)
+        if parent is None:
+            if self._diagonal:
+                return [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+            return [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+        pr, pc = divmod(parent, W)
+        r, c = divmod(i, W)
+        dr = (r > pr) - (r < pr)
+        dc = (c > pc) - (c < pc)
+        if self._diagonal:
+            if dr and dc:
+                dirs = [(dr, 0), (0, dc), (dr, dc)]
+                if not walk[i-dc]:
+                    dirs.append((dr, -dc))
+                if not walk[i-dr*W]:
+                    dirs.append((-dr, dc))
+            elif dc:
+                dirs = [(0, dc)]
+                if not walk[i+W]:
+                    dirs.append((1, dc))
+                if not walk[i-W]:
+                    dirs.append((-1, dc))
+            else:
+                dirs = [(dr, 0)]
+                if not walk[i+1]:
+                    dirs.append((dr, 1))
+                if not walk[i-1]:
+                    dirs.append((dr, -1))
+        else:
+            if dc:
+                dirs = [(0, dc), (1, 0), (-1, 0)]
+            else:
+                dirs = [(dr, 0), (0, 1), (0, -1)]
+        return dirs
+
+    def _segment(self, u, v):
+        """ (weight of a step, number of steps) of the straight or diagonal
+        segment between two jump points"""
+        ur, uc = divmod(u, self._width)
+        vr, vc = divmod(v, self._width)
+        dr, dc = abs(vr-ur), abs(vc-uc)
+        return (self._diag if dr and dc else self._step), max(dr, dc)
+
+    def _relax(self, u, v, weight, steps=1):
+        """Perform relaxation of the segment between the jump points u and v.
+        The weights of the steps are added one by one, like the edges relaxed by
+        the other planners, so the costs are equal to the last digit.
+        Params:
+        u, v: flat indices of the jump points in the padded grid
+        weight: an integer/float number, weight of a step of the segment (u, v)
+        steps: integer (default: 1), number of steps of the segment
+        """
+        g_val = self.nodes.g(u)
+        for _ in range(steps):
+            g_val += weight
+        if g_val < self.nodes.g(v):
+            h_val = self.h(self._cell(v), self.target)
+            f_val = self.alpha*g_val + (2-self.alpha)*h_val
+            self.nodes.set(v, g_val, f_val, u)
+            self.open.add(v, f_val)
+
+    def _expand(self, node):
+        """Jump from node in every direction left after pruning"""
+        W = self._width
+        for dr, dc in self._directions(node):
+            jp = self._jump(node+dr*W+dc, dr, dc)
+            if jp is not None:
+                self._relax(node, jp, *self._segment(node, jp))
+
+    def _findPath(self, node, table):
+        """Find path from the lookup table, filling the cells between jump points.
+        Params:
+        node: a flat index of the node in the padded grid
+        table: the SearchTable self.nodes
+        Returns:
+        path: a list of cells in the shortest path from start to node.
+        weight: a integer/floating number denoting the cumulative weights of the
+            path, summed step by step like the other planners. It is the g value
+            of node, see _relax.
+        """
+        points = [node]
+        while table.parent(points[-1]) is not None:
+            points.append(table.parent(points[-1]))
+        points = points[::-1]
+
+        W = self._width
+        path = [points[0]]
+        weight = 0
+        for u, v in zip(points[:-1], points[1:]):
+            ur, uc = divmod(u, W)
+            vr, vc = divmod(v, W)
+            dr = (vr > ur) - (vr < ur)
+            dc = (vc > uc) - (vc < uc)
+            step = self._diag if dr and dc else self._step
+            for _ in range(max(abs(vr-ur), abs(vc-uc))):
+                path.append(path[-1] + dr*W + dc)
+                weight += step
+        return ([self._cell(i) for i in path], weight)
+
+    def plan(self, source, target, graph=None):
+        """Find path with jump point search
+        Params:
+        source: a tuple representing the coordinates of the source node
+        target: a tuple representing the coordinates of the target node, or a list
+            (or set) of them to find the path to the cheapest one
+        graph: a binarized array, a CSRGraph built by arr2grid or a networkx graph
+            with uniform cell weights
+        Returns:
+        (path, weight): a tuple
+            path is a list of nodes in the shortest path from source to target, and
+            weight is an integer/float number denoting the cumulative weights of the path.
+            For an unaccessible target return [] as path and None as weight.
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        self.source = source
+
+        # check source and target
+        if self.source not in self.graph:
+            raise ValueError('Invalid source. Source not in the graph')
+        self._setTarget(target)
+        target = self.target
+
+        route = self._lookup(source, target)
+        if route is not None:
+            return route
+
+        self._source = self._index(self.source)
+        self._targets = {self._index(t) for t in self._targetNodes()}
+        self._startStats(self._cell)
+        self.nodes = self._workspace(1)[0]
+        self.open = self._queue()
+        self.open.add(self._source, 0)
+        self.nodes.set(self._source, 0, 0, None)
+        self._callHeuristic(step=1.0, diag=1.4)
+
+        while self.open.cnt > 0:
+            node = self.open.pop()
+            if node in self._targets:
+                return self._store(source, target, self._findPath(node, self.nodes))
+            self._expand(node)
+
+        # if no such path exists return None
+        return self._store(source, target, ([], None))
+
+    def _multiPlan(self, pairs):
+        """Process source-target pairs one by one, since the jump points depend
+        on the target."""
+        return [self.plan(source, target) for source, target in pairs]
@@ -1,17 +1,41 @@
 import math
-from collections import defaultdict as dd
-
+import os
+import weakref
 import numpy as np
-import networkx as nx
 
-from utils.priorq import priorq
-from utils.heuristic import heuristic2D
+from ..utils.priorq import priorq, IndexedHeap
+from ..utils.heuristic import heuristic2D
+from ..utils.csrgraph import CSRGraph
+from ..utils.landmarks import Landmarks
+from ..utils.stats import SearchStats, ProfiledQueue, profiled
+from ..utils.workspace import SearchTable, DictTable
+
+# mapping networkx graph to (number of nodes, its CSRGraph conversion), see _adapt
+_NXGRAPHS = weakref.WeakKeyDictionary()
+
+
+def _adapt(graph):
+    """ the CSRGraph conversion of a networkx graph, converted again when the
+    number of nodes changed"""
+    size, converted = _NXGRAPHS.get(graph, (None, None))
+    if converted is None or size != len(graph):
+        converted = CSRGraph.from_networkx(graph)
+        _NXGRAPHS[graph] = (len(graph), converted)
+    return converted
+
 
 class RoutePlanner(object):
+    # attributes holding the graph, the state of the last search or the route
+    # cache. They are not pickled, so a planner can be sent to worker processes
+    # without its map.
+    _TRANSIENT = ('graph', '_nxgraph', 'source', 'target', '_source', '_target', '_targets', 'h',
+                  'nodes', 'nodes_inv', 'open', 'open_inv', 'close', 'close_inv', 'cache',
+                  '_profiling', '_coords', '_tables')
+
     def __init__(self, heuristic='manhattan', alpha=1):
         """
         Params:
-        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null'} (default: 'manhattan')
+        heuristic: {'manhattan', 'chebyshev', 'octile','euclidean','null','landmarks'} (default: 'manhattan')
             methods to compute heuristic.
         alpha: a number in range of [0, 2] (default: 1)
             if alpha is 0, it becomes best first search; if alpha is 1, it is A*;
@@ -20,100 +44,541 @@ class RoutePlanner(object):
             accuracy and speed.
         
         Attributes:
-        graph: a networkx graph object
+        graph: a CSRGraph object. networkx graphs are adapted when they are given.
         source: a tuple representing the coordinates of the source node
-        target: a tuple or a list of tuple representing the coordinates of the target node
+        target: a tuple or a list of tuple representing the coordinates of the target node.
+            With a list (or a set) of targets, plan finds the path to the cheapest one.
         MAX: a constant representing the weight of an unwalkable edge
+        landmarks: a Landmarks object used by the 'landmarks' heuristic. If it is not
+            set, or was computed on another map (see Landmarks.digest), it is
+            loaded from the map directory of graphs opened by load_grid when it
+            was built there for this map, or built in memory for the current graph.
+        cache: a RouteCache (default: None). When it is set, the routes planned are
+            stored in it and repeated queries are answered from it. Entries are
+            keyed by the version of the map, so replacing the graph or mutating it
+            through CSRGraph.set_weight/touch or GridMap.set_weights/block/unblock
+            invalidates them. A cache can be shared by several planners.
+        profile: bool (default: False). When it is True, every search started by
+            plan records its counters into a new SearchStats in stats.
+        on_expand: a function called with (node, priority) for every node popped
+            from the open lists (default: None). Setting it profiles the search too.
+        stats: the SearchStats of the last profiled search, else None.
+        queue: the class (or any function without argument) of the open lists
+            (default: priorq). IndexedHeap updates priorities in place, and
+            BucketQueue, e.g. functools.partial(BucketQueue, resolution=2), suits
+            Dijkstra's algorithm on integer or fixed-step weights.
+        engine: {'python', 'numba'} (default: 'python'). With 'numba', the searches
+            of Dijkstra.plan and BiDijkstra.plan run compiled over the arrays of
+            the CSRGraph (see utils.kernel) when Numba is installed, and return the
+            same routes. The Python code runs without Numba and for the searches
+            the kernels do not cover: profiled ones, the 'landmarks' heuristic,
+            queues other than priorq and IndexedHeap, custom relaxations and graph
+            views.
+        nodes, nodes_inv: the SearchTable of the g values and parents of the last
+            search (and of its reverse search). The tables are allocated once per
+            planner and map and reused by the following searches.
         """
         self.heuristic = heuristic
         self.alpha = alpha
         self.graph = None
+        self._nxgraph = None
         self.source = None
         self.target = None
         self.MAX = math.inf
+        self.landmarks = None
+        self.cache = None
+        self.profile = False
+        self.on_expand = None
+        self.stats = None
+        self._profiling = None
+        self.queue = priorq
+        self.engine = 'python'
+        self._coords = None
+        # the graph, the size and the tables of the searches, see _workspace
+        self._tables = None
         
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self._TRANSIENT:
+            if name in state:
+                state[name] = None
+        # the counting wrapper installed by _startStats
+        state.pop('_relax', None)
+        return state
+
+    def _setGraph(self, graph):
+        """ set the graph to search on
+        Params:
+        graph: a CSRGraph object, a graph view with the same interface (to_id,
+            to_node, neighbors, __contains__, e.g. a TiledGraph) or a networkx graph
+            object. A networkx graph is converted once and the conversion is
+            shared by the planners, it is converted again when its number of
+            nodes changed. Call refresh after other changes (edges or weights).
+        """
+        if graph is None:
+            return
+        if isinstance(graph, CSRGraph) or hasattr(graph, 'to_id'):
+            if graph is not self.graph:
+                self.graph = graph
+                self._nxgraph = None
+        else:
+            self.graph = _adapt(graph)
+            self._nxgraph = graph
+
+    def refresh(self, graph=None):
+        """Convert a networkx graph again after it was mutated in place, e.g. its
+        edges or their weights changed. The conversion is kept, with the tables
+        and routes cached for it, when the content is the same.
+        Params:
+        graph: a networkx graph (default: None, the graph of the last search)
+        """
+        graph = self._nxgraph if graph is None else graph
+        if graph is None or isinstance(graph, CSRGraph) or hasattr(graph, 'to_id'):
+            return
+        old = _NXGRAPHS.pop(graph, (None, None))[1]
+        converted = _adapt(graph)
+        if old is not None and converted.digest() == old.digest():
+            _NXGRAPHS[graph] = (len(graph), old)
+            converted = old
+        if graph is self._nxgraph:
+            self.graph = converted
+
     def _callHeuristic(self, step=10, diag=14):
         """ function to initialize specific heuristic"""
-        h = heuristic2D(step, diag)
-        name2func = {'manhattan': h.manhattan,
-                    'chebyshev': h.chebyshev,
-                    'octile': h.octile,
-                    'euclidean': h.euclidean,
-                    'null': h.null}
-        self.h = name2func[self.heuristic]
+        if self.heuristic == 'landmarks':
+            self.h = self._landmarkHeuristic()
+        else:
+            h = heuristic2D(step, diag)
+            name2func = {'manhattan': h.manhattan,
+                        'chebyshev': h.chebyshev,
+                        'octile': h.octile,
+                        'euclidean': h.euclidean,
+                        'null': h.null}
+            self.h = name2func[self.heuristic]
+            if isinstance(self.target, list) and self.heuristic != 'null':
+                self.h = self._nearestHeuristic(self.h, self.target)
+        if self._profiling is not None:
+            self.h = profiled(self.h, self._profiling[0])
             
+    def _nearestHeuristic(self, func, targets):
+        """ heuristic to the nearest of several targets, which are converted to an
+        array once per search instead of on every call"""
+        goals = np.asarray(targets)
+        def h(u, v):
+            return func(u, goals if v is targets else v)
+        return h
+
+    def _landmarkHeuristic(self):
+        """ ALT heuristic of the current graph, reading two rows of the tables"""
+        landmarks = self.landmarks
+        # tables of another map, or of an older version of this one, overestimate
+        digest = self.graph.digest()
+        if landmarks is None or landmarks.digest != digest:
+            path = self.graph.path
+            landmarks = None
+            if path is not None and os.path.exists(os.path.join(path, 'landmarks.npy')):
+                landmarks = Landmarks.load(path)
+                if landmarks.digest != digest:
+                    landmarks = None
+            if landmarks is None:
+                landmarks = Landmarks.build(self.graph)
+            self.landmarks = landmarks
+        to_id = self.graph.to_id
+        def h(u, v):
+            if isinstance(v, list):
+                return min(landmarks.estimate(to_id(u), to_id(t)) for t in v)
+            return landmarks.estimate(to_id(u), to_id(v))
+        return h
+
+    def _cacheKey(self, source, target):
+        if isinstance(target, list):
+            target = frozenset(target)
+        return (self.graph.token, self.graph.version, type(self).__name__,
+                self.heuristic, self.alpha, source, target)
+
+    def _lookup(self, source, target):
+        """Look the route from source to target up in the cache.
+        On undirected graphs the route of the reversed pair is reversed.
+        Returns:
+        (path, weight), or None if there is no cache or the route is not in it
+        """
+        if self.cache is None:
+            return None
+        # both pairs are looked up, and the lookup is counted once
+        route = self.cache.get(self._cacheKey(source, target), count=False)
+        if route is not None:
+            route = (list(route[0]), route[1])
+        elif not self.graph.directed and source != target and not isinstance(target, list):
+            route = self.cache.get(self._cacheKey(target, source), count=False)
+            if route is not None:
+                route = (route[0][::-1], route[1])
+        self.cache.record(route is not None)
+        return route
+
+    def _store(self, source, target, route):
+        """ store a route in the cache if there is one, and return it"""
+        if self.cache is not None:
+            self.cache.put(self._cacheKey(source, target), (list(route[0]), route[1]))
+        return route
+
+    def _kernelArgs(self, relax):
+        """Arguments of the search kernels for the current graph and target.
+        Params:
+        relax: the _relax method the kernels reproduce
+        Returns:
+        (graph arrays, node coordinates, target coordinates, heuristic arguments),
+        or None when the Python code must run
+        """
+        if self.engine != 'numba':
+            return None
+        # Numba is only imported when the kernels are asked for
+        from ..utils import kernel
+        if (not kernel.HAVE_NUMBA or self.profile
+                or self.on_expand is not None or self.heuristic not in kernel.HEURISTICS
+                or self.queue not in (priorq, IndexedHeap) or type(self)._relax is not relax
+                or not isinstance(self.graph, CSRGraph)):
+            return None
+        graph = self.graph
+        if self._coords is None or self._coords[0] != graph.token:
+            self._coords = (graph.token, kernel.coordinates(graph))
+        coords = self._coords[1]
+        if coords is None:
+            if self.heuristic != 'null':
+                return None
+            coords = (np.zeros(len(graph)), np.zeros(len(graph)))
+        rows, cols = coords
+        targets = np.array([graph.to_id(t) for t in self._targetNodes()], dtype=np.int64)
+        return ((graph.indptr, graph.indices, graph.weights), (rows, cols),
+                (rows[targets], cols[targets]),
+                (kernel.HEURISTICS[self.heuristic], 1.0, 1.4, float(self.alpha)))
+
+    def _kernelPath(self, parent, node):
+        """ the nodes of the path to node in a parent array of a kernel"""
+        from ..utils import kernel
+        return [self.graph.to_node(i) for i in kernel.trace(parent, node).tolist()]
+
+    def _startStats(self, to_node=None):
+        """Prepare the counters of a new search when it is profiled.
+        The open lists and _relax are wrapped for this search only, so searches
+        which are not profiled run the plain code.
+        Params:
+        to_node: a function mapping the entries of the open lists to the nodes
+            given to on_expand (default: None, graph.to_node), for the searches
+            which do not run over the node ids of the graph.
+        """
+        if not self.profile and self.on_expand is None:
+            self._profiling = None
+            self.__dict__.pop('_relax', None)
+            return
+        stats = self.stats = SearchStats()
+        callback = None
+        if self.on_expand is not None:
+            to_node = self.graph.to_node if to_node is None else to_node
+            on_expand = self.on_expand
+            callback = lambda node, priority: on_expand(to_node(node), priority)
+        self._profiling = (stats, set(), callback)
+
+        relax = type(self)._relax.__get__(self)
+        def counted(*args):
+            stats.relax_calls += 1
+            pushes = stats.pushes
+            relax(*args)
+            # a relaxation is successful when it pushes the node
+            if stats.pushes != pushes:
+                stats.relaxed += 1
+        self._relax = counted
+
+    def _queue(self, queue=None):
+        """An open list, counted when the search is profiled.
+        Params:
+        queue: the priority queue to count (default: None, a new one of self.queue)
+        """
+        if queue is None:
+            queue = self.queue()
+        if self._profiling is None:
+            return queue
+        stats, expanded, callback = self._profiling
+        return ProfiledQueue(queue, stats, expanded, callback)
+
+    def _setTarget(self, target):
+        """Set the target of a search after checking it is in the graph.
+        Params:
+        target: a node, or a list or set of nodes to reach the cheapest of. A
+            set is stored as a list.
+        """
+        if isinstance(target, (list, set, frozenset)):
+            target = list(target)
+            if not target:
+                raise ValueError('Invalid target. No target given')
+            targets = target
+        else:
+            targets = [target]
+        for node in targets:
+            if node not in self.graph:
+                raise ValueError('Invalid target. Target not in the graph')
+        self.target = target
+
+    def _targetNodes(self):
+        """ the list of the target nodes, one or several"""
+        return self.target if isinstance(self.target, list) else [self.target]
+
+    def _tableSize(self):
+        """ the bound of the node ids of the searches, None when it is unknown"""
+        return len(self.graph) if isinstance(self.graph, CSRGraph) else None
+
+    def _workspace(self, count):
+        """The tables of a new search on the current graph.
+        They are kept from search to search and only reset, so a query allocates
+        nothing per node. Graph views get dictionaries instead, as their ids are
+        not bounded by a size worth allocating.
+        Params:
+        count: integer, number of tables, 2 for a bidirectional search
+        Returns:
+        a list of count SearchTable (or DictTable), reset
+        """
+        size = self._tableSize()
+        if self._tables is None or self._tables[0] is not self.graph or self._tables[1] != size:
+            self._tables = (self.graph, size, [])
+        tables = self._tables[2]
+        while len(tables) < count:
+            tables.append(DictTable() if size is None else SearchTable(size))
+        for table in tables[:count]:
+            table.reset()
+        return tables[:count]
+
     def _init(self, bi_direct=False):
         """Initialize single source"""
-        # initialize a nested dictionary with default values of g_val, f_val and parent
-        self.nodes = dd(lambda: {'g': self.MAX, 'f': self.MAX, 'parent': None})
+        self._startStats()
+        # node ids of source and targets in the graph, _target is None when
+        # there are several targets
+        self._source = self.graph.to_id(self.source)
+        self._targets = {self.graph.to_id(t) for t in self._targetNodes()}
+        self._target = None if isinstance(self.target, list) else self.graph.to_id(self.target)
+        # the reused tables of g_val, f_val and parent
+        tables = self._workspace(2 if bi_direct else 1)
+        self.nodes = tables[0]
         # initialize a priority queue of nodes to be checked aka. frontiers/ open list
-        self.open = priorq() 
+        self.open = self._queue()
         # initialize source node
-        self.open.add(self.source, 0)
+        self.open.add(self._source, 0)
         
-        self.nodes[self.source]['g'] = 0
+        self.nodes.set(self._source, 0, 0, None)
         
         # if bi_direct is True, initialize both source and target
         if bi_direct:
             
             # initialize lookup table and open list
-            self.nodes_inv = dd(lambda: {'g': self.MAX, 'f': self.MAX, 'parent': None})
-            self.open_inv = priorq()
+            self.nodes_inv = tables[1]
+            self.open_inv = self._queue()
             
-            # initialize target node
-            self.open_inv.add(self.target, 0)
-            self.nodes_inv[self.target]['g'] = 0
+            # initialize the target nodes, the reverse search starts from all of them
+            for target in self._targets:
+                self.open_inv.add(target, 0)
+                self.nodes_inv.set(target, 0, 0, None)
 
             # initialize sets of checked nodes.
-            self.close = set()
-            self.close_inv = set()
+            self.close = self.nodes.closed
+            self.close_inv = self.nodes_inv.closed
             
-    def _relax(self, u, v):
+    def _relax(self, u, v, weight):
         """Perform edge relaxation. 
         Params:
-        u: a tuple representing the coordinates of the node u
-        v: a tuple representing the coordinates of the node v
+        u: an integer id of the node u
+        v: an integer id of the node v
+        weight: an integer/float number, weight of the edge (u, v)
         """
+        nodes = self.nodes
         # g_val is the tentative actual distance from node v to source node via u.
-        g_val = self.nodes[u]['g'] + self.graph[u][v]['weight']
+        g_val = nodes.g(u) + weight
                
         # Relax node v from node u.
-        if g_val < self.nodes[v]['g']:
+        if g_val < nodes.g(v):
             
             # h_val is the heuristic (a guess value) of distance from v to target
-            h_val = self.h(v, self.target)
+            h_val = self.h(self.graph.to_node(v), self.target)
 
             # f_val is the combined score of both distances.
             # f_val is slightly different from the textbook version by a alpha factor.
             f_val = self.alpha*g_val + (2-self.alpha)*h_val            
             
             # update node status lookup table
-            self.nodes[v]['g'] = g_val
-            self.nodes[v]['f'] = f_val
-            self.nodes[v]['parent'] = u
+            nodes.set(v, g_val, f_val, u)
             
             # if node is unvisited or is closed but can be accessed in a cheaper way,
-            # add to the open priority queue.
-            if v not in self.open:
-                self.open.add(v, f_val)
-                    
+            # add to the open priority queue. If it is already open, update its priority.
+            self.open.add(v, f_val)
+
+    def _expand(self, node):
+        """Relax all the neighbors of node from source"""
+        for neighbor, weight in self.graph.neighbors(node):
+            self._relax(node, neighbor, weight)
+
+    def _planMany(self, source, targets):
+        """Find paths from one source to several targets with a single search.
+        The search is resumed for every target until it is settled, so the search
+        tree is shared by all the targets. It is only exact when nodes are popped
+        in the order of their g values, i.e. alpha is 2.
+        Params:
+        source: a tuple representing the coordinates of the source node
+        targets: a list of tuples representing the coordinates of the target nodes
+        Returns:
+        a list of (path, weight) in the order of targets
+        """
+        if source not in self.graph:
+            raise ValueError('Invalid source. Source not in the graph')
+        for target in targets:
+            if target not in self.graph:
+                raise ValueError('Invalid target. Target not in the graph')
+        self.source = source
+        self.target = targets[0]
+
+        self._init()
+        self._callHeuristic(step=1.0, diag=1.4)
+        # set of the settled nodes
+        self.close = self.nodes.closed
+
+        res = []
+        for target in targets:
+            target = self.graph.to_id(target)
+            # resume the search until the target is settled
+            while target not in self.close and self.open.cnt > 0:
+                node = self.open.pop()
+                self.close.add(node)
+                self._expand(node)
+            if target in self.close:
+                res.append(self._findPath(target, self.nodes))
+            else:
+                res.append(([], None))
+        return res
+
+    def _multiPlan(self, pairs):
+        """Process source-target pairs by grouping them by source.
+        Pairs sharing a source are solved by one search with _planMany, except
+        those answered by the cache and those with several targets. Searches
+        guided by a heuristic (alpha other than 2) are target specific, so they
+        fall back to one plan per pair.
+        Params:
+        pairs: list of tuple in the form of [(source_1, target_1),(source_2, target_2)...]
+        Returns:
+        a list of (path, weight) in the order of pairs
+        """
+        if self.alpha != 2:
+            return [self.plan(source, target) for source, target in pairs]
+
+        groups = {}
+        res = [None]*len(pairs)
+        for i, (source, target) in enumerate(pairs):
+            if isinstance(target, (list, set, frozenset)):
+                res[i] = self.plan(source, target)
+                continue
+            res[i] = self._lookup(source, target)
+            if res[i] is None:
+                groups.setdefault(source, []).append(i)
+        for source, idx in groups.items():
+            routes = self._planMany(source, [pairs[i][1] for i in idx])
+            for i, route in zip(idx, routes):
+                res[i] = self._store(source, pairs[i][1], route)
+        return res
+
+    def _settle(self, source, targets):
+        """Dijkstra's search from source, pruned once every target is settled.
+        Params:
+        source: an integer id of the source node
+        targets: a collection of integer ids of the target nodes
+        Returns:
+        (dist, parent): dictionaries of the g values and the parents of the nodes
+            reached
+        """
+        dist = {source: 0}
+        parent = {source: None}
+        queue = self._queue()
+        queue.add(source, 0)
+        left = set(targets)
+        while queue.cnt > 0 and left:
+            node = queue.pop()
+            left.discard(node)
+            g_node = dist[node]
+            for neighbor, weight in self.graph.neighbors(node):
+                g_val = g_node + weight
+                if g_val < dist.get(neighbor, self.MAX):
+                    dist[neighbor] = g_val
+                    parent[neighbor] = node
+                    queue.add(neighbor, g_val)
+        return dist, parent
+
+    def _checkNodes(self, sources, targets):
+        """ validate the nodes of a matrix and map them to ids"""
+        for source in sources:
+            if source not in self.graph:
+                raise ValueError('Invalid source. Source not in the graph')
+        for target in targets:
+            if target not in self.graph:
+                raise ValueError('Invalid target. Target not in the graph')
+        return ([self.graph.to_id(source) for source in sources],
+                [self.graph.to_id(target) for target in targets])
+
+    def distance_matrix(self, sources, targets, graph=None, paths=False):
+        """Compute the costs of the shortest paths between all sources and targets.
+        One search per source is shared by all the targets and stops once they
+        are all settled. The searches are Dijkstra's algorithm whatever the
+        heuristic and alpha, so the costs are exact.
+        Params:
+        sources: a list of tuples representing the coordinates of the source nodes
+        targets: a list of tuples representing the coordinates of the target nodes
+        graph: a CSRGraph object or a networkx graph object
+        paths: bool (default: False)
+            if True, the search trees are kept and a function route(i, j) is
+            returned too, which rebuilds the (path, weight) from sources[i] to
+            targets[j] when it is called.
+        Returns:
+        matrix: a float array of shape (len(sources), len(targets)), inf for the
+            unaccessible targets; or (matrix, route) if paths is True.
+        """
+        self._setGraph(graph)
+        if self.graph is None:
+            raise ValueError('graph is not initialized')
+        source_ids, target_ids = self._checkNodes(sources, targets)
+
+        matrix = np.full((len(sources), len(targets)), self.MAX)
+        # first row of every source, and its search tree if paths are asked for
+        rows, trees = {}, {}
+        for i, source in enumerate(source_ids):
+            if source in rows:
+                matrix[i] = matrix[rows[source]]
+                continue
+            rows[source] = i
+            dist, parent = self._settle(source, target_ids)
+            matrix[i] = [dist.get(target, self.MAX) for target in target_ids]
+            if paths:
+                trees[source] = (dist, parent)
+        if not paths:
+            return matrix
+
+        def route(i, j):
+            dist, parent = trees[source_ids[i]]
+            node = target_ids[j]
+            if node not in dist:
+                return ([], None)
+            path = [node]
+            while parent[path[-1]] is not None:
+                path.append(parent[path[-1]])
+            return ([self.graph.to_node(n) for n in path[::-1]], dist[node])
+        return matrix, route
 
     def _findPath(self, node, table):
         """Find path from the lookup table
         Params:
-        node: a tuple representing the coordinates of the node
-        table: a lookup table (either self.nodes or self.nodes_inv)
+        node: an integer id of the node
+        table: a SearchTable (either self.nodes or self.nodes_inv)
         Returns:
         path: a list of nodes in the shortest path from start to node.
         weight: a integer/floating number denoting the cumulative weights of the shortest path.
         """
         
-        current = node
-        parent = table[current]['parent']      
-        path = [current]
-        while parent != None:
-            path.append(parent)
-            current = parent
-            parent = table[current]['parent']
-        return (path[::-1], table[node]['g'])
+        parent = table.parent(node)
+        path = [self.graph.to_node(node)]
+        while parent is not None:
+            path.append(self.graph.to_node(parent))
+            parent = table.parent(parent)
+        return (path[::-1], table.g(node))
 
@@ -0,0 +1,339 @@
+import heapq
+import itertools
+import os
+
+import numpy as np
+
+
+class ClusterAbstraction(object):
+    """ abstract graph of a grid map split into square clusters (HPA*) """
+
+    def __init__(self, graph, size=16):
+        """
+        Params:
+        graph: a CSRGraph laid on a grid, e.g. built by arr2grid
+        size: integer (default: 16)
+            side length of the clusters in cells.
+
+        Attributes:
+        transitions: a dictionary {(cluster_a, cluster_b): [(cell_a, cell_b, weight), ...]}
+            edges crossing the border of two adjacent clusters which are kept as
+            entrances. Cells are flat (row-major) indices on the grid.
+        intra: a dictionary {cluster: {(cell_i, cell_j): distance}}
+            distances between the entrance cells of a cluster without leaving it.
+        digest: the CSRGraph.digest of the graph the abstraction was last built
+            or updated for.
+        """
+        self.size = size
+        self.shape = tuple(graph.shape)
+        self.transitions = {}
+        self.intra = {}
+        self._index()
+        self._snapshot(graph)
+        self.build(graph)
+
+    def _index(self):
+        """ index the transitions by cluster and drop the derived adjacencies"""
+        # mapping cluster to the keys of self.transitions it belongs to
+        self._borders = {}
+        for key in self.transitions:
+            for cluster in key:
+                self._borders.setdefault(cluster, set()).add(key)
+        # mapping cluster to the adjacency {cell: [(cell, weight), ...]} of its
+        # cells, see search
+        self._local = {}
+        self._adj = None
+
+    def _snapshot(self, graph):
+        """ keep the cells of the map to detect the changed clusters later"""
+        self.digest = graph.digest()
+        self._walk = graph.walkable
+        self._weight = None
+        if graph.cellweight is not None:
+            self._weight = np.array(graph.cellweight, dtype=np.float64)
+
+    @property
+    def n_clusters(self):
+        m, n = self.shape
+        return -(-m // self.size), -(-n // self.size)
+
+    def cluster(self, cell):
+        """ cluster index of a flat cell index"""
+        r, c = divmod(cell, self.shape[1])
+        return (r // self.size)*self.n_clusters[1] + c // self.size
+
+    def bounds(self, cluster):
+        """ (r0, r1, c0, c1) the rows and columns covered by a cluster"""
+        a, b = divmod(cluster, self.n_clusters[1])
+        k = self.size
+        return (a*k, min((a+1)*k, self.shape[0]), b*k, min((b+1)*k, self.shape[1]))
+
+    def neighborClusters(self, cluster):
+        """ the cluster itself and its eight surrounding clusters"""
+        M, N = self.n_clusters
+        a, b = divmod(cluster, N)
+        return {i*N + j for i in range(max(a-1, 0), min(a+2, M))
+                for j in range(max(b-1, 0), min(b+2, N))}
+
+    def entrances(self, cluster):
+        """ set of the entrance cells of a cluster"""
+        cells = set()
+        for key in self._borders.get(cluster, ()):
+            for u, v, _ in self.transitions[key]:
+                cells.add(u if key[0] == cluster else v)
+        return cells
+
+    def _edges(self, graph, clusters=None):
+        """ (u, v, w) node ids and weights of the edges leaving the cells of
+        clusters, of every cell if clusters is None"""
+        if clusters is None:
+            ids = np.arange(len(graph), dtype=np.int64)
+        else:
+            ids = [np.asarray(graph.ids[r0:r1, c0:c1]).ravel()
+                   for r0, r1, c0, c1 in map(self.bounds, sorted(clusters))]
+            ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+            ids = ids[ids >= 0]
+        start = np.asarray(graph.indptr[ids])
+        degree = np.asarray(graph.indptr[ids+1]) - start
+        # positions of the edges in indices, node by node
+        first = np.cumsum(degree) - degree
+        pos = np.arange(degree.sum()) + np.repeat(start - first, degree)
+        return (np.repeat(ids, degree), np.asarray(graph.indices[pos]),
+                np.asarray(graph.weights[pos]))
+
+    def build(self, graph, clusters=None):
+        """Compute the entrances and the intra-cluster distances.
+        Params:
+        graph: a CSRGraph laid on a grid
+        clusters: a set of cluster indices (default: None)
+            clusters whose cells changed. Only the borders of these clusters and
+            the distances in them and in their neighbors are recomputed. None
+            rebuilds every cluster.
+        """
+        M, N = self.n_clusters
+        u, v, w = self._edges(graph, clusters)
+        if clusters is None:
+            clusters = set(range(M*N))
+            self.transitions = {}
+            self.intra = {}
+            self._index()
+            inside = np.ones(len(graph), dtype=bool)
+        else:
+            inside = np.zeros(len(graph), dtype=bool)
+            inside[u] = True
+
+        # edges crossing a cluster border, each stored once. Only the edges of
+        # the cells of clusters are read.
+        # edges of inf weight (blocked cells of a GridMap) cannot be crossed
+        keep = ((u < v) | ~inside[v]) & (w != np.inf)
+        u, v, w = u[keep], v[keep], w[keep]
+        ucell, vcell = graph.cells[u], graph.cells[v]
+        ur, uc = np.divmod(ucell, self.shape[1])
+        vr, vc = np.divmod(vcell, self.shape[1])
+        ucl = (ur // self.size)*N + uc // self.size
+        vcl = (vr // self.size)*N + vc // self.size
+        cross = ucl != vcl
+        # orient every crossing edge from the smaller cluster index.
+        swap = ucl > vcl
+        a = np.where(swap, vcl, ucl)[cross]
+        b = np.where(swap, ucl, vcl)[cross]
+        acell = np.where(swap, vcell, ucell)[cross]
+        bcell = np.where(swap, ucell, vcell)[cross]
+        # position of the edge along the border, straight edges come first.
+        same_row = (ucl // N == vcl // N)[cross]
+        pos = np.where(same_row, np.minimum(ur, vr)[cross], np.minimum(uc, vc)[cross])
+        straight = ((ur == vr) | (uc == vc))[cross]
+        w = w[cross]
+
+        # entrances of the neighbors change with the borders, recompute their distances.
+        stale = set()
+        for cluster in clusters:
+            stale |= self.neighborClusters(cluster)
+        # the entrances before the change, to update the abstract graph
+        old = set()
+        if self._adj is not None:
+            for cluster in stale:
+                old |= self.entrances(cluster)
+        for cluster in clusters:
+            for key in self._borders.pop(cluster, ()):
+                del self.transitions[key]
+                other = key[1] if key[0] == cluster else key[0]
+                self._borders.get(other, set()).discard(key)
+
+        order = np.lexsort((~straight, pos, b, a))
+        rows = zip(*(arr[order].tolist() for arr in (a, b, pos, acell, bcell, w, straight)))
+        for key, group in itertools.groupby(rows, key=lambda row: (row[0], row[1])):
+            # one crossing per position, straight ones grouped into runs of
+            # consecutive positions. The border cells of a run are connected on
+            # both sides, a diagonal crossing is an entrance of its own.
+            edges = {}
+            straight_edges = set()
+            for _, _, p, cell_a, cell_b, weight, is_straight in group:
+                if p not in edges:
+                    edges[p] = (cell_a, cell_b, weight)
+                    if is_straight:
+                        straight_edges.add(p)
+            runs = []
+            for p in sorted(edges):
+                if p in straight_edges and runs and runs[-1][-1] == p-1 \
+                        and runs[-1][-1] in straight_edges:
+                    runs[-1].append(p)
+                else:
+                    runs.append([p])
+            chosen = []
+            for run in runs:
+                # a short entrance gets one transition in the middle, a long one
+                # gets one at each end.
+                if len(run) < 6:
+                    chosen.append(edges[run[len(run)//2]])
+                else:
+                    chosen.extend([edges[run[0]], edges[run[-1]]])
+            self.transitions[key] = chosen
+            for cluster in key:
+                self._borders.setdefault(cluster, set()).add(key)
+
+        for cluster in stale:
+            self._local.pop(cluster, None)
+        for cluster in stale:
+            entrances = sorted(self.entrances(cluster))
+            dist = {}
+            for i, cell in enumerate(entrances):
+                g, _ = self.search(graph, cell, cluster, set(entrances[i+1:]))
+                for other in entrances[i+1:]:
+                    if other in g:
+                        dist[(cell, other)] = g[other]
+            if dist:
+                self.intra[cluster] = dist
+            else:
+                self.intra.pop(cluster, None)
+
+        if self._adj is not None:
+            for cell in old:
+                del self._adj[cell]
+            for cluster in stale:
+                self._adj.update(self._clusterGraph(cluster))
+
+    def update(self, graph):
+        """Bring the abstraction up to date with a changed map.
+        Params:
+        graph: a CSRGraph of the same shape, e.g. rebuilt by arr2grid
+        Returns:
+        the set of clusters whose cells changed
+        """
+        if tuple(graph.shape) != self.shape:
+            raise ValueError('the map changed its shape, build a new abstraction')
+        changed = graph.walkable != self._walk
+        if graph.cellweight is not None and self._weight is not None:
+            changed |= np.asarray(graph.cellweight) != self._weight
+        cells = np.flatnonzero(changed).tolist()
+        clusters = {self.cluster(cell) for cell in cells}
+        if clusters:
+            self.build(graph, clusters)
+        self._snapshot(graph)
+        return clusters
+
+    def _clusterGraph(self, cluster):
+        """ adjacency of the entrances of a cluster in the abstract graph"""
+        adj = {cell: [] for cell in self.entrances(cluster)}
+        for key in self._borders.get(cluster, ()):
+            for u, v, w in self.transitions[key]:
+                if key[0] == cluster:
+                    adj[u].append((v, w))
+                else:
+                    adj[v].append((u, w))
+        for (u, v), d in self.intra.get(cluster, {}).items():
+            adj[u].append((v, d))
+            adj[v].append((u, d))
+        return adj
+
+    def graph(self):
+        """ adjacency of the abstract graph {cell: [(cell, weight), ...]}. It is
+        kept up to date by build for the clusters it changes."""
+        if self._adj is None:
+            adj = {}
+            for cluster in self._borders:
+                adj.update(self._clusterGraph(cluster))
+            self._adj = adj
+        return self._adj
+
+    def _localGraph(self, graph, cluster):
+        """ adjacency {cell: [(cell, weight), ...]} of the cells of a cluster,
+        without the edges leaving it"""
+        local = self._local.get(cluster)
+        if local is None:
+            u, v, w = self._edges(graph, {cluster})
+            ucell, vcell = graph.cells[u], graph.cells[v]
+            vr, vc = np.divmod(vcell, self.shape[1])
+            r0, r1, c0, c1 = self.bounds(cluster)
+            keep = (r0 <= vr) & (vr < r1) & (c0 <= vc) & (vc < c1)
+            local = {}
+            for a, b, weight in zip(ucell[keep].tolist(), vcell[keep].tolist(), w[keep].tolist()):
+                local.setdefault(a, []).append((b, weight))
+            self._local[cluster] = local
+        return local
+
+    def search(self, graph, start, cluster, goals=None):
+        """Dijkstra's algorithm restricted to the cells of one cluster.
+        Params:
+        graph: a CSRGraph laid on a grid
+        start: flat cell index of the start
+        cluster: index of the cluster to stay in
+        goals: a set of flat cell indices (default: None)
+            stop once all of them are settled. None explores the whole cluster.
+        Returns:
+        (dist, parent): dictionaries keyed by flat cell index
+        """
+        local = self._localGraph(graph, cluster)
+        dist = {start: 0}
+        parent = {start: None}
+        remaining = set(goals) if goals is not None else None
+        settled = set()
+        heap = [(0, start)]
+        while heap:
+            d, cell = heapq.heappop(heap)
+            if cell in settled:
+                continue
+            settled.add(cell)
+            if remaining is not None:
+                remaining.discard(cell)
+                if not remaining:
+                    break
+            for other, weight in local.get(cell, ()):
+                g_val = d + weight
+                if g_val < dist.get(other, np.inf):
+                    dist[other] = g_val
+                    parent[other] = cell
+                    heapq.heappush(heap, (g_val, other))
+        return dist, parent
+
+    def save(self, path):
+        """ save the abstraction next to a map written by save_grid"""
+        transitions = [(a, b, u, v, w) for (a, b), edges in self.transitions.items()
+                       for u, v, w in edges]
+        intra = [(c, u, v, d) for c, dist in self.intra.items() for (u, v), d in dist.items()]
+        arrays = {'size': self.size, 'shape': self.shape, 'walk': self._walk,
+                  'digest': np.array(self.digest),
+                  'transitions': np.array(transitions, dtype=np.float64).reshape(-1, 5),
+                  'intra': np.array(intra, dtype=np.float64).reshape(-1, 4)}
+        if self._weight is not None:
+            arrays['weight'] = self._weight
+        np.savez(os.path.join(path, 'abstraction.npz'), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """ load an abstraction saved by save from a map directory"""
+        data = np.load(os.path.join(path, 'abstraction.npz'))
+        self = cls.__new__(cls)
+        self.size = int(data['size'])
+        self.shape = tuple(int(s) for s in data['shape'])
+        self._walk = data['walk']
+        self._weight = data['weight'] if 'weight' in data else None
+        self.digest = str(data['digest']) if 'digest' in data else None
+        self.transitions = {}
+        for a, b, u, v, w in data['transitions'].tolist():
+            self.transitions.setdefault((int(a), int(b)), []).append((int(u), int(v), w))
+        self.intra = {}
+        for c, u, v, d in data['intra'].tolist():
+            self.intra.setdefault(int(c), {})[(int(u), int(v))] = d
+        self._index()
+        return self
@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+
+
+class RouteCache(object):
+    """Bounded least recently used cache of planned routes.
+    It is thread safe, so the planners of several threads can share it.
+    """
+
+    def __init__(self, maxsize=1024, maxnodes=None):
+        """
+        Params:
+        maxsize: integer (default: 1024)
+            maximum number of routes kept. None for no bound.
+        maxnodes: integer (default: None)
+            maximum number of path nodes kept over all the routes, a bound on the
+            memory of the cache. None for no bound.
+
+        Attributes:
+        hits: number of lookups answered by the cache
+        misses: number of lookups which were not
+        evictions: number of routes dropped to respect the bounds
+        nodes: number of path nodes currently kept
+        """
+        self.maxsize = maxsize
+        self.maxnodes = maxnodes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nodes = 0
+        self._routes = OrderedDict()
+        # last seen version of every graph token
+        self._versions = {}
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._routes)
+
+    def __contains__(self, key):
+        return key in self._routes
+
+    def _sync(self, key):
+        """ drop the routes of the older versions of the graph of key"""
+        token, version = key[0], key[1]
+        seen = self._versions.get(token)
+        if seen == version:
+            return
+        self._versions[token] = version
+        if seen is not None:
+            stale = [k for k in self._routes if k[0] == token and k[1] != version]
+            for k in stale:
+                self.nodes -= len(self._routes.pop(k)[0])
+
+    def get(self, key, count=True):
+        """Look up a route and mark it as the most recently used.
+        Params:
+        key: a tuple whose first two items are the token and the version of the
+            graph, see RoutePlanner._cacheKey
+        count: bool (default: True)
+            count the lookup as a hit or a miss. A lookup made of several gets
+            counts itself once with record.
+        Returns:
+        the (path, weight) stored for key, or None on a miss
+        """
+        with self._lock:
+            self._sync(key)
+            route = self._routes.get(key)
+            if route is not None:
+                self._routes.move_to_end(key)
+            if count:
+                self.record(route is not None)
+            return route
+
+    def record(self, hit):
+        """ count a lookup as a hit or a miss"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, route):
+        """ store a route and evict the least recently used ones over the bounds"""
+        with self._lock:
+            self._sync(key)
+            if key in self._routes:
+                self.nodes -= len(self._routes.pop(key)[0])
+            self._routes[key] = route
+            self.nodes += len(route[0])
+            while self._routes and ((self.maxsize is not None and len(self._routes) > self.maxsize) or
+                                    (self.maxnodes is not None and self.nodes > self.maxnodes)):
+                _, old = self._routes.popitem(last=False)
+                self.nodes -= len(old[0])
+                self.evictions += 1
+
+    def clear(self):
+        """ drop every route, the counters are kept"""
+        with self._lock:
+            self._routes.clear()
+            self._versions.clear()
+            self.nodes = 0
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._routes), 'nodes': self.nodes}
@@ -0,0 +1,177 @@
+import heapq
+import math
+import os
+
+import numpy as np
+
+
+class ContractionHierarchy(object):
+    """ contraction hierarchy of an undirected CSRGraph """
+
+    def __init__(self, rank, indptr, indices, weights, middle, digest=None):
+        """
+        Params:
+        rank: integer array, the contraction order of every node
+        indptr, indices, weights: CSR arrays of the upward graph. Node u keeps the
+            edges to its neighbors of a higher rank, shortcuts included.
+        middle: integer array, the contracted node a shortcut bypasses, -1 for the
+            edges of the original graph.
+        digest: the CSRGraph.digest of the graph contracted (default: None). The
+            hierarchy only answers the queries of that graph.
+        """
+        self.rank = np.asarray(rank, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.middle = np.asarray(middle, dtype=np.int64)
+        self.digest = digest
+
+    def __len__(self):
+        return len(self.rank)
+
+    def upward(self, u):
+        """ iterate (neighbor id, edge weight) pairs of the upward edges of u"""
+        start, end = self.indptr[u], self.indptr[u+1]
+        return zip(self.indices[start:end].tolist(), self.weights[start:end].tolist())
+
+    def edge(self, u, v):
+        """ (weight, middle) of the edge between u and v"""
+        if self.rank[u] > self.rank[v]:
+            u, v = v, u
+        start, end = self.indptr[u], self.indptr[u+1]
+        i = start + int(np.flatnonzero(self.indices[start:end] == v)[0])
+        return float(self.weights[i]), int(self.middle[i])
+
+    def unpack(self, u, v):
+        """Expand the edge (u, v) into edges of the original graph.
+        Returns:
+        a list of (node, weight) from the node after u to v, where weight is the
+        weight of the original edge reaching the node.
+        """
+        res = []
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            weight, mid = self.edge(a, b)
+            if mid < 0:
+                res.append((b, weight))
+            else:
+                # (mid, b) is expanded after (a, mid)
+                stack.append((mid, b))
+                stack.append((a, mid))
+        return res
+
+    @classmethod
+    def build(cls, graph, settle_limit=50):
+        """Contract the nodes of a graph one by one.
+        The next node is the one with the smallest edge difference (shortcuts
+        added minus edges removed) plus its number of contracted neighbors, kept
+        up to date lazily. A shortcut is skipped when a bounded witness search
+        finds a path which is not longer.
+        Params:
+        graph: an undirected CSRGraph, e.g. built by arr2grid
+        settle_limit: integer (default: 50)
+            number of nodes a witness search settles before giving up. Smaller
+            limits build faster but keep more shortcuts.
+        Returns:
+        ContractionHierarchy
+        """
+        if graph.directed:
+            raise ValueError('contraction hierarchies need an undirected graph')
+        n = len(graph)
+        # remaining graph {neighbor: (weight, middle)} of every uncontracted node
+        adj = [dict() for _ in range(n)]
+        for u in range(n):
+            for v, w in graph.neighbors(u):
+                if v != u and w < adj[u].get(v, (math.inf,))[0]:
+                    adj[u][v] = (w, -1)
+        contracted_neighbors = [0]*n
+        rank = np.zeros(n, dtype=np.int64)
+        upward = [None]*n
+
+        def witness(source, skip, limit, targets):
+            """ distances from source avoiding skip, bounded by limit"""
+            dist = {source: 0}
+            heap = [(0, source)]
+            settled = 0
+            remaining = set(targets)
+            while heap and remaining and settled < settle_limit:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                if d > limit:
+                    break
+                settled += 1
+                remaining.discard(u)
+                for v, (w, _) in adj[u].items():
+                    if v == skip:
+                        continue
+                    if d + w < dist.get(v, math.inf):
+                        dist[v] = d + w
+                        heapq.heappush(heap, (d + w, v))
+            return dist
+
+        def shortcuts(v):
+            """ shortcuts needed to contract v"""
+            neighbors = list(adj[v].items())
+            res = []
+            for i, (u, (wu, _)) in enumerate(neighbors):
+                targets = {x: wu + wx for x, (wx, _) in neighbors[i+1:]}
+                if not targets:
+                    continue
+                dist = witness(u, v, max(targets.values()), targets)
+                for x, cost in targets.items():
+                    if dist.get(x, math.inf) > cost:
+                        res.append((u, x, cost))
+            return res
+
+        def priority(v, added):
+            return len(added) - len(adj[v]) + contracted_neighbors[v]
+
+        heap = [(priority(v, shortcuts(v)), v) for v in range(n)]
+        heapq.heapify(heap)
+        order = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            # lazy update: contract v only if it is still the best candidate
+            added = shortcuts(v)
+            p = priority(v, added)
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap, (p, v))
+                continue
+            for u, x, cost in added:
+                if cost < adj[u].get(x, (math.inf,))[0]:
+                    adj[u][x] = (cost, v)
+                    adj[x][u] = (cost, v)
+            for u in adj[v]:
+                del adj[u][v]
+                contracted_neighbors[u] += 1
+            # the neighbors left are contracted later, so they are ranked higher.
+            upward[v] = adj[v]
+            adj[v] = None
+            rank[v] = order
+            order += 1
+
+        indptr = np.zeros(n+1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(edges) for edges in upward])
+        indices = [u for edges in upward for u in edges]
+        weights = [w for edges in upward for w, _ in edges.values()]
+        middle = [m for edges in upward for _, m in edges.values()]
+        return cls(rank, indptr, indices, weights, middle, graph.digest())
+
+    def save(self, path):
+        """ save the hierarchy next to a map written by save_grid"""
+        arrays = {'rank': self.rank, 'indptr': self.indptr, 'indices': self.indices,
+                  'weights': self.weights, 'middle': self.middle}
+        if self.digest is not None:
+            arrays['digest'] = np.array(self.digest)
+        np.savez(os.path.join(path, 'ch.npz'), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """ load a hierarchy saved by save from a map directory. Hierarchies saved
+        without a digest get None."""
+        data = np.load(os.path.join(path, 'ch.npz'))
+        digest = str(data['digest']) if 'digest' in data else None
+        return cls(data['rank'], data['indptr'], data['indices'], data['weights'],
+                   data['middle'], digest)
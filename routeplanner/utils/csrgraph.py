@@ -0,0 +1,221 @@
+import hashlib
+import itertools
+
+import numpy as np
+
+# unique token of every graph object, see RouteCache
+_tokens = itertools.count()
+
+
+class CSRGraph(object):
+    """ compact graph in compressed sparse row (CSR) layout """
+
+    def __init__(self, indptr, indices, weights, shape=None, cells=None, ids=None,
+                 labels=None, directed=False):
+        """
+        Params:
+        indptr: integer array of length N+1. The out edges of node i are stored in
+            indices[indptr[i]:indptr[i+1]] and weights[indptr[i]:indptr[i+1]].
+        indices: integer array of neighbor ids
+        weights: float array of edge weights
+        shape: a tuple (m, n) (default: None)
+            shape of the grid the nodes live on. Use together with cells.
+        cells: integer array of length N (default: None)
+            flat (row-major) cell index of every node on the grid.
+        ids: integer array of the grid shape (default: None)
+            the inverse mapping of cells, computed from cells if it is not given.
+        labels: a list of hashable objects (default: None)
+            node labels for graphs that are not laid on a grid.
+        directed: bool (default: False)
+
+        Attributes:
+        ids: an integer array of the grid shape mapping each cell to its node id,
+            -1 for the cells which are not nodes (grid layout only).
+        index: a dictionary mapping each label to its node id (label layout only).
+        cellweight: the weight array of the cells when built by arr2grid, else None.
+        diagonal: whether the grid is eight-connected when built by arr2grid, else None.
+        path: the directory the arrays are memory-mapped from when opened by
+            load_grid, else None.
+        token: an integer unique to the graph object.
+        version: an integer increased every time the graph is mutated through
+            set_weight or touch. Together with token it identifies the state of
+            the map, e.g. for route caches.
+        """
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.directed = directed
+        self.shape = None
+        self.cells = None
+        self.ids = None
+        self.labels = None
+        self.index = None
+        if cells is not None:
+            self.shape = tuple(int(s) for s in shape)
+            self.cells = np.asarray(cells, dtype=np.int64)
+            if ids is None:
+                ids = np.full(self.shape, -1, dtype=np.int64)
+                ids.flat[self.cells] = np.arange(len(self.cells))
+            self.ids = np.asarray(ids, dtype=np.int64).reshape(self.shape)
+        elif labels is not None:
+            self.labels = list(labels)
+            self.index = {label: i for i, label in enumerate(self.labels)}
+        else:
+            raise ValueError('either cells or labels should be given')
+        self.cellweight = None
+        self.diagonal = None
+        self.path = None
+        self.token = next(_tokens)
+        self.version = 0
+        # (version, digest) of the last digest computed, see digest
+        self._digest = None
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __contains__(self, node):
+        """membership tests using in. O(1)"""
+        if self.ids is None:
+            return node in self.index
+        try:
+            r, c = node
+        except (TypeError, ValueError):
+            return False
+        m, n = self.shape
+        return 0 <= r < m and 0 <= c < n and self.ids[r, c] >= 0
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.to_node(i)
+
+    def to_id(self, node):
+        """ map a node to its integer id. Raise KeyError if not found."""
+        if node not in self:
+            raise KeyError(node)
+        if self.ids is None:
+            return self.index[node]
+        return int(self.ids[node[0], node[1]])
+
+    def to_node(self, i):
+        """ map an integer id back to its node (a coordinate tuple on grids)"""
+        if self.ids is None:
+            return self.labels[i]
+        return divmod(int(self.cells[i]), self.shape[1])
+
+    @property
+    def walkable(self):
+        """ a new bool array of the grid shape marking the cells which are nodes
+        (grid layout only)"""
+        return self.ids >= 0
+
+    def neighbors(self, i):
+        """ iterate (neighbor id, edge weight) pairs of node i"""
+        start, end = self.indptr[i], self.indptr[i+1]
+        return zip(self.indices[start:end].tolist(), self.weights[start:end].tolist())
+
+    def digest(self):
+        """A hash of the edges and the node layout of the graph. Unlike token, it
+        is the same for equal graphs in every process, so it identifies the map
+        the tables saved next to it (landmarks, hierarchies) were built for. It
+        is computed once per version.
+        Returns:
+        str, a hexadecimal digest
+        """
+        if self._digest is None or self._digest[0] != self.version:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(b'directed' if self.directed else b'undirected')
+            for arr in (self.indptr, self.indices, self.weights, self.cells):
+                if arr is not None:
+                    h.update(np.ascontiguousarray(arr))
+            if self.labels is not None:
+                h.update(repr(self.labels).encode())
+            self._digest = (self.version, h.hexdigest())
+        return self._digest[1]
+
+    def touch(self):
+        """ mark the graph as mutated after its arrays were changed in place"""
+        self.version += 1
+
+    def set_weight(self, u, v, weight):
+        """Change the weight of the edge (u, v), in both directions when the graph
+        is undirected. The edge must exist.
+        Params:
+        u, v: integer node ids
+        weight: an integer/float number
+        """
+        n = len(self.indptr) - 1
+        if not (0 <= u < n and 0 <= v < n):
+            raise ValueError('edge (%d, %d) not in the graph' % (u, v))
+        pairs = [(u, v)] if self.directed else [(u, v), (v, u)]
+        for a, b in pairs:
+            start, end = self.indptr[a], self.indptr[a+1]
+            hit = np.flatnonzero(self.indices[start:end] == b)
+            if len(hit) == 0:
+                raise ValueError('edge (%d, %d) not in the graph' % (a, b))
+            self.weights[start + hit] = weight
+        self.touch()
+
+    def number_of_edges(self):
+        if self.directed:
+            return len(self.indices)
+        return len(self.indices) // 2
+
+    @classmethod
+    def from_edges(cls, n_nodes, u, v, w, directed=False, **kwargs):
+        """ build a CSR graph from edge arrays
+        Params:
+        n_nodes: integer, number of nodes
+        u, v: integer arrays of the end points of the edges
+        w: float array of edge weights
+        directed: bool (default: False)
+            if False, every edge is stored in both directions.
+        kwargs: node mapping passed to the constructor (shape and cells, or labels)
+        Returns:
+        CSRGraph
+        """
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        w = np.asarray(w, dtype=np.float64)
+        if not directed:
+            u, v = np.concatenate([u, v]), np.concatenate([v, u])
+            w = np.concatenate([w, w])
+        # a stable sort keeps the input order of the edges of every node.
+        order = np.argsort(u, kind='stable')
+        indptr = np.zeros(n_nodes+1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=n_nodes), out=indptr[1:])
+        return cls(indptr, v[order], w[order], directed=directed, **kwargs)
+
+    @classmethod
+    def from_networkx(cls, G, weight='weight'):
+        """ adapter of networkx graphs
+        Params:
+        G: a networkx graph object
+        weight: str (default: 'weight')
+            edge attribute holding the weight. Missing weights count as 1.
+        Returns:
+        CSRGraph. Nodes given as non-negative integer coordinate pairs (e.g. the
+        output of arr2grid) are laid on a grid, other nodes are kept as labels.
+        """
+        nodes = list(G)
+        index = {node: i for i, node in enumerate(nodes)}
+        indptr = np.zeros(len(nodes)+1, dtype=np.int64)
+        indices = []
+        weights = []
+        for i, node in enumerate(nodes):
+            for neighbor, attr in G.adj[node].items():
+                indices.append(index[neighbor])
+                weights.append(attr.get(weight, 1))
+            indptr[i+1] = len(indices)
+
+        kwargs = {'labels': nodes}
+        if nodes and all(_isCell(node) for node in nodes):
+            coords = np.array(nodes, dtype=np.int64)
+            shape = tuple(coords.max(axis=0) + 1)
+            kwargs = {'shape': shape, 'cells': coords[:, 0]*shape[1] + coords[:, 1]}
+        return cls(indptr, indices, weights, directed=G.is_directed(), **kwargs)
+
+
+def _isCell(node):
+    """ check whether a node is a pair of non-negative integer coordinates"""
+    return (isinstance(node, tuple) and len(node) == 2
+            and all(isinstance(x, (int, np.integer)) and x >= 0 for x in node))
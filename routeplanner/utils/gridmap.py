@@ -0,0 +1,148 @@
+import numpy as np
+
+from .csrgraph import CSRGraph
+from .misc import DIAG_FACTOR
+
+# (row, column) step and weight factor of every edge slot of a cell. The slot
+# of the reverse edge is k ^ 1.
+_OFFSETS = [(-1, 0, 1), (1, 0, 1), (0, -1, 1), (0, 1, 1),
+            (-1, -1, DIAG_FACTOR), (1, 1, DIAG_FACTOR), (-1, 1, DIAG_FACTOR), (1, -1, DIAG_FACTOR)]
+
+
+class GridMap(CSRGraph):
+    """ grid graph whose edges follow a weight array of its cells """
+
+    def __init__(self, array, diagonal=False, weight=1):
+        """
+        A CSRGraph with one node per cell and a fixed number of edge slots per
+        node, 4 or 8, so the edges of a cell are found by arithmetic. Edge weights
+        are computed from the cells like arr2grid: the average weight of both
+        cells, scaled by DIAG_FACTOR for diagonal steps. Edges touching a blocked
+        cell, and the slots leaving the grid (loops on the cell itself), weigh
+        inf, which no search relaxes.
+        set_weights, block and unblock change the cells and rewrite the weights
+        of their edges in place, then increase version. The arrays are never
+        reallocated, so planners holding the graph read the new weights.
+        Params:
+        array: list or numpy array, 1 is walkable(white), 0 is block. See arr2grid.
+        diagonal: bool (default: False)
+            If this is 'True' the cells are connected to their eight nearest neighbors.
+        weight: array-like or an integer(default: 1)
+            weight of the cells, in the same shape as array.
+
+        Attributes:
+        cellweight: float array of the grid shape, the weight of every cell. It is
+            kept for blocked cells, so unblock restores their weight.
+        blocked: bool array of the grid shape. Blocked cells are not in the graph
+            (in, to_id and iteration skip them), although they keep their node ids.
+        """
+        data = np.asarray(array)
+        m, n = data.shape
+        self._setSlots(diagonal)
+        size = m*n
+        cells = np.arange(size)
+        r, c = np.divmod(cells, n)
+        indices = np.empty((size, self._degree), dtype=np.int64)
+        for k, (dr, dc, _) in enumerate(_OFFSETS[:self._degree]):
+            inside = (0 <= r+dr) & (r+dr < m) & (0 <= c+dc) & (c+dc < n)
+            indices[:, k] = np.where(inside, cells + dr*n + dc, cells)
+        indptr = np.arange(0, size*self._degree + 1, self._degree)
+        super().__init__(indptr, indices.ravel(), np.full(size*self._degree, np.inf),
+                         shape=(m, n), cells=cells)
+        self.cellweight = np.array(np.broadcast_to(weight, (m, n)), dtype=np.float64)
+        self.blocked = data == 0
+        self.diagonal = diagonal is True
+        self._update(cells)
+
+    def _setSlots(self, diagonal):
+        """ the steps and weight factors of the edge slots of every cell"""
+        self._degree = 8 if diagonal is True else 4
+        offsets = np.array(_OFFSETS[:self._degree])
+        self._dr = offsets[:, 0].astype(np.int64)
+        self._dc = offsets[:, 1].astype(np.int64)
+        self._factor = offsets[:, 2]
+        self._slots = np.arange(self._degree)
+
+    @classmethod
+    def _fromArrays(cls, indptr, indices, weights, shape, cellweight, blocked, diagonal):
+        """ a GridMap over the arrays written by save_grid, see load_grid"""
+        self = cls.__new__(cls)
+        self._setSlots(diagonal)
+        size = shape[0]*shape[1]
+        CSRGraph.__init__(self, indptr, indices, weights, shape=shape, cells=np.arange(size))
+        self.cellweight = cellweight
+        self.blocked = blocked
+        self.diagonal = diagonal is True
+        return self
+
+    @property
+    def walkable(self):
+        return ~self.blocked
+
+    def __contains__(self, node):
+        return super().__contains__(node) and not self.blocked[node[0], node[1]]
+
+    def __iter__(self):
+        for i in np.flatnonzero(~self.blocked).tolist():
+            yield self.to_node(i)
+
+    def number_of_edges(self):
+        edges = np.count_nonzero(self.weights != np.inf)
+        return edges if self.directed else edges // 2
+
+    def set_weight(self, u, v, weight):
+        raise ValueError('the edges of a GridMap follow its cells, use set_weights')
+
+    def _cells(self, cells):
+        """ flat indices of a list of (row, column) tuples or an array of shape (k, 2)"""
+        rc = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        m, n = self.shape
+        r, c = rc[:, 0], rc[:, 1]
+        if not np.all((0 <= r) & (r < m) & (0 <= c) & (c < n)):
+            raise ValueError('Invalid cell. Cell not in the grid')
+        return r*n + c
+
+    def _update(self, flat):
+        """ rewrite the weights of the edges of the flat cells in both directions"""
+        m, n = self.shape
+        flat = np.unique(flat)
+        r, c = np.divmod(flat, n)
+        # one row per cell and one column per slot
+        rows, cols = r[:, None] + self._dr, c[:, None] + self._dc
+        inside = (0 <= rows) & (rows < m) & (0 <= cols) & (cols < n)
+        u = np.broadcast_to(flat[:, None], inside.shape)[inside]
+        k = np.broadcast_to(self._slots, inside.shape)[inside]
+        v = (rows*n + cols)[inside]
+        cost = self.cellweight.ravel()
+        free = ~self.blocked.ravel()
+        # the operations of arr2grid, so both give the same weights (factor 1 is exact)
+        w = self._factor[k]*((cost[u]+cost[v])/2)
+        w[~(free[u] & free[v])] = np.inf
+        degree = self._degree
+        self.weights[u*degree + k] = w
+        self.weights[v*degree + (k ^ 1)] = w
+
+    def set_weights(self, cells, values):
+        """Change the weight of cells and of their edges.
+        Params:
+        cells: a list of (row, column) tuples or an integer array of shape (k, 2)
+        values: a number, or an array of k numbers
+        """
+        flat = self._cells(cells)
+        self.cellweight.flat[flat] = values
+        self._update(flat)
+        self.touch()
+
+    def block(self, cells):
+        """ make cells unwalkable, see set_weights"""
+        flat = self._cells(cells)
+        self.blocked.flat[flat] = True
+        self._update(flat)
+        self.touch()
+
+    def unblock(self, cells):
+        """ make cells walkable again with their weight, see set_weights"""
+        flat = self._cells(cells)
+        self.blocked.flat[flat] = False
+        self._update(flat)
+        self.touch()
@@ -1,5 +1,4 @@
 import numpy as np
-from numpy.linalg import norm
 
 class heuristic2D(object):
     """ compute heuristic score """
@@ -34,39 +33,40 @@ class heuristic2D(object):
     def manhattan(self, u, v):
         """ manhattan heuristic
         Params:
-        u, v: tuples of coordinates        
+        u, v: tuples of coordinates. v can also be a list of tuples (or an array
+            of shape (k, 2)), then the distance to the nearest one is returned.
         Returns: 
         distance: float
         """
-        delta = np.array(u)-np.array(v)
-        distance = self.STEP*norm(delta, ord=1)
+        delta = np.abs(np.asarray(u)-np.asarray(v))
+        distance = self.STEP*np.min(delta.sum(axis=-1))
         return distance
     
     def chebyshev(self, u, v):
         """ chebyshev heuristic
         Params:
-        u, v: tuples of coordinates
+        u, v: tuples of coordinates, or a list of tuples for v (see manhattan)
         """
-        delta = np.array(u)-np.array(v)
-        distance = self.STEP*norm(delta, ord=np.inf)
+        delta = np.abs(np.asarray(u)-np.asarray(v))
+        distance = self.STEP*np.min(delta.max(axis=-1))
         return distance
     
     def octile(self, u, v):
         """ octile heuristic
         Params:
-        u, v: tuples of coordinates
+        u, v: tuples of coordinates, or a list of tuples for v (see manhattan)
         """
-        delta = np.abs(np.array(u)-np.array(v))
-        distance = self.STEP*np.amax(delta) + (self.DIAG - self.STEP)*np.amin(delta)
-        return distance
+        delta = np.abs(np.asarray(u)-np.asarray(v))
+        distance = self.STEP*delta.max(axis=-1) + (self.DIAG - self.STEP)*delta.min(axis=-1)
+        return np.min(distance)
     
     def euclidean(self, u, v):
-        """ manhattan heuristic
+        """ euclidean heuristic
         Params:
-        u, v: tuples of coordinates
+        u, v: tuples of coordinates, or a list of tuples for v (see manhattan)
         """
-        delta = np.array(u)-np.array(v)
-        distance = self.STEP*norm(delta, ord=None)
+        delta = np.asarray(u)-np.asarray(v)
+        distance = self.STEP*np.min(np.sqrt((delta*delta).sum(axis=-1)))
         return distance
     
 if __name__=='__main__':
@@ -0,0 +1,285 @@
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# whether the kernels are compiled. Without Numba they are plain Python
+# functions over arrays, which the planners do not use as they are slower than
+# their own code.
+HAVE_NUMBA = njit is not None
+
+# heuristics of heuristic2D computed by the kernels
+HEURISTICS = {'null': 0, 'manhattan': 1, 'chebyshev': 2, 'octile': 3, 'euclidean': 4}
+
+
+def _jit(func):
+    if njit is None:
+        return func
+    # nogil lets the searches of several threads run at once
+    return njit(cache=True, nogil=True)(func)
+
+
+def coordinates(graph):
+    """Coordinates of the nodes of a CSRGraph for the heuristic.
+    Params:
+    graph: a CSRGraph object
+    Returns:
+    (rows, cols): float arrays, or None when the nodes are not pairs of numbers
+    """
+    if graph.cells is not None:
+        rows, cols = np.divmod(np.asarray(graph.cells, dtype=np.int64), graph.shape[1])
+        return rows.astype(np.float64), cols.astype(np.float64)
+    try:
+        labels = np.asarray(graph.labels, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if labels.ndim != 2 or labels.shape[1] != 2:
+        return None
+    return labels[:, 0].copy(), labels[:, 1].copy()
+
+
+@_jit
+def _heuristic(kind, r, c, tr, tc, step, diag):
+    """ heuristic2D of the node (r, c) to the nearest of the nodes (tr, tc), with
+    the same floating point operations"""
+    if kind == 0:
+        return 0.0
+    best = math.inf
+    for k in range(len(tr)):
+        dr = abs(r - tr[k])
+        dc = abs(c - tc[k])
+        if kind == 1:
+            d = dr + dc
+        elif kind == 2:
+            d = max(dr, dc)
+        elif kind == 3:
+            d = step*max(dr, dc) + (diag - step)*min(dr, dc)
+        else:
+            d = math.sqrt(dr*dr + dc*dc)
+        if d < best:
+            best = d
+    if kind == 3:
+        return best
+    return step*best
+
+
+@_jit
+def _less(hf, hc, i, j):
+    return hf[i] < hf[j] or (hf[i] == hf[j] and hc[i] < hc[j])
+
+
+@_jit
+def _swap(hf, hc, hn, i, j):
+    hf[i], hf[j] = hf[j], hf[i]
+    hc[i], hc[j] = hc[j], hc[i]
+    hn[i], hn[j] = hn[j], hn[i]
+
+
+@_jit
+def _push(hf, hc, hn, size, f, c, n):
+    """Push the entry (f, c, n) on the heap of the first size entries of the arrays.
+    Returns:
+    the arrays, grown when they are full, and the new size
+    """
+    if size == len(hf):
+        hf = np.concatenate((hf, hf))
+        hc = np.concatenate((hc, hc))
+        hn = np.concatenate((hn, hn))
+    hf[size] = f
+    hc[size] = c
+    hn[size] = n
+    i = size
+    while i > 0:
+        parent = (i-1) >> 1
+        if not _less(hf, hc, i, parent):
+            break
+        _swap(hf, hc, hn, i, parent)
+        i = parent
+    return hf, hc, hn, size+1
+
+
+@_jit
+def _pop(hf, hc, hn, size):
+    """ remove the lowest entry (f, c, n) of the heap and return it with the new size"""
+    f, c, n = hf[0], hc[0], hn[0]
+    size -= 1
+    hf[0], hc[0], hn[0] = hf[size], hc[size], hn[size]
+    i = 0
+    while True:
+        child = 2*i + 1
+        if child >= size:
+            break
+        if child+1 < size and _less(hf, hc, child+1, child):
+            child += 1
+        if not _less(hf, hc, child, i):
+            break
+        _swap(hf, hc, hn, i, child)
+        i = child
+    return f, c, n, size
+
+
+@_jit
+def search(indptr, indices, weights, source, targets, rows, cols, tr, tc,
+           kind, step, diag, alpha):
+    """Dijkstra's algorithm and A* (Dijkstra.plan) over the arrays of a CSRGraph.
+    The open list is a binary heap of (f, counter, node) entries, so nodes are
+    popped in the order of priorq, and an entry is stale when the counter
+    stored for its node in stamp differs.
+    Params:
+    indptr, indices, weights: the arrays of the graph
+    source: an integer id of the source node
+    targets: a bool array marking the target nodes
+    rows, cols: float arrays of the coordinates of the nodes
+    tr, tc: float arrays of the coordinates of the targets
+    kind: the heuristic, see HEURISTICS
+    step, diag: see heuristic2D
+    alpha: see RoutePlanner
+    Returns:
+    (node, g, parent): the target reached or -1, the g values and the parents
+    (-1 for none) of the nodes
+    """
+    n = len(indptr) - 1
+    g = np.full(n, np.inf)
+    parent = np.full(n, -1, np.int64)
+    stamp = np.full(n, -1, np.int64)
+    hf = np.empty(64)
+    hc = np.empty(64, np.int64)
+    hn = np.empty(64, np.int64)
+    g[source] = 0.0
+    hf, hc, hn, size = _push(hf, hc, hn, 0, 0.0, 0, source)
+    stamp[source] = 0
+    counter = 1
+    while size > 0:
+        _, c, node, size = _pop(hf, hc, hn, size)
+        if stamp[node] != c:
+            continue
+        stamp[node] = -1
+        if targets[node]:
+            return node, g, parent
+        for e in range(indptr[node], indptr[node+1]):
+            v = indices[e]
+            g_val = g[node] + weights[e]
+            if g_val < g[v]:
+                h_val = _heuristic(kind, rows[v], cols[v], tr, tc, step, diag)
+                g[v] = g_val
+                parent[v] = node
+                hf, hc, hn, size = _push(hf, hc, hn, size, alpha*g_val + (2-alpha)*h_val, counter, v)
+                stamp[v] = counter
+                counter += 1
+    return -1, g, parent
+
+
+@_jit
+def _peek(hf, hc, hn, size, stamp):
+    """ drop the stale entries on top of the heap, return the lowest priority and the size"""
+    while size > 0 and stamp[hn[0]] != hc[0]:
+        _, _, _, size = _pop(hf, hc, hn, size)
+    return hf[0], size
+
+
+@_jit
+def bisearch(indptr, indices, weights, source, sources, rows, cols, tr, tc, sr, sc,
+             kind, step, diag, alpha):
+    """Bidirectional search (BiDijkstra.plan) over the arrays of a CSRGraph.
+    Params: see search, besides
+    sources: an integer array of the nodes the reverse search starts from, the
+        targets in the order of RoutePlanner._targets
+    sr, sc: float arrays of the coordinates of the source, the target of the
+        heuristic of the reverse search
+    Returns:
+    (u, v, w, g, parent, g_inv, parent_inv): the edge (u, v) of weight w through
+    which the best path goes (u is -1 when there is none), and the tables of
+    both searches
+    """
+    n = len(indptr) - 1
+    g = np.full((2, n), np.inf)
+    parent = np.full((2, n), -1, np.int64)
+    stamp = np.full((2, n), -1, np.int64)
+    hf = [np.empty(64), np.empty(64)]
+    hc = [np.empty(64, np.int64), np.empty(64, np.int64)]
+    hn = [np.empty(64, np.int64), np.empty(64, np.int64)]
+    size = [0, 0]
+    # number of nodes in each open list
+    cnt = [0, 0]
+    counter = [0, 0]
+
+    g[0, source] = 0.0
+    hf[0], hc[0], hn[0], size[0] = _push(hf[0], hc[0], hn[0], 0, 0.0, 0, source)
+    stamp[0, source] = 0
+    counter[0] = cnt[0] = 1
+    for t in sources:
+        g[1, t] = 0.0
+        hf[1], hc[1], hn[1], size[1] = _push(hf[1], hc[1], hn[1], size[1], 0.0, counter[1], t)
+        stamp[1, t] = counter[1]
+        counter[1] += 1
+        cnt[1] += 1
+
+    best = math.inf
+    mu, mv, mw = -1, -1, 0.0
+    while cnt[0] > 0 and cnt[1] > 0:
+        top, size[0] = _peek(hf[0], hc[0], hn[0], size[0], stamp[0])
+        top_inv, size[1] = _peek(hf[1], hc[1], hn[1], size[1], stamp[1])
+        # BiDijkstra._stop
+        if best != math.inf:
+            if alpha == 2:
+                if (top + top_inv)/2 >= best:
+                    break
+            elif alpha >= 1:
+                if max(top, top_inv) >= alpha*best:
+                    break
+            else:
+                break
+        # expand the smaller frontier
+        d = 0 if cnt[0] <= cnt[1] else 1
+        o = 1 - d
+        _, c, node, size[d] = _pop(hf[d], hc[d], hn[d], size[d])
+        while stamp[d, node] != c:
+            _, c, node, size[d] = _pop(hf[d], hc[d], hn[d], size[d])
+        stamp[d, node] = -1
+        cnt[d] -= 1
+        for e in range(indptr[node], indptr[node+1]):
+            v = indices[e]
+            w = weights[e]
+            g_val = g[d, node] + w
+            if g_val < g[d, v]:
+                if d == 0:
+                    h_val = _heuristic(kind, rows[v], cols[v], tr, tc, step, diag)
+                else:
+                    h_val = _heuristic(kind, rows[v], cols[v], sr, sc, step, diag)
+                g[d, v] = g_val
+                parent[d, v] = node
+                if stamp[d, v] == -1:
+                    cnt[d] += 1
+                hf[d], hc[d], hn[d], size[d] = _push(hf[d], hc[d], hn[d], size[d],
+                                                     alpha*g_val + (2-alpha)*h_val, counter[d], v)
+                stamp[d, v] = counter[d]
+                counter[d] += 1
+            # a path through the edge (node, v) when both searches met
+            if g[o, v] != math.inf:
+                cost = g[d, node] + w + g[o, v]
+                if cost < best:
+                    best = cost
+                    if d == 0:
+                        mu, mv, mw = node, v, w
+                    else:
+                        mu, mv, mw = v, node, w
+    return mu, mv, mw, g[0], parent[0], g[1], parent[1]
+
+
+@_jit
+def trace(parent, node):
+    """ the ids of the path from the root of the search tree parent to node"""
+    length = 1
+    i = node
+    while parent[i] != -1:
+        i = parent[i]
+        length += 1
+    path = np.empty(length, np.int64)
+    for k in range(length-1, -1, -1):
+        path[k] = node
+        node = parent[node]
+    return path
@@ -0,0 +1,116 @@
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+
+def _oneToAll(graph, source):
+    """ distances from source to every node of a CSRGraph with Dijkstra's algorithm"""
+    dist = np.full(len(graph), math.inf)
+    dist[source] = 0
+    heap = [(0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for v, w in graph.neighbors(u):
+            if d + w < dist[v]:
+                dist[v] = d + w
+                heapq.heappush(heap, (d + w, v))
+    return dist
+
+
+class Landmarks(object):
+    """ landmark (ALT) distance tables of a graph """
+
+    def __init__(self, nodes, dist, path=None, digest=None):
+        """
+        Params:
+        nodes: integer array of the K landmark node ids
+        dist: float array of shape (N, K), dist[v, k] is the distance between node
+            v and landmark k, inf if v is unaccessible. Row v is contiguous, so an
+            estimate reads two rows of K numbers.
+        path: the directory dist is memory-mapped from (default: None)
+        digest: the CSRGraph.digest of the graph the tables were computed on
+            (default: None). The tables only bound the distances of that graph.
+        """
+        self.nodes = np.asarray(nodes, dtype=np.int64)
+        self.dist = dist
+        self.path = path
+        self.digest = digest
+
+    def __len__(self):
+        return self.dist.shape[0]
+
+    def __reduce__(self):
+        # memory-mapped tables are reopened from disk instead of being pickled.
+        if self.path is not None:
+            return (Landmarks.load, (self.path,))
+        return (Landmarks, (self.nodes, self.dist, None, self.digest))
+
+    def estimate(self, u, v):
+        """Lower bound of the distance between the nodes u and v, O(K).
+        By the triangle inequality |d(L, v) - d(L, u)| <= d(u, v) for every landmark L.
+        """
+        with np.errstate(invalid='ignore'):
+            h = np.fmax.reduce(np.abs(self.dist[v] - self.dist[u]))
+        # a nan is left when no landmark reaches u and v
+        return 0 if h != h else float(h)
+
+    @classmethod
+    def build(cls, graph, k=8, path=None, seed=None):
+        """Select landmarks and compute their distance tables.
+        Landmarks are picked greedily, each one the node farthest from those
+        already picked, starting from the node farthest from a random node.
+        Params:
+        graph: an undirected CSRGraph
+        k: integer (default: 8), number of landmarks
+        path: str (default: None)
+            a directory, e.g. a map written by save_grid, where the tables are
+            written as landmarks.npy and memory-mapped. None keeps them in memory.
+        seed: seed of the random start node (default: None)
+        Returns:
+        Landmarks
+        """
+        if graph.directed:
+            raise ValueError('landmarks need an undirected graph')
+        n = len(graph)
+        k = min(k, n)
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            dist = np.lib.format.open_memmap(os.path.join(path, 'landmarks.npy'),
+                                             mode='w+', dtype=np.float64, shape=(n, k))
+        else:
+            dist = np.empty((n, k), dtype=np.float64)
+
+        rng = np.random.default_rng(seed)
+        nearest = _oneToAll(graph, int(rng.integers(n)))
+        nodes = []
+        for i in range(k):
+            reached = np.isfinite(nearest)
+            landmark = int(np.argmax(np.where(reached, nearest, -1)))
+            nodes.append(landmark)
+            dist[:, i] = _oneToAll(graph, landmark)
+            nearest = dist[:, i] if i == 0 else np.minimum(nearest, dist[:, i])
+
+        if path is not None:
+            dist.flush()
+            np.save(os.path.join(path, 'landmark_nodes.npy'), np.array(nodes, dtype=np.int64))
+            with open(os.path.join(path, 'landmarks.json'), 'w') as f:
+                json.dump({'digest': graph.digest()}, f)
+            return cls.load(path)
+        return cls(nodes, dist, digest=graph.digest())
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """ memory-map the tables written by build into a directory. Tables
+        written without a digest get None."""
+        dist = np.load(os.path.join(path, 'landmarks.npy'), mmap_mode=mmap_mode)
+        nodes = np.load(os.path.join(path, 'landmark_nodes.npy'))
+        digest = None
+        if os.path.exists(os.path.join(path, 'landmarks.json')):
+            with open(os.path.join(path, 'landmarks.json')) as f:
+                digest = json.load(f)['digest']
+        return cls(nodes, dist, path, digest)
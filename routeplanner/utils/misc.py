@@ -1,9 +1,11 @@
 import itertools
+import json
 import math
+import os
 
-import networkx as nx
 import numpy as np
-import cv2
+
+from .csrgraph import CSRGraph
 
 # Recipe from the itertools documentation.
 def pairwise(iterable, cyclic=False):
@@ -15,6 +17,49 @@ def pairwise(iterable, cyclic=False):
     return zip(a, b)
 
 
+# weight factor of the diagonal steps
+DIAG_FACTOR = 1.414
+
+
+def _gridEdges(data, weight, diagonal=False):
+    """Compute the edges of a grid with array slicing.
+    Params:
+    data: a numpy array, 0 is block and other values are walkable.
+    weight: a numpy array in the same shape as data with the weight of every cell.
+    diagonal: bool (default: False)
+        If this is 'True' the edges of the diagonal steps are included.
+    Returns:
+    (u, v, w): flat cell indices of the end points of every edge between two
+        walkable cells and its weight, the average weight of both cells (scaled
+        by DIAG_FACTOR for diagonal steps).
+    """
+    m, n = data.shape
+    cell = np.arange(m*n).reshape(m, n)
+    walkable = (data != 0).ravel()
+    flat = weight.ravel()
+
+    # (u, v, factor) of the vertical, horizontal and both diagonal directions
+    blocks = [(cell[1:, :], cell[:-1, :], 1),
+              (cell[:, 1:], cell[:, :-1], 1)]
+    if diagonal is True:
+        blocks += [(cell[1:, 1:], cell[:-1, :-1], DIAG_FACTOR),
+                   (cell[:-1, 1:], cell[1:, :-1], DIAG_FACTOR)]
+
+    us, vs, ws = [], [], []
+    for u, v, factor in blocks:
+        u, v = u.ravel(), v.ravel()
+        keep = walkable[u] & walkable[v]
+        u, v = u[keep], v[keep]
+        # compute the weight between two adjacent grids by averaging their weight value.
+        w = (flat[u]+flat[v])/2
+        if factor != 1:
+            w = factor*w
+        us.append(u)
+        vs.append(v)
+        ws.append(w)
+    return np.concatenate(us), np.concatenate(vs), np.concatenate(ws)
+
+
 # grid constructor via array
 def arr2grid(array, diagonal=False, weight=1, create_using=None):
     """Returns the cooresponding grid graph of the image.
@@ -32,51 +77,234 @@ def arr2grid(array, diagonal=False, weight=1, create_using=None):
         in the heuristics in order to have same scale.
     create_using : NetworkX graph constructor, optional (default=nx.Graph)
         Graph type to create. If graph instance, then cleared before populated.
+        Pass CSRGraph to get the compact array-backed graph consumed by the planners;
+        networkx is only imported for the other graph types.
     Returns
     -------
-    NetworkX graph
+    NetworkX graph or CSRGraph
     """
 
     data = np.array(array)
     # keep the walkable area with default weight 1, or use the given weight.
     weight = np.where(data==0, 0, weight)
-    
+    m, n = data.shape
+    u, v, w = _gridEdges(data, weight, diagonal)
+    cells = np.flatnonzero(data)
+
+    if create_using is CSRGraph:
+        ids = np.full(m*n, -1, dtype=np.int64)
+        ids[cells] = np.arange(len(cells))
+        G = CSRGraph.from_edges(len(cells), ids[u], ids[v], w, shape=(m, n), cells=cells)
+        G.cellweight = weight
+        G.diagonal = diagonal is True
+        return G
+
+    import networkx as nx
+
     # initialize an empty networkx graph
     G = nx.empty_graph(0, create_using)
-    m, n = data.shape
-    rows = range(m)
-    cols = range(n)
-    
-    # compute the weight between two adjacent grids by averaging their weight value.
-    traffic = lambda a, b: (weight[a]+weight[b])/2
-    
-    # add nodes from the input array
-    G.add_nodes_from((i, j) for i in rows for j in cols)
-    
-    # add edges for the four directions connection
-    G.add_edges_from(((i, j), (pi, j), {'weight': traffic((i, j), (pi, j))})
-                     for pi, i in pairwise(rows) for j in cols)
-    G.add_edges_from(((i, j), (i, pj), {'weight': traffic((i, j), (i, pj))})
-                     for i in rows for pj, j in pairwise(cols))
-    
-    # add edges for the diagonal connections in eight directions.
-    if diagonal is True:
-        G.add_edges_from(((i, j), (pi, pj), {'weight': 1.414*traffic((i, j), (pi, pj))})
-                     for pi, i in pairwise(rows) for pj, j in pairwise(cols))
-        G.add_edges_from(((pi, j), (i, pj), {'weight': 1.414*traffic((pi, j), (i, pj))})
-                     for pi, i in pairwise(rows) for pj, j in pairwise(cols))
     
-    # remove the unwalkable nodes and edges
-    unwalkable = [tuple(n) for n in np.argwhere(data==0)]
-    G.remove_nodes_from(unwalkable)
+    # add the walkable nodes from the input array
+    G.add_nodes_from(divmod(c, n) for c in cells.tolist())
+
+    # add edges for the four directions connection, and for the diagonal
+    # connections in eight directions.
+    edges = zip(u.tolist(), v.tolist(), w.tolist())
+    G.add_edges_from((divmod(a, n), divmod(b, n), {'weight': c}) for a, b, c in edges)
     
     # both directions for directed
     if G.is_directed():
-        G.add_edges_from((v, u) for u, v in G.edges())
+        edges = zip(u.tolist(), v.tolist(), w.tolist())
+        G.add_edges_from((divmod(b, n), divmod(a, n), {'weight': c}) for a, b, c in edges)
+    return G
+
+
+
+def distance_field(array, sources, diagonal=False, weight=1, delta=None):
+    """Compute the distances from the sources to every cell of a grid.
+    A vectorized wavefront: every step relaxes the edges of all the cells of the
+    frontier at once with array operations, and the cells it improves form the
+    next frontier, until no distance changes. On weighted maps a cell may be
+    improved again after it left the frontier; the frontier is then restricted
+    to the cells within delta of its lowest distance (delta-stepping), which
+    bounds how often that happens.
+    Params
+    -------
+    array: list or numpy array representing the binarized input image, as in
+        arr2grid. 1 is walkable(white), 0 is block.
+    sources: a tuple of the coordinates of one source, or a list of them. Every
+        cell gets the distance to its nearest source.
+    diagonal: bool (default: False)
+        If this is 'True' the cells are connected to their eight nearest neighbors.
+    weight: array-like or an integer(default: 1)
+        weight of the cells. Edge costs follow arr2grid: the average weight of
+        both cells, scaled by DIAG_FACTOR for diagonal steps.
+    delta: a number (default: None)
+        width of the frontier on weighted maps. None uses 4 times the lowest cell
+        weight when the weights differ, and the whole frontier otherwise.
+    Returns
+    -------
+    (dist, parent): a float array in the shape of array with the distance of every
+        cell, inf for blocked and unaccessible cells, and an integer array with
+        the flat (row-major) index of the previous cell on a shortest path, -1
+        for the sources and unaccessible cells. Paths are read by field_path.
+    """
+    data = np.asarray(array)
+    m, n = data.shape
+    walkable = data != 0
+    weight = np.broadcast_to(np.asarray(weight, dtype=np.float64), (m, n))
+    if isinstance(sources, tuple):
+        sources = [sources]
+    for r, c in sources:
+        if not (0 <= r < m and 0 <= c < n and walkable[r, c]):
+            raise ValueError('Invalid source. Source not in the graph')
+    if delta is None:
+        values = weight[walkable]
+        if len(values) and values.min() != values.max():
+            delta = 4*values.min()
+
+    # pad one blocked cell on every side so that neighbors never leave the grid.
+    W = n+2
+    cost = np.full((m+2, W), np.inf)
+    cost[1:-1, 1:-1] = np.where(walkable, weight, np.inf)
+    cost = cost.ravel()
+    dist = np.full(cost.size, np.inf)
+    parent = np.full(cost.size, -1, dtype=np.int64)
+    offsets = [(-W, 1), (W, 1), (-1, 1), (1, 1)]
+    if diagonal is True:
+        offsets += [(-W-1, DIAG_FACTOR), (-W+1, DIAG_FACTOR),
+                    (W-1, DIAG_FACTOR), (W+1, DIAG_FACTOR)]
+
+    frontier = np.unique([(r+1)*W + c+1 for r, c in sources])
+    dist[frontier] = 0
+    # cells left out of the frontier by delta, and a mask of them
+    pending = np.empty(0, dtype=np.int64)
+    waiting = np.zeros(cost.size, dtype=bool)
+    while len(frontier) or len(pending):
+        if delta is not None:
+            frontier = np.concatenate((pending, frontier))
+            d = dist[frontier]
+            near = d <= d.min() + delta
+            pending = frontier[~near]
+            frontier = frontier[near]
+            waiting[frontier] = False
+            waiting[pending] = True
+
+        us, vs, gs = [], [], []
+        for offset, factor in offsets:
+            v = frontier + offset
+            w = (cost[frontier]+cost[v])/2
+            if factor != 1:
+                w = factor*w
+            g = dist[frontier] + w
+            better = g < dist[v]
+            us.append(frontier[better])
+            vs.append(v[better])
+            gs.append(g[better])
+        u, v, g = np.concatenate(us), np.concatenate(vs), np.concatenate(gs)
+        # keep the lowest distance offered to every cell
+        order = np.lexsort((g, v))
+        u, v, g = u[order], v[order], g[order]
+        first = np.ones(len(v), dtype=bool)
+        first[1:] = v[1:] != v[:-1]
+        u, v, g = u[first], v[first], g[first]
+        dist[v] = g
+        parent[v] = u
+        frontier = v[~waiting[v]] if delta is not None else v
+
+    dist = dist.reshape(m+2, W)[1:-1, 1:-1].copy()
+    r, c = np.divmod(parent.reshape(m+2, W)[1:-1, 1:-1], W)
+    parent = np.where(r > 0, (r-1)*n + c-1, -1)
+    return dist, parent
+
+
+def field_path(dist, parent, target):
+    """Read the path to target from the fields returned by distance_field.
+    Returns:
+    (path, weight): path is a list of coordinates from the nearest source to
+        target, and weight is its cost. For an unaccessible target return [] as
+        path and None as weight, like the planners.
+    """
+    n = parent.shape[1]
+    r, c = target
+    if not np.isfinite(dist[r, c]):
+        return ([], None)
+    path = [(r, c)]
+    i = parent[r, c]
+    while i >= 0:
+        path.append(divmod(int(i), n))
+        i = parent.flat[i]
+    return (path[::-1], float(dist[r, c]))
+
+
+def save_grid(graph, path):
+    """Save a grid graph as raw arrays which can be memory-mapped by load_grid.
+    Params
+    -------
+    graph: a CSRGraph laid on a grid, or a networkx graph from arr2grid.
+    path: str, a directory which is created if it does not exist.
+    """
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_networkx(graph)
+    if graph.cells is None:
+        raise ValueError('only graphs laid on a grid can be saved')
+    os.makedirs(path, exist_ok=True)
+    arrays = {'indptr': graph.indptr, 'indices': graph.indices, 'weights': graph.weights,
+              'cells': graph.cells, 'ids': graph.ids}
+    cellweight = getattr(graph, 'cellweight', None)
+    if cellweight is not None:
+        arrays['cellweight'] = cellweight
+    # the blocked cells of a GridMap, which keep their node ids
+    blocked = getattr(graph, 'blocked', None)
+    if blocked is not None:
+        arrays['blocked'] = blocked
+    for name, arr in arrays.items():
+        np.save(os.path.join(path, name+'.npy'), arr)
+    meta = {'shape': list(graph.shape), 'directed': graph.directed,
+            'diagonal': getattr(graph, 'diagonal', None), 'digest': graph.digest()}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+
+def load_grid(path, mmap_mode='r'):
+    """Load a grid graph saved by save_grid.
+    Params
+    -------
+    path: str, the directory written by save_grid.
+    mmap_mode: {None, 'r', 'r+', 'c'} (default: 'r')
+        memory-map the arrays instead of reading them, see numpy.load.
+    Returns
+    -------
+    CSRGraph, or a GridMap for the maps saved from one. Cells of a GridMap can
+    only be changed when its arrays are writable (mmap_mode None, 'r+' or 'c').
+    """
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    load = lambda name: np.load(os.path.join(path, name+'.npy'), mmap_mode=mmap_mode)
+    if os.path.exists(os.path.join(path, 'blocked.npy')):
+        # gridmap imports this module
+        from .gridmap import GridMap
+        G = GridMap._fromArrays(load('indptr'), load('indices'), load('weights'),
+                                tuple(meta['shape']), load('cellweight'), load('blocked'),
+                                meta['diagonal'])
+    else:
+        G = CSRGraph(load('indptr'), load('indices'), load('weights'), shape=meta['shape'],
+                     cells=load('cells'), ids=load('ids'), directed=meta['directed'])
+        if os.path.exists(os.path.join(path, 'cellweight.npy')):
+            G.cellweight = load('cellweight')
+        G.diagonal = meta['diagonal']
+    # the arrays are not hashed again, a graph changed in place must be touched
+    if 'digest' in meta:
+        G._digest = (G.version, meta['digest'])
+    if mmap_mode is not None:
+        G.path = path
     return G
 
 # grid constructor via image
 def img2grid(img_path, diagonal=False, weight=None, create_using=None):
+    # OpenCV is only needed to read images, so it is imported here
+    import cv2
+
     # load image and convert color space into grayscale
     im_gray = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
     # binarize
@@ -84,6 +312,8 @@ def img2grid(img_path, diagonal=False, weight=None, create_using=None):
     _, im_bw = cv2.threshold(im_gray, 254, 255, cv2.THRESH_BINARY)
     # normalize pixel value
     data = im_bw/255
+    if weight is None:
+        weight = 1
     return arr2grid(data, diagonal, weight, create_using)
 
 if __name__ == '__main__':
@@ -0,0 +1,96 @@
+import json
+import math
+import os
+import traceback
+
+from .csrgraph import CSRGraph
+from .misc import save_grid, load_grid
+
+# state of a worker process, set once by _initWorker
+_worker = {}
+
+
+def _initWorker(planner, path, graph):
+    """ open the published map and keep a private planner in the worker"""
+    if path is not None:
+        graph = load_grid(path, mmap_mode='r')
+    planner._setGraph(graph)
+    _worker['planner'] = planner
+
+
+def _publishedPath(graph):
+    """ the directory a graph was opened from by load_grid, None if the map saved
+    there differs from the graph, e.g. it was changed in memory since (through
+    set_weight, touch or the cells of a GridMap) or saved over"""
+    path = getattr(graph, 'path', None)
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            saved = json.load(f).get('digest')
+    except (OSError, ValueError):
+        return None
+    return path if saved is not None and saved == graph.digest() else None
+
+
+def _planChunk(chunk):
+    """ plan a chunk of (index, (source, target)) items in a worker"""
+    pairs = [pair for _, pair in chunk]
+    try:
+        routes = _worker['planner']._multiPlan(pairs)
+    except Exception:
+        # exceptions are pickled back without their traceback, keep it in the message.
+        raise RuntimeError('planning failed in worker %d for pairs %s\n%s'
+                           % (os.getpid(), pairs, traceback.format_exc()))
+    return [(i, route) for (i, _), route in zip(chunk, routes)]
+
+
+def parallel_plan(planner, pairs, workers, chunksize=None):
+    """Plan source-target pairs with a pool of processes.
+    The map is published once as memory-mapped arrays (see save_grid), so every
+    worker opens it instead of receiving a pickled copy with each task. Maps
+    which are already memory-mapped by load_grid are opened from their directory
+    while it holds the same map (see CSRGraph.digest), else they are published
+    again.
+    Params:
+    planner: a RoutePlanner object whose graph is set
+    pairs: list of tuple in the form of [(source_1, target_1),(source_2, target_2)...]
+    workers: integer, number of processes
+    chunksize: integer (default: None)
+        number of pairs sent to a worker at once. By default pairs are split into
+        about four chunks per worker.
+    Returns:
+    routes: a list of (path, weight) in the same order as pairs
+    Raises:
+    RuntimeError if planning fails in a worker, with the failing pairs and the
+    traceback of the worker in the message.
+    """
+    # multiprocessing is only loaded by the programs which start workers
+    import tempfile
+    from multiprocessing import Pool
+
+    pairs = list(pairs)
+    if not pairs:
+        return []
+    if chunksize is None:
+        chunksize = math.ceil(len(pairs)/(workers*4))
+
+    # keep the pairs of a source together so workers can share search trees.
+    items = sorted(enumerate(pairs), key=lambda item: repr(item[1][0]))
+    chunks = [items[i:i+chunksize] for i in range(0, len(items), chunksize)]
+
+    graph = planner.graph
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _publishedPath(graph)
+        if path is None and graph.cells is not None:
+            path = os.path.join(tmp, 'grid')
+            save_grid(graph, path)
+        # graphs which are not laid on a grid are sent once to every worker.
+        initargs = (planner, path, None if path is not None else graph)
+
+        res = [None]*len(pairs)
+        with Pool(min(workers, len(chunks)), _initWorker, initargs) as pool:
+            for routes in pool.imap_unordered(_planChunk, chunks):
+                for i, route in routes:
+                    res[i] = route
+    return res
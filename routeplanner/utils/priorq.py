@@ -47,9 +47,222 @@ class priorq(object):
                 self.cnt -= 1
                 return node
         raise KeyError('pop from an empty priority queue')
+
+    def peek(self):
+        """Return (priority, node) of the lowest priority task without removing it.
+        Raise KeyError if empty."""
+        while self.pq:
+            priority, _, node = self.pq[0]
+            if node is not self.REMOVED:
+                return priority, node
+            heapq.heappop(self.pq)
+        raise KeyError('peek from an empty priority queue')
         
     def __str__(self):
         return str(self.pq)
+
+
+class IndexedHeap(object):
+    """Binary heap with an index of the position of every node, so the priority
+    of a node is updated in place (decrease-key) instead of leaving a REMOVED
+    entry behind. The heap holds exactly the nodes of the queue. It pops the
+    nodes in the same order as priorq.
+    """
+    def __init__(self):
+        # entries (priority, tieBreaker, node)
+        self.heap = []
+        # mapping node to its position in heap
+        self.pos = {}
+        self.cnt = 0
+        self.counter = itertools.count()
+
+    def __contains__(self, value):
+        """membership tests using in. O(1)"""
+        return value in self.pos
+
+    def _up(self, i):
+        heap, pos = self.heap, self.pos
+        entry = heap[i]
+        while i > 0:
+            parent = (i-1) >> 1
+            above = heap[parent]
+            if not entry < above:
+                break
+            heap[i] = above
+            pos[above[2]] = i
+            i = parent
+        heap[i] = entry
+        pos[entry[2]] = i
+
+    def _down(self, i):
+        heap, pos = self.heap, self.pos
+        n = len(heap)
+        entry = heap[i]
+        while True:
+            child = 2*i + 1
+            if child >= n:
+                break
+            if child+1 < n and heap[child+1] < heap[child]:
+                child += 1
+            below = heap[child]
+            if not below < entry:
+                break
+            heap[i] = below
+            pos[below[2]] = i
+            i = child
+        heap[i] = entry
+        pos[entry[2]] = i
+
+    def add(self, node, priority, tieBreaker=None):
+        """Add a new node or update the priority of an existing node in place. O(logn)
+        Params: see priorq.add
+        """
+        if tieBreaker is None:
+            tieBreaker = next(self.counter)
+        entry = (priority, tieBreaker, node)
+        i = self.pos.get(node)
+        if i is None:
+            self.heap.append(entry)
+            self.cnt += 1
+            self._up(len(self.heap)-1)
+        else:
+            old = self.heap[i]
+            self.heap[i] = entry
+            if entry < old:
+                self._up(i)
+            else:
+                self._down(i)
+
+    def remove(self, node):
+        """Remove an existing node. O(logn). Raise KeyError if not found."""
+        i = self.pos.pop(node)
+        last = self.heap.pop()
+        self.cnt -= 1
+        if i < len(self.heap):
+            self.heap[i] = last
+            self._up(i)
+            self._down(self.pos[last[2]])
+
+    def pop(self):
+        """Remove and return the lowest priority node. O(logn) Raise KeyError if empty."""
+        if not self.heap:
+            raise KeyError('pop from an empty priority queue')
+        node = self.heap[0][2]
+        del self.pos[node]
+        last = self.heap.pop()
+        self.cnt -= 1
+        if self.heap:
+            self.heap[0] = last
+            self._down(0)
+        return node
+
+    def peek(self):
+        """Return (priority, node) of the lowest priority node without removing it.
+        Raise KeyError if empty."""
+        if not self.heap:
+            raise KeyError('peek from an empty priority queue')
+        priority, _, node = self.heap[0]
+        return priority, node
+
+    def __str__(self):
+        return str(self.heap)
+
+
+class BucketQueue(object):
+    """Monotone bucket queue. Priorities are grouped in buckets of width
+    resolution, and the buckets are popped in increasing order, first in first
+    out inside a bucket. Only the indexes of the non-empty buckets are kept in a
+    small heap, so sparse priorities do not scan empty buckets.
+
+    Priorities must not decrease below the bucket last popped (as in Dijkstra's
+    algorithm); lower priorities are put in that bucket. The order is exact up to
+    resolution: with a resolution no larger than the smallest increase of the
+    priority along an edge (e.g. twice the smallest edge weight for the f values
+    of Dijkstra, see RoutePlanner) searches stay optimal.
+    Params:
+    resolution: width of the buckets (default: 1.0). Integer weights need 1.
+    """
+    def __init__(self, resolution=1.0):
+        self.resolution = resolution
+        # mapping bucket index to an ordered dictionary {node: priority}
+        self.buckets = {}
+        # heap of the indexes of buckets
+        self.indexes = []
+        # mapping node to its bucket index
+        self.where = {}
+        # mapping bucket index to the lowest priority added to it, see peek
+        self.lows = {}
+        self.floor = None
+        self.cnt = 0
+
+    def __contains__(self, value):
+        """membership tests using in. O(1)"""
+        return value in self.where
+
+    def add(self, node, priority, tieBreaker=None):
+        """Add a new node or move an existing node to the bucket of priority. O(1)
+        besides the first node of a bucket, O(log buckets).
+        Params: see priorq.add, tieBreaker is ignored.
+        """
+        if node in self.where:
+            self.remove(node)
+        b = int(priority // self.resolution)
+        if self.floor is not None and b < self.floor:
+            b = self.floor
+        bucket = self.buckets.get(b)
+        if bucket is None:
+            bucket = self.buckets[b] = {}
+            heapq.heappush(self.indexes, b)
+            self.lows[b] = priority
+        elif priority < self.lows[b]:
+            self.lows[b] = priority
+        bucket[node] = priority
+        self.where[node] = b
+        self.cnt += 1
+
+    def remove(self, node):
+        """Remove an existing node. O(1). Raise KeyError if not found."""
+        b = self.where.pop(node)
+        del self.buckets[b][node]
+        self.cnt -= 1
+
+    def _first(self):
+        """ the first non-empty bucket, dropping the empty ones"""
+        while self.indexes:
+            b = self.indexes[0]
+            bucket = self.buckets[b]
+            if bucket:
+                return b, bucket
+            heapq.heappop(self.indexes)
+            del self.buckets[b]
+            del self.lows[b]
+        return None, None
+
+    def pop(self):
+        """Remove and return a node of the lowest bucket. Raise KeyError if empty."""
+        b, bucket = self._first()
+        if bucket is None:
+            raise KeyError('pop from an empty priority queue')
+        node = next(iter(bucket))
+        del bucket[node]
+        del self.where[node]
+        self.cnt -= 1
+        self.floor = b
+        return node
+
+    def peek(self):
+        """Return (priority, node) without removing node, the node pop would
+        return. The priority is the lowest one added to its bucket, not that of
+        node: the nodes of a bucket are not ordered, and searches use it as a
+        lower bound of the priorities in the queue (e.g. BiDijkstra._stop).
+        Raise KeyError if empty."""
+        b, bucket = self._first()
+        if bucket is None:
+            raise KeyError('peek from an empty priority queue')
+        return self.lows[b], next(iter(bucket))
+
+    def __str__(self):
+        return str({b: self.buckets[b] for b in sorted(self.buckets)})
     
     
 
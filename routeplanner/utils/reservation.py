@@ -0,0 +1,148 @@
+import numpy as np
+
+# Fibonacci hashing: the high bits of key*_MULT modulo 2**64 spread consecutive keys
+_MULT = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+_EMPTY = -1
+
+
+class ReservationTable(object):
+    """Occupancy of the nodes of a graph over time by agents.
+    Every reservation (node, time) is packed into the integer key time*size + node
+    and stored with its agent in an open addressing hash table of two numpy
+    arrays (12 bytes per slot, at most half full), instead of a dictionary of
+    tuples. Agents which reached their goal park there: they occupy the node
+    from their arrival on, kept in arrays of one entry per node.
+    """
+
+    def __init__(self, size, capacity=1024):
+        """
+        Params:
+        size: integer, number of nodes of the graph
+        capacity: integer (default: 1024), initial number of slots, a power of 2
+
+        Attributes:
+        last: integer array, the latest time every node is reserved, -1 if never
+        horizon: the latest time of all the reservations
+        """
+        self.size = size
+        bits = max(int(capacity-1).bit_length(), 4)
+        self._alloc(bits)
+        self.count = 0
+        self.last = np.full(size, -1, dtype=np.int64)
+        self.horizon = 0
+        # arrival time and agent of the agents parked at every node
+        self._parkedTime = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+        self._parkedAgent = np.full(size, -1, dtype=np.int32)
+
+    def _alloc(self, bits):
+        self._bits = bits
+        self._keys = np.full(1 << bits, _EMPTY, dtype=np.int64)
+        self._agents = np.full(1 << bits, -1, dtype=np.int32)
+
+    def __len__(self):
+        """ number of reservations, parked agents excluded"""
+        return self.count
+
+    @property
+    def nbytes(self):
+        return (self._keys.nbytes + self._agents.nbytes + self.last.nbytes
+                + self._parkedTime.nbytes + self._parkedAgent.nbytes)
+
+    def _slot(self, key):
+        return ((key*_MULT) & _MASK64) >> (64 - self._bits)
+
+    def _grow(self):
+        """ double the slots and insert the keys again, with vectorized probing"""
+        used = self._keys != _EMPTY
+        keys, agents = self._keys[used], self._agents[used]
+        self._alloc(self._bits + 1)
+        mask = (1 << self._bits) - 1
+        with np.errstate(over='ignore'):
+            slots = (keys.astype(np.uint64)*np.uint64(_MULT)) >> np.uint64(64 - self._bits)
+        slots = slots.astype(np.int64)
+        while len(keys):
+            free = self._keys[slots] == _EMPTY
+            # the first key of every free slot takes it, the others probe the next slot
+            _, first = np.unique(slots[free], return_index=True)
+            placed = np.flatnonzero(free)[first]
+            self._keys[slots[placed]] = keys[placed]
+            self._agents[slots[placed]] = agents[placed]
+            left = np.ones(len(keys), dtype=bool)
+            left[placed] = False
+            keys, agents, slots = keys[left], agents[left], (slots[left] + 1) & mask
+
+    def reserve(self, node, time, agent):
+        """Reserve node at time for agent, replacing a reservation of the same pair.
+        Params:
+        node: an integer id of the node
+        time: integer, time step
+        agent: integer id of the agent
+        """
+        if 2*(self.count+1) > len(self._keys):
+            self._grow()
+        key = time*self.size + node
+        keys = self._keys
+        mask = len(keys) - 1
+        i = self._slot(key)
+        while True:
+            k = keys[i]
+            if k == _EMPTY:
+                keys[i] = key
+                self.count += 1
+                break
+            if k == key:
+                break
+            i = (i+1) & mask
+        self._agents[i] = agent
+        if time > self.last[node]:
+            self.last[node] = time
+        if time > self.horizon:
+            self.horizon = time
+
+    def park(self, node, time, agent):
+        """ occupy node for agent from time on"""
+        self._parkedTime[node] = time
+        self._parkedAgent[node] = agent
+
+    def unpark(self, node):
+        """ free node from the agent parked there"""
+        self._parkedTime[node] = np.iinfo(np.int64).max
+        self._parkedAgent[node] = -1
+
+    def parked(self, node):
+        """ the agent parked at node, or -1"""
+        return int(self._parkedAgent[node])
+
+    def owner(self, node, time):
+        """ the agent occupying node at time, or -1 if it is free"""
+        if self._parkedTime[node] <= time:
+            return int(self._parkedAgent[node])
+        if time > self.last[node]:
+            return -1
+        key = time*self.size + node
+        keys = self._keys
+        mask = len(keys) - 1
+        i = self._slot(key)
+        while True:
+            k = keys[i]
+            if k == key:
+                return int(self._agents[i])
+            if k == _EMPTY:
+                return -1
+            i = (i+1) & mask
+
+    def reserve_path(self, path, agent, start=0):
+        """Reserve the nodes of a path, one per time step from start, and park the
+        agent at its last node.
+        Params:
+        path: a list of integer ids of nodes, a node repeated for a wait
+        agent: integer id of the agent
+        start: integer (default: 0), time step of the first node
+        """
+        for t, node in enumerate(path, start):
+            self.reserve(node, t, agent)
+        self.park(path[-1], start + len(path) - 1, agent)
+
+    def clear(self):
+        self.__init__(self.size)
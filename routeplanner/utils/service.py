@@ -0,0 +1,431 @@
+import asyncio
+import copy
+import json
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .parallel import _initWorker, _planChunk
+
+
+def worker_pool(planner, workers):
+    """Create a process pool to be given to AsyncPlanner as its executor.
+    Every worker keeps a private copy of planner, and opens the map from its
+    directory when it was opened by load_grid instead of receiving a pickled copy.
+    Params:
+    planner: a RoutePlanner object whose graph is set
+    workers: integer, number of processes
+    Returns:
+    a concurrent.futures.ProcessPoolExecutor
+    """
+    graph = planner.graph
+    path = getattr(graph, 'path', None)
+    initargs = (planner, path, None if path is not None else graph)
+    return ProcessPoolExecutor(workers, initializer=_initWorker, initargs=initargs)
+
+
+def _targetKey(target):
+    """ normalize a target and return it with its hashable key"""
+    if isinstance(target, (list, set, frozenset)):
+        target = list(target)
+        return target, frozenset(target)
+    return target, target
+
+
+def _consume(future):
+    """ mark the exception of a future as retrieved, its waiters may be gone"""
+    if not future.cancelled():
+        future.exception()
+
+
+class AsyncPlanner(object):
+    """Asyncio front end of a planner for concurrent route requests.
+    Identical queries in flight share one result. New queries are held for
+    batch_window seconds, and the queries sharing a source are planned together
+    by one call of _multiPlan, so Dijkstra's algorithm (alpha 2) answers them with
+    one search. The searches run on an executor, so the event loop keeps serving
+    requests while they run.
+    """
+
+    def __init__(self, planner, graph=None, executor=None, batch_window=0.002,
+                 max_batch=256, max_pending=1024, timeout=None):
+        """
+        Params:
+        planner: a RoutePlanner object, e.g. Dijkstra()
+        graph: a CSRGraph object or a networkx graph object (default: None)
+            the map to plan on, else the graph already set on planner.
+        executor: a concurrent.futures.Executor (default: None)
+            runs the searches. Thread pools use private copies of planner, one
+            per busy thread, which share its cache. Process pools must be created
+            by worker_pool. None creates a pool of one thread, closed by close.
+        batch_window: seconds new queries wait to be batched (default: 0.002).
+            0 batches only the queries received in the same loop iteration.
+        max_batch: integer (default: 256)
+            number of waiting queries which starts their batch at once.
+        max_pending: integer (default: 1024)
+            number of distinct queries waiting or being planned. New queries wait
+            for a free slot beyond it, which slows the clients down instead of
+            queueing an unbounded amount of work.
+        timeout: seconds (default: None)
+            default time limit of a request, None for no limit.
+
+        Attributes:
+        requests: number of requests received
+        coalesced: number of requests answered by a query already in flight
+        batches: number of jobs sent to the executor
+        timeouts: number of requests which timed out
+        """
+        planner._setGraph(graph)
+        if planner.graph is None:
+            raise ValueError('graph is not initialized')
+        self.planner = planner
+        self.graph = planner.graph
+        self._ownExecutor = executor is None
+        self.executor = ThreadPoolExecutor(1) if executor is None else executor
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.timeouts = 0
+        # mapping query key to the future of its route
+        self._inflight = {}
+        # mapping source to the list of (target, key) waiting for a batch
+        self._pending = {}
+        self._npending = 0
+        self._flushHandle = None
+        self._slots = None
+        # idle planner copies of the threads of the executor
+        self._planners = queue.SimpleQueue()
+        self._planners.put(planner)
+
+    def info(self):
+        return {'requests': self.requests, 'coalesced': self.coalesced,
+                'batches': self.batches, 'timeouts': self.timeouts,
+                'inflight': len(self._inflight)}
+
+    async def plan(self, source, target, timeout=None):
+        """Find path from source to target with the planner.
+        Params:
+        source: a tuple representing the coordinates of the source node
+        target: a tuple representing the coordinates of the target node, or a list
+            (or set) of them, see RoutePlanner
+        timeout: seconds (default: None)
+            time limit of this request, else the default timeout. The search of
+            a query is not abandoned when its requests time out; later identical
+            requests are answered by it.
+        Returns:
+        (path, weight): see the plan method of the planner
+        Raises:
+        ValueError for nodes which are not in the graph, and asyncio.TimeoutError
+        if the time limit is exceeded.
+        """
+        self.requests += 1
+        if source not in self.graph:
+            raise ValueError('Invalid source. Source not in the graph')
+        target, key = _targetKey(target)
+        targets = target if isinstance(target, list) else [target]
+        if not targets:
+            raise ValueError('Invalid target. No target given')
+        for node in targets:
+            if node not in self.graph:
+                raise ValueError('Invalid target. Target not in the graph')
+
+        if timeout is None:
+            timeout = self.timeout
+        try:
+            path, weight = await asyncio.wait_for(self._plan(source, target, (source, key)), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        return (list(path), weight)
+
+    async def _plan(self, source, target, key):
+        future = self._inflight.get(key)
+        if future is None:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.max_pending)
+            await self._slots.acquire()
+            # the query may have been sent while waiting for the slot
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._submit(source, target, key)
+            else:
+                self._slots.release()
+                self.coalesced += 1
+        else:
+            self.coalesced += 1
+        # the other requests of the query keep waiting if this one is cancelled
+        return await asyncio.shield(future)
+
+    def _submit(self, source, target, key):
+        """ register a new query to be planned by the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        future.add_done_callback(_consume)
+        self._inflight[key] = future
+        self._pending.setdefault(source, []).append((target, key))
+        self._npending += 1
+        if self._npending >= self.max_batch:
+            self._flush()
+        elif self._flushHandle is None:
+            if self.batch_window > 0:
+                self._flushHandle = loop.call_later(self.batch_window, self._flush)
+            else:
+                self._flushHandle = loop.call_soon(self._flush)
+        return future
+
+    def _flush(self):
+        """ send the waiting queries to the executor, one job per source"""
+        if self._flushHandle is not None:
+            self._flushHandle.cancel()
+            self._flushHandle = None
+        pending, self._pending, self._npending = self._pending, {}, 0
+        loop = asyncio.get_running_loop()
+        for source, items in pending.items():
+            pairs = [(source, target) for target, _ in items]
+            if isinstance(self.executor, ProcessPoolExecutor):
+                job = loop.run_in_executor(self.executor, _planChunk, list(enumerate(pairs)))
+            else:
+                job = loop.run_in_executor(self.executor, self._planBatch, pairs)
+            self.batches += 1
+            job.add_done_callback(lambda job, items=items: self._deliver(items, job))
+
+    def _planBatch(self, pairs):
+        """ plan pairs in an executor thread with an idle planner"""
+        try:
+            planner = self._planners.get_nowait()
+        except queue.Empty:
+            planner = copy.copy(self.planner)
+            planner.cache = self.planner.cache
+            planner._setGraph(self.graph)
+        try:
+            return planner._multiPlan(pairs)
+        finally:
+            self._planners.put(planner)
+
+    def _deliver(self, items, job):
+        """ resolve the futures of a batch with its routes or its exception"""
+        if job.cancelled():
+            error, routes = asyncio.CancelledError(), None
+        else:
+            error = job.exception()
+            routes = job.result() if error is None else None
+        if routes is not None and isinstance(self.executor, ProcessPoolExecutor):
+            # process pools return (index, route) items
+            routes = [route for _, route in routes]
+        for i, (_, key) in enumerate(items):
+            future = self._inflight.pop(key)
+            self._slots.release()
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(routes[i])
+
+    async def close(self):
+        """ wait for the queries in flight, and shut the executor down if it was created here"""
+        if self._pending:
+            self._flush()
+        if self._inflight:
+            await asyncio.wait(list(self._inflight.values()))
+        if self._ownExecutor:
+            self.executor.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+def _tuples(obj):
+    """ convert the lists of a decoded JSON node to tuples"""
+    if isinstance(obj, list):
+        return tuple(_tuples(item) for item in obj)
+    return obj
+
+
+def _plain(obj):
+    """ JSON encoding of numpy scalars and tuples of the paths"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError('%r is not JSON serializable' % (obj,))
+
+
+def _dumps(message):
+    return (json.dumps(message, default=_plain) + '\n').encode()
+
+
+class PlanServer(object):
+    """Serve an AsyncPlanner over TCP.
+    The protocol is one JSON object per line. A request is
+    {"id": 1, "source": [r, c], "target": [r, c], "timeout": 0.5} with "targets":
+    [[r, c], ...] instead of "target" for several targets, and "timeout" optional.
+    The response {"id": 1, "path": [[r, c], ...], "weight": w} or
+    {"id": 1, "error": message, "type": "ValueError"} is sent when the route is
+    planned, so responses may come in another order than the requests.
+    """
+
+    def __init__(self, planner, host='127.0.0.1', port=0, max_inflight=64):
+        """
+        Params:
+        planner: an AsyncPlanner object
+        host: str (default: '127.0.0.1'), the loopback interface
+        port: integer (default: 0), 0 picks a free port
+        max_inflight: integer (default: 64)
+            number of unanswered requests of a connection. Its next requests are
+            not read beyond it, so TCP flow control slows the client down.
+
+        Attributes:
+        port: the port listened on once started
+        """
+        self.planner = planner
+        self.host = host
+        self.port = port
+        self.max_inflight = max_inflight
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _handle(self, reader, writer):
+        slots = asyncio.Semaphore(self.max_inflight)
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                await slots.acquire()
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self._answer(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _answer(self, line, writer, lock):
+        rid = None
+        try:
+            request = json.loads(line)
+            rid = request.get('id')
+            source = _tuples(request['source'])
+            if 'targets' in request:
+                target = [_tuples(t) for t in request['targets']]
+            else:
+                target = _tuples(request['target'])
+            path, weight = await self.planner.plan(source, target, request.get('timeout'))
+            response = {'id': rid, 'path': path, 'weight': weight}
+        except asyncio.TimeoutError:
+            response = {'id': rid, 'error': 'timeout', 'type': 'timeout'}
+        except (ValueError, KeyError, TypeError) as e:
+            response = {'id': rid, 'error': str(e), 'type': 'ValueError'}
+        except Exception as e:
+            response = {'id': rid, 'error': repr(e), 'type': 'RuntimeError'}
+        async with lock:
+            writer.write(_dumps(response))
+            await writer.drain()
+
+
+class PlanClient(object):
+    """Client of a PlanServer. Requests may be sent concurrently on one connection."""
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = 0
+        # mapping request id to the future of its response
+        self._waiting = {}
+        self._task = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=0):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        error = ConnectionError('connection closed')
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._waiting.pop(response['id'], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except Exception as e:
+            error = e
+        for future in self._waiting.values():
+            if not future.done():
+                future.set_exception(error)
+        self._waiting.clear()
+
+    async def plan(self, source, target, timeout=None):
+        """Find path from source to target on the server.
+        Params: see AsyncPlanner.plan, the timeout is enforced by the server.
+        Returns:
+        (path, weight) with the nodes of path as tuples
+        Raises:
+        ValueError for invalid requests, asyncio.TimeoutError if the time limit is
+        exceeded and RuntimeError for other failures of the server.
+        """
+        self._ids += 1
+        rid = self._ids
+        request = {'id': rid, 'source': source}
+        if isinstance(target, (list, set, frozenset)):
+            request['targets'] = list(target)
+        else:
+            request['target'] = target
+        if timeout is not None:
+            request['timeout'] = timeout
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[rid] = future
+        self._writer.write(_dumps(request))
+        await self._writer.drain()
+        response = await future
+        if 'error' in response:
+            if response['type'] == 'timeout':
+                raise asyncio.TimeoutError()
+            if response['type'] == 'ValueError':
+                raise ValueError(response['error'])
+            raise RuntimeError(response['error'])
+        return ([_tuples(node) for node in response['path']], response['weight'])
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await self._task
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
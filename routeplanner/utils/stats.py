@@ -0,0 +1,108 @@
+import time
+
+
+class SearchStats(object):
+    """ counters of one search, recorded when the planner is profiled """
+    __slots__ = ('expanded', 'relax_calls', 'relaxed', 'pushes', 'stale', 'reopened',
+                 'peak_open', 'heuristic_calls', 'heuristic_time')
+
+    def __init__(self):
+        """
+        Attributes:
+        expanded: number of nodes popped from the open lists to be expanded
+        relax_calls: number of calls of _relax
+        relaxed: number of relaxations which improved the g value of a node
+        pushes: number of nodes added to the open lists, updates included
+        stale: number of REMOVED entries popped from the heaps, by pop or peek
+        reopened: number of nodes added again after they were expanded
+        peak_open: the largest size of the open lists
+        heuristic_calls: number of heuristic evaluations
+        heuristic_time: seconds spent in the heuristic
+        """
+        for name in self.__slots__:
+            setattr(self, name, 0)
+        self.heuristic_time = 0.0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return 'SearchStats(%s)' % ', '.join('%s=%s' % item for item in self.as_dict().items())
+
+
+class ProfiledQueue(object):
+    """Wrap a priority queue to count its operations into a SearchStats.
+    Params:
+    queue: a priority queue with the add/pop/peek/__contains__/cnt interface
+    stats: the SearchStats to count into
+    expanded: a set of the nodes already popped, shared by the open lists of a
+        search to detect reopenings
+    callback: a function called with (node, priority) for every pop (default: None)
+    """
+
+    def __init__(self, queue, stats, expanded, callback=None):
+        self.queue = queue
+        self.stats = stats
+        self.expanded = expanded
+        self.callback = callback
+
+    @property
+    def cnt(self):
+        return self.queue.cnt
+
+    def __contains__(self, node):
+        return node in self.queue
+
+    def __str__(self):
+        return str(self.queue)
+
+    def add(self, node, priority, *args):
+        stats = self.stats
+        stats.pushes += 1
+        if node in self.expanded:
+            stats.reopened += 1
+        self.queue.add(node, priority, *args)
+        if self.queue.cnt > stats.peak_open:
+            stats.peak_open = self.queue.cnt
+
+    def remove(self, node):
+        self.queue.remove(node)
+
+    def peek(self):
+        heap = getattr(self.queue, 'pq', None)
+        if heap is None:
+            return self.queue.peek()
+        size = len(heap)
+        try:
+            return self.queue.peek()
+        finally:
+            # peek drops the tombstones on top of the heap
+            self.stats.stale += size - len(heap)
+
+    def pop(self):
+        heap = getattr(self.queue, 'pq', None)
+        size = len(heap) if heap is not None else 0
+        if self.callback is not None:
+            priority = self.queue.peek()[0]
+        node = self.queue.pop()
+        if heap is not None:
+            # entries dropped besides the one returned were tombstones
+            self.stats.stale += size - len(heap) - 1
+        self.stats.expanded += 1
+        self.expanded.add(node)
+        if self.callback is not None:
+            self.callback(node, priority)
+        return node
+
+
+def profiled(func, stats):
+    """ wrap a heuristic function to count its calls and time into stats"""
+    clock = time.perf_counter
+
+    def h(u, v):
+        start = clock()
+        value = func(u, v)
+        stats.heuristic_time += clock() - start
+        stats.heuristic_calls += 1
+        return value
+    return h
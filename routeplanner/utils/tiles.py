@@ -0,0 +1,179 @@
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from .csrgraph import _tokens
+from .misc import DIAG_FACTOR
+
+
+class TiledRaster(object):
+    """ raster of cell weights stored on disk as memory-mapped square tiles """
+
+    def __init__(self, path, max_tiles=64):
+        """Open a raster written by TiledRaster.from_array.
+        Params:
+        path: str, the directory of the raster
+        max_tiles: integer (default: 64)
+            number of tiles kept open. Tiles are memory-mapped, so only the pages
+            a search reads are loaded, and the least recently used tiles are closed.
+
+        Attributes:
+        shape: a tuple (m, n), the size of the raster in cells
+        tile: side length of the tiles in cells
+        """
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.path = path
+        self.shape = tuple(meta['shape'])
+        self.tile = meta['tile']
+        self.dtype = np.dtype(meta['dtype'])
+        self.max_tiles = max_tiles
+        self._open = OrderedDict()
+
+    @classmethod
+    def from_array(cls, array, path, weight=1, tile=512, dtype=np.float64, max_tiles=64):
+        """Write a raster tile by tile.
+        Params:
+        array: array-like representing the binarized map, 0 is block and other
+            values are walkable, as in arr2grid. It is only sliced one tile at a
+            time, so a numpy.memmap of a raw file larger than memory can be given.
+        path: str, a directory which is created if it does not exist
+        weight: array-like in the shape of array or a positive number (default: 1)
+            weight of the walkable cells, sliced like array.
+        tile: side length of the tiles (default: 512)
+        dtype: type of the stored weights (default: float64, as arr2grid and
+            CSRGraph). float32 halves the size of the tiles, but rounds weights
+            which are not integers, so plans then differ from those of a CSRGraph.
+        Returns:
+        TiledRaster
+        """
+        m, n = np.shape(array)
+        os.makedirs(path, exist_ok=True)
+        scalar = np.ndim(weight) == 0
+        for r in range(0, m, tile):
+            for c in range(0, n, tile):
+                block = np.asarray(array[r:r+tile, c:c+tile])
+                w = weight if scalar else np.asarray(weight[r:r+tile, c:c+tile])
+                # blocked cells are stored as 0
+                data = np.where(block != 0, w, 0).astype(dtype)
+                np.save(os.path.join(path, 'tile_%d_%d.npy' % (r // tile, c // tile)), data)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'shape': [m, n], 'tile': tile, 'dtype': np.dtype(dtype).name}, f)
+        return cls(path, max_tiles)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_open'] = OrderedDict()
+        return state
+
+    def _tile(self, tr, tc):
+        """ the memory-mapped tile (tr, tc)"""
+        key = (tr, tc)
+        tile = self._open.get(key)
+        if tile is None:
+            tile = np.load(os.path.join(self.path, 'tile_%d_%d.npy' % key), mmap_mode='r')
+            self._open[key] = tile
+            if len(self._open) > self.max_tiles:
+                self._open.popitem(last=False)
+        else:
+            self._open.move_to_end(key)
+        return tile
+
+    def value(self, r, c):
+        """ weight of the cell (r, c), 0 for blocked cells and cells outside the raster"""
+        m, n = self.shape
+        if not (0 <= r < m and 0 <= c < n):
+            return 0
+        t = self.tile
+        return float(self._tile(r // t, c // t)[r % t, c % t])
+
+    def window(self, r, c):
+        """ the 3 x 3 weights around the cell (r, c) as nested lists"""
+        t = self.tile
+        i, j = r % t, c % t
+        tile = self._tile(r // t, c // t)
+        if 0 < i < tile.shape[0]-1 and 0 < j < tile.shape[1]-1:
+            return tile[i-1:i+2, j-1:j+2].tolist()
+        # the window crosses the border of the tile
+        return [[self.value(r+dr, c+dc) for dc in (-1, 0, 1)] for dr in (-1, 0, 1)]
+
+
+class TiledGraph(object):
+    """Grid graph generated on demand from a TiledRaster.
+    Nodes and edges are never materialized: node ids are the flat (row-major)
+    cell indices, and the edges of a node are computed from the tiles when its
+    neighbors are requested, with the weights of arr2grid (the average weight of
+    both cells, scaled by DIAG_FACTOR for diagonal steps). Planners keep
+    their own tables for the explored area only.
+    """
+
+    def __init__(self, raster, diagonal=False):
+        """
+        Params:
+        raster: a TiledRaster or the directory of one
+        diagonal: bool (default: False)
+            If this is 'True' the nodes are connected to their eight nearest neighbors.
+
+        Attributes: those of CSRGraph used by the planners (shape, directed,
+        path, token, version). cells is None, so planners which need the whole
+        grid in memory (JumpPointSearch, HPAStar) refuse the view.
+        """
+        if not isinstance(raster, TiledRaster):
+            raster = TiledRaster(raster)
+        self.raster = raster
+        self.diagonal = diagonal
+        self.shape = raster.shape
+        self.directed = False
+        self.cells = None
+        self.cellweight = None
+        self.path = None
+        self.token = next(_tokens)
+        self.version = 0
+        offsets = [(-1, 0, 1), (1, 0, 1), (0, -1, 1), (0, 1, 1)]
+        if diagonal:
+            offsets += [(-1, -1, DIAG_FACTOR), (-1, 1, DIAG_FACTOR),
+                        (1, -1, DIAG_FACTOR), (1, 1, DIAG_FACTOR)]
+        self._offsets = offsets
+
+    def digest(self):
+        """ identifies the view in this process only, see CSRGraph.digest"""
+        return 'tiled-%d-%d' % (self.token, self.version)
+
+    def __len__(self):
+        """ number of cells of the raster, the bound of the node ids"""
+        return self.shape[0]*self.shape[1]
+
+    def __contains__(self, node):
+        """membership tests using in, reads one tile."""
+        try:
+            r, c = node
+        except (TypeError, ValueError):
+            return False
+        return self.raster.value(r, c) != 0
+
+    def to_id(self, node):
+        """ map a node to its integer id. Raise KeyError if not found."""
+        if node not in self:
+            raise KeyError(node)
+        return node[0]*self.shape[1] + node[1]
+
+    def to_node(self, i):
+        return divmod(i, self.shape[1])
+
+    def neighbors(self, i):
+        """ iterate (neighbor id, edge weight) pairs of node i"""
+        n = self.shape[1]
+        r, c = divmod(i, n)
+        window = self.raster.window(r, c)
+        center = window[1][1]
+        if not center:
+            return []
+        res = []
+        for dr, dc, factor in self._offsets:
+            w = window[1+dr][1+dc]
+            if w:
+                w = (center+w)/2
+                res.append((i + dr*n + dc, factor*w if factor != 1 else w))
+        return res
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from routeplanner import ARAStar, CSRGraph, Dijkstra, RouteCache, arr2grid
+
+
+def randomGraph(seed, size=30):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.25).astype(int)
+    array[0, 0] = array[-1, -1] = 1
+    weight = np.round(rng.random((size, size))*4 + 1, 1)
+    return arr2grid(array, diagonal=True, weight=weight, create_using=CSRGraph)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_anytime_paths_improve_within_their_bounds(seed):
+    graph = randomGraph(seed)
+    source, target = (0, 0), (29, 29)
+    best = Dijkstra(alpha=2).plan(source, target, graph)[1]
+    routes = list(ARAStar(alpha=0.4).anytime(source, target, graph))
+    if best is None:
+        assert routes == [([], None, 1.0)]
+        return
+    weights = [weight for _, weight, _ in routes]
+    assert weights == sorted(weights, reverse=True)
+    for path, weight, bound in routes:
+        assert best - 1e-9 <= weight <= bound*best*(1 + 1e-9)
+    assert routes[-1][2] == 1.0
+    assert routes[-1][1] == pytest.approx(best, rel=1e-9)
+
+
+def test_budget_interrupts_with_a_bound():
+    graph = randomGraph(5, size=60)
+    planner = ARAStar(alpha=0.5)
+    path, weight = planner.plan((0, 0), (59, 59), graph, budget=200)
+    best = Dijkstra(alpha=2).plan((0, 0), (59, 59), graph)[1]
+    if weight is None:
+        assert planner.bound == float('inf')
+    else:
+        assert planner.bound >= 1.0
+        assert weight <= planner.bound*best*(1 + 1e-9)
+
+
+def test_plan_validates_before_the_cache():
+    planner = ARAStar()
+    planner.cache = RouteCache()
+    with pytest.raises(ValueError):
+        planner.plan((0, 0), (1, 1))
+    graph = randomGraph(1)
+    targets = {(29, 29), (0, 29)}
+    route = planner.plan((0, 0), targets, graph)
+    assert planner.bound == 1.0
+    assert planner.plan((0, 0), targets, graph) == route
+    assert planner.cache.hits == 1
+    with pytest.raises(ValueError):
+        planner.plan((0, 0), (100, 100), graph)
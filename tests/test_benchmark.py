@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from routeplanner.benchmark.__main__ import main
+from routeplanner.benchmark.maps import FAMILIES
+from routeplanner.benchmark.queries import query_sets, random_queries
+from routeplanner.benchmark.runner import compare, load_results, run, save_results
+
+
+@pytest.mark.parametrize('family', list(FAMILIES))
+def test_maps_are_reproducible(family):
+    array, weight = FAMILIES[family](32, seed=3)
+    again, again_weight = FAMILIES[family](32, seed=3)
+    assert array.shape == (32, 32)
+    np.testing.assert_array_equal(array, again)
+    np.testing.assert_array_equal(weight, again_weight)
+    assert array.any()
+
+
+def test_queries_are_reproducible_and_apart():
+    array, _ = FAMILIES['random20'](32)
+    assert random_queries(array, 10, seed=1) == random_queries(array, 10, seed=1)
+    for source, target in query_sets(array, 10)['long']:
+        assert array[source] and array[target]
+        assert abs(source[0] - target[0]) + abs(source[1] - target[1]) >= 16
+
+
+def test_run_reports_every_planner_with_optimal_gaps(tmp_path):
+    results = run(['random10', 'maze'], sizes=(16,), queries=3, memory=False)
+    rows = results['results']
+    assert len(rows) == 2*2*7
+    for row in rows:
+        assert row['queries'] == 3
+        assert row['failures'] == 0
+        if row['planner'] in ('Dijkstra', 'AStar', 'BiDijkstra', 'BiAStar'):
+            assert row['gap_max'] == pytest.approx(0, abs=1e-9)
+    path = str(tmp_path / 'results.json')
+    save_results(results, path)
+    assert compare(load_results(path), results) == []
+
+
+def test_regressions_are_reported():
+    results = run(['random10'], sizes=(16,), planners=['Dijkstra'], queries=2, memory=False)
+    baseline = {'meta': results['meta'], 'results': [dict(row) for row in results['results']]}
+    for row in baseline['results']:
+        row['expansions_mean'] /= 2
+        row['failures'] = -1
+    regressions = compare(results, baseline)
+    assert len(regressions) == 2*len(results['results'])
+    assert any('expansions_mean' in line for line in regressions)
+
+
+def test_command_line(tmp_path, capsys):
+    output = str(tmp_path / 'results.json')
+    args = ['--families', 'rooms', '--sizes', '16', '--planners', 'AStar', '--queries', '2',
+            '--no-memory']
+    assert main(args + ['--output', output]) == 0
+    assert main(args + ['--baseline', output, '--time-tol', '1000']) == 0
+    assert 'AStar' in capsys.readouterr().out
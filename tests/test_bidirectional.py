@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import BiAStar, BiDijkstra, CSRGraph, Dijkstra, arr2grid
+
+
+def randomGraph(seed, size=25):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.25).astype(int)
+    weight = np.round(rng.random((size, size))*3 + 1, 1)
+    return arr2grid(array, diagonal=True, weight=weight, create_using=CSRGraph)
+
+
+@pytest.mark.parametrize('planner', [lambda: BiDijkstra(heuristic='null'),
+                                     lambda: BiDijkstra(heuristic='octile'),
+                                     lambda: BiAStar(heuristic='octile')])
+@pytest.mark.parametrize('seed', range(3))
+def test_costs_match_dijkstra(planner, seed):
+    graph = randomGraph(seed)
+    planner = planner()
+    random.seed(seed)
+    cells = list(graph)
+    for _ in range(30):
+        source, target = random.sample(cells, 2)
+        expected = Dijkstra(alpha=2).plan(source, target, graph)[1]
+        path, weight = planner.plan(source, target, graph)
+        if expected is None:
+            assert path == [] and weight is None
+            continue
+        assert weight == pytest.approx(expected, rel=1e-9)
+        assert path[0] == source and path[-1] == target
+        steps = [dict(graph.neighbors(graph.to_id(u)))[graph.to_id(v)]
+                 for u, v in zip(path[:-1], path[1:])]
+        assert sum(steps) == pytest.approx(weight, rel=1e-9)
+
+
+def test_first_meeting_is_not_taken():
+    # s-a-t costs 6 and the searches meet at a first, s-b-c-t costs 5.5
+    labels = ['s', 'a', 'b', 'c', 't']
+    graph = CSRGraph.from_edges(5, [0, 1, 0, 2, 3], [1, 4, 2, 3, 4], [3, 3, 2, 1.5, 2],
+                                labels=labels)
+    assert BiDijkstra(heuristic='null').plan('s', 't', graph) == (['s', 'b', 'c', 't'], 5.5)
+
+
+def test_several_targets():
+    graph = randomGraph(4)
+    random.seed(4)
+    cells = list(graph)
+    source = cells[0]
+    targets = random.sample(cells, 5)
+    path, weight = BiDijkstra(heuristic='null').plan(source, targets, graph)
+    costs = [Dijkstra(alpha=2).plan(source, t, graph)[1] for t in targets]
+    best = min(c for c in costs if c is not None)
+    assert weight == pytest.approx(best, rel=1e-9)
+    assert path[0] == source and path[-1] in targets
+
+
+def test_balanced_frontiers_expand_less_than_dijkstra():
+    graph = arr2grid(np.ones((60, 60), dtype=int), diagonal=True, create_using=CSRGraph)
+    forward, both = Dijkstra(alpha=2), BiDijkstra(heuristic='null')
+    forward.profile = both.profile = True
+    assert both.plan((0, 30), (59, 30), graph)[1] == pytest.approx(
+        forward.plan((0, 30), (59, 30), graph)[1])
+    assert both.stats.expanded < forward.stats.expanded
@@ -0,0 +1,76 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from routeplanner import CSRGraph, Dijkstra, RouteCache, arr2grid
+
+
+def route(length):
+    return (list(range(length)), float(length))
+
+
+def test_least_recently_used_routes_are_evicted():
+    cache = RouteCache(maxsize=2)
+    cache.put(('g', 0, 'a'), route(1))
+    cache.put(('g', 0, 'b'), route(1))
+    assert cache.get(('g', 0, 'a')) == route(1)
+    cache.put(('g', 0, 'c'), route(1))
+    assert ('g', 0, 'b') not in cache
+    assert ('g', 0, 'a') in cache and ('g', 0, 'c') in cache
+    assert cache.info() == {'hits': 1, 'misses': 0, 'evictions': 1, 'size': 2, 'nodes': 2}
+
+
+def test_path_nodes_are_bounded():
+    cache = RouteCache(maxsize=None, maxnodes=10)
+    for i in range(4):
+        cache.put(('g', 0, i), route(4))
+    assert len(cache) == 2 and cache.nodes == 8
+    assert cache.evictions == 2
+    # a route over the bound is not kept
+    cache.put(('g', 0, 'long'), route(11))
+    assert len(cache) == 0 and cache.nodes == 0
+    cache.put(('g', 0, 3), route(2))
+    cache.put(('g', 0, 3), route(5))
+    assert cache.nodes == 5
+
+
+def test_new_versions_drop_the_old_routes():
+    cache = RouteCache()
+    cache.put(('g', 0, 'a'), route(3))
+    cache.put(('h', 0, 'a'), route(3))
+    assert cache.get(('g', 1, 'a')) is None
+    assert ('g', 0, 'a') not in cache
+    assert ('h', 0, 'a') in cache
+    assert cache.nodes == 3
+    assert cache.misses == 1
+    cache.clear()
+    assert len(cache) == 0 and cache.nodes == 0 and cache.misses == 1
+
+
+def test_lookups_are_counted_once():
+    cache = RouteCache()
+    assert cache.get(('g', 0, 'a'), count=False) is None
+    assert cache.hits == cache.misses == 0
+    cache.record(False)
+    cache.record(True)
+    assert (cache.hits, cache.misses) == (1, 1)
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy.info() == cache.info()
+
+
+def test_planners_reuse_and_invalidate_routes():
+    graph = arr2grid(np.ones((6, 6), dtype=int), diagonal=True, create_using=CSRGraph)
+    planner = Dijkstra()
+    planner.cache = RouteCache()
+    first = planner.plan((0, 0), (5, 5), graph)
+    # the reversed pair is answered from the cache on undirected graphs
+    reverse = planner.plan((5, 5), (0, 0), graph)
+    assert reverse == (first[0][::-1], first[1])
+    assert (planner.cache.hits, planner.cache.misses) == (1, 1)
+
+    graph.set_weight(graph.to_id((1, 1)), graph.to_id((2, 2)), 100)
+    graph.set_weight(graph.to_id((0, 0)), graph.to_id((1, 1)), 100)
+    route = planner.plan((0, 0), (5, 5), graph)
+    assert planner.cache.misses == 2
+    assert route[1] == pytest.approx(Dijkstra().plan((0, 0), (5, 5), graph)[1])
@@ -0,0 +1,100 @@
+import os
+import random
+import shutil
+
+import numpy as np
+import pytest
+
+from routeplanner import CHPlanner, CSRGraph, Dijkstra, GridMap, arr2grid, load_grid, save_grid
+from routeplanner.utils.ch import ContractionHierarchy
+
+
+def cost(source, target, graph):
+    return Dijkstra(alpha=2).plan(source, target, graph)[1]
+
+
+def randomGraph(seed, size=15):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.2).astype(int)
+    weight = np.round(rng.random((size, size))*3 + 1, 1)
+    return arr2grid(array, diagonal=True, weight=weight, create_using=CSRGraph)
+
+
+def lowerWeights(graph, seed, count=30):
+    """ lower the weights of random edges, so that an old hierarchy overestimates"""
+    random.seed(seed)
+    for _ in range(count):
+        u = random.randrange(len(graph))
+        neighbors = list(graph.neighbors(u))
+        if neighbors:
+            graph.set_weight(u, neighbors[0][0], 0.1)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_queries_match_dijkstra(seed):
+    graph = randomGraph(seed)
+    planner = CHPlanner()
+    random.seed(seed)
+    cells = list(graph)
+    for _ in range(30):
+        source, target = random.sample(cells, 2)
+        path, weight = planner.plan(source, target, graph)
+        expected = cost(source, target, graph)
+        if expected is None:
+            assert path == [] and weight is None
+            continue
+        assert weight == pytest.approx(expected, rel=1e-9)
+        assert path[0] == source and path[-1] == target
+        steps = [dict(graph.neighbors(graph.to_id(u)))[graph.to_id(v)]
+                 for u, v in zip(path[:-1], path[1:])]
+        assert sum(steps) == pytest.approx(weight, rel=1e-9)
+
+
+def test_saved_hierarchy_is_loaded(tmp_path, monkeypatch):
+    graph = randomGraph(3)
+    save_grid(graph, str(tmp_path))
+    ContractionHierarchy.build(graph).save(str(tmp_path))
+    loaded = load_grid(str(tmp_path))
+
+    def build(*args, **kwargs):
+        raise AssertionError('the saved hierarchy was not used')
+    monkeypatch.setattr(ContractionHierarchy, 'build', build)
+    cells = list(loaded)
+    route = CHPlanner().plan(cells[0], cells[-1], loaded)
+    assert route[1] == pytest.approx(cost(cells[0], cells[-1], loaded), rel=1e-9)
+
+
+def test_ch_follows_mutations():
+    rng = np.random.default_rng(1)
+    array = (rng.random((10, 10)) > 0.2).astype(int)
+    graph = arr2grid(array, create_using=CSRGraph)
+    planner = CHPlanner()
+    random.seed(1)
+    source, target = random.sample(list(graph), 2)
+    planner.plan(source, target, graph)
+    lowerWeights(graph, 1)
+    assert planner.plan(source, target, graph)[1] == pytest.approx(cost(source, target, graph))
+
+
+def test_ch_follows_gridmap():
+    grid = GridMap(np.ones((6, 6), dtype=int))
+    planner = CHPlanner()
+    planner.plan((0, 0), (5, 5), grid)
+    grid.set_weights([(0, 1), (1, 0), (1, 1)], 9)
+    assert planner.plan((0, 0), (5, 5), grid)[1] == pytest.approx(cost((0, 0), (5, 5), grid))
+    grid.block([(5, 5)])
+    with pytest.raises(ValueError):
+        planner.plan((0, 0), (5, 5), grid)
+
+
+def test_ch_of_another_map_is_not_loaded(tmp_path):
+    array = np.ones((5, 5), dtype=int)
+    first, second = str(tmp_path / 'first'), str(tmp_path / 'second')
+    graph = arr2grid(array, create_using=CSRGraph)
+    save_grid(graph, first)
+    ContractionHierarchy.build(graph).save(first)
+    save_grid(arr2grid(array, weight=3, create_using=CSRGraph), second)
+    shutil.copy(os.path.join(first, 'ch.npz'), second)
+
+    loaded = load_grid(second)
+    assert CHPlanner().plan((0, 0), (4, 4), loaded)[1] == pytest.approx(cost((0, 0), (4, 4), loaded))
@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import CooperativeAStar, CSRGraph, arr2grid
+
+
+def positions(routes, agents):
+    """ the cell of every agent at every time step, agents without a path stay
+    at their source and agents which arrived stay at their target"""
+    paths = [path if path else [source] for (path, _), (source, _) in zip(routes, agents)]
+    horizon = max(len(path) for path in paths) + 1
+    return [[path[min(t, len(path)-1)] for path in paths] for t in range(horizon)]
+
+
+def checkCollisions(routes, agents):
+    steps = positions(routes, agents)
+    for t, cells in enumerate(steps):
+        assert len(set(cells)) == len(cells), 'vertex collision at %d' % t
+        if t == 0:
+            continue
+        before = steps[t-1]
+        for i in range(len(cells)):
+            for j in range(i+1, len(cells)):
+                swap = cells[i] == before[j] and cells[j] == before[i] and cells[i] != before[i]
+                assert not swap, 'agents %d and %d swap at %d' % (i, j, t)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_agents_do_not_collide(seed):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((12, 12)) > 0.25).astype(int)
+    graph = arr2grid(array, diagonal=bool(seed % 2), create_using=CSRGraph)
+    random.seed(seed)
+    cells = random.sample(list(graph), 30)
+    agents = list(zip(cells[:15], cells[15:]))
+    routes = CooperativeAStar().multi_agent_plan(agents, graph)
+    assert len(routes) == len(agents)
+    checkCollisions(routes, agents)
+
+
+def test_agents_cross_in_a_corridor_without_collision():
+    array = np.zeros((3, 7), dtype=int)
+    array[1] = 1
+    array[0, 3] = 1
+    graph = arr2grid(array, create_using=CSRGraph)
+    agents = [((1, 0), (1, 6)), ((1, 6), (1, 0))]
+    routes = CooperativeAStar().multi_agent_plan(agents, graph)
+    checkCollisions(routes, agents)
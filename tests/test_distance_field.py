@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from routeplanner import CSRGraph, arr2grid, distance_field, field_path
+from routeplanner.utils.landmarks import _oneToAll
+
+
+def randomMap(seed, size=25):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.25).astype(int)
+    array[0, 0] = array[-1, -1] = 1
+    weight = np.round(rng.random((size, size))*5 + 1, 1)
+    return array, weight
+
+
+def expectedField(graph, sources, shape):
+    dist = np.full(len(graph), np.inf)
+    for source in sources:
+        dist = np.minimum(dist, _oneToAll(graph, graph.to_id(source)))
+    field = np.full(shape, np.inf)
+    field.flat[graph.cells] = dist
+    return field
+
+
+@pytest.mark.parametrize('diagonal', [True, False])
+@pytest.mark.parametrize('weighted', [True, False])
+@pytest.mark.parametrize('seed', range(3))
+def test_distances_match_dijkstra(diagonal, weighted, seed):
+    array, weight = randomMap(seed)
+    weight = weight if weighted else 1
+    graph = arr2grid(array, diagonal=diagonal, weight=weight, create_using=CSRGraph)
+    sources = [(0, 0), (24, 24)]
+    dist, parent = distance_field(array, sources, diagonal=diagonal, weight=weight)
+    np.testing.assert_allclose(dist, expectedField(graph, sources, array.shape), rtol=1e-9)
+
+    for target in map(tuple, np.argwhere(array)):
+        path, cost = field_path(dist, parent, target)
+        if not np.isfinite(dist[target]):
+            assert path == [] and cost is None
+            continue
+        assert path[0] in sources and path[-1] == target
+        steps = [dict(graph.neighbors(graph.to_id(u)))[graph.to_id(v)]
+                 for u, v in zip(path[:-1], path[1:])]
+        assert sum(steps) == pytest.approx(cost, rel=1e-9)
+
+
+@pytest.mark.parametrize('delta', [0.5, 3, 100])
+def test_delta_does_not_change_the_distances(delta):
+    array, weight = randomMap(5)
+    dist = distance_field(array, (0, 0), diagonal=True, weight=weight)[0]
+    other = distance_field(array, (0, 0), diagonal=True, weight=weight, delta=delta)[0]
+    np.testing.assert_allclose(other, dist, rtol=1e-9)
+
+
+def test_blocked_and_outside_sources_are_rejected():
+    array = np.ones((4, 4), dtype=int)
+    array[1, 1] = 0
+    for source in [(1, 1), (4, 0), (0, -1)]:
+        with pytest.raises(ValueError):
+            distance_field(array, source)
+    dist, parent = distance_field(array, (0, 0))
+    assert dist[1, 1] == np.inf and parent[0, 0] == -1
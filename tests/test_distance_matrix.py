@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import AStar, CHPlanner, CSRGraph, Dijkstra, arr2grid
+
+
+def randomGraph(seed, size=20):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.25).astype(int)
+    weight = np.round(rng.random((size, size))*3 + 1, 1)
+    return arr2grid(array, diagonal=True, weight=weight, create_using=CSRGraph)
+
+
+@pytest.mark.parametrize('planner', [lambda: Dijkstra(alpha=2), lambda: AStar(heuristic='octile'),
+                                     CHPlanner])
+@pytest.mark.parametrize('seed', range(2))
+def test_matrix_matches_pairwise_plans(planner, seed):
+    graph = randomGraph(seed)
+    random.seed(seed)
+    cells = list(graph)
+    sources = random.sample(cells, 4) + [cells[0]]
+    targets = random.sample(cells, 6) + [cells[0]]
+    matrix, route = planner().distance_matrix(sources, targets, graph, paths=True)
+    assert matrix.shape == (5, 7)
+    for i, source in enumerate(sources):
+        for j, target in enumerate(targets):
+            expected = Dijkstra(alpha=2).plan(source, target, graph)[1]
+            path, weight = route(i, j)
+            if expected is None:
+                assert matrix[i, j] == np.inf
+                assert path == [] and weight is None
+                continue
+            assert matrix[i, j] == pytest.approx(expected, rel=1e-9)
+            assert weight == pytest.approx(expected, rel=1e-9)
+            assert path[0] == source and path[-1] == target
+            steps = [dict(graph.neighbors(graph.to_id(u)))[graph.to_id(v)]
+                     for u, v in zip(path[:-1], path[1:])]
+            assert sum(steps) == pytest.approx(weight, rel=1e-9)
+
+
+def test_matrix_without_paths():
+    graph = arr2grid(np.ones((5, 5), dtype=int), create_using=CSRGraph)
+    matrix = Dijkstra().distance_matrix([(0, 0), (4, 4)], [(0, 0), (0, 4)], graph)
+    np.testing.assert_allclose(matrix, [[0, 4], [8, 4]])
+
+
+def test_invalid_nodes_are_rejected():
+    graph = arr2grid(np.ones((5, 5), dtype=int), create_using=CSRGraph)
+    with pytest.raises(ValueError, match='source'):
+        Dijkstra().distance_matrix([(9, 9)], [(0, 0)], graph)
+    with pytest.raises(ValueError, match='target'):
+        CHPlanner().distance_matrix([(0, 0)], [(0, 9)], graph)
+    with pytest.raises(ValueError):
+        Dijkstra().distance_matrix([(0, 0)], [(0, 0)])
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import CSRGraph, Dijkstra, DStarLite, arr2grid
+from routeplanner.planner.dstarlite import BLOCKED
+
+
+def checkRoute(route, source, target, array, weight, diagonal):
+    """ the route is a path on the current cells whose weight is the one of a
+    from-scratch search"""
+    graph = arr2grid(array, diagonal=diagonal, weight=weight, create_using=CSRGraph)
+    expected = Dijkstra(alpha=2).plan(source, target, graph)[1]
+    path, cost = route
+    if expected is None:
+        assert path == [] and cost is None
+        return
+    assert cost == pytest.approx(expected, rel=1e-9)
+    assert path[0] == source and path[-1] == target
+    steps = [dict(graph.neighbors(graph.to_id(u)))[graph.to_id(v)]
+             for u, v in zip(path[:-1], path[1:])]
+    assert sum(steps) == pytest.approx(cost, rel=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_repairs_match_a_new_search(seed):
+    rng = np.random.default_rng(seed)
+    diagonal = bool(seed % 2)
+    array = (rng.random((15, 15)) > 0.2).astype(int)
+    array[0, 0] = array[-1, -1] = 1
+    weight = np.round(rng.random((15, 15))*3 + 1, 1)
+    source, target = (0, 0), (14, 14)
+    planner = DStarLite(diagonal=diagonal)
+    route = planner.plan(source, target,
+                         arr2grid(array, diagonal=diagonal, weight=weight, create_using=CSRGraph))
+    checkRoute(route, source, target, array, weight, diagonal)
+
+    random.seed(seed)
+    for step in range(8):
+        path = route[0]
+        if step % 3 == 2 and len(path) > 2:
+            # the robot advances along its path
+            source = path[1]
+            route = planner.move_start(source)
+        else:
+            # block cells on the current path, or free and reweight blocked ones
+            if path and step % 2 == 0:
+                cells = [c for c in path[1:-1] if c != source][:3]
+                changes = [(c, BLOCKED) for c in cells]
+            else:
+                blocked = list(zip(*np.nonzero(array == 0)))
+                cells = random.sample(blocked, min(4, len(blocked)))
+                changes = [(c, 2.0) for c in cells]
+            for cell, value in changes:
+                array[cell] = 0 if value is BLOCKED else 1
+                weight[cell] = 0 if value is BLOCKED else value
+            route = planner.update_cells(changes)
+        checkRoute(route, source, target, array, np.where(array == 0, 0, weight), diagonal)
+
+
+def test_networkx_graphs_are_adapted():
+    array = np.ones((6, 6), dtype=int)
+    array[2, 1:5] = 0
+    for diagonal in (True, False):
+        G = arr2grid(array, diagonal=diagonal, weight=2)
+        route = DStarLite(diagonal=not diagonal).plan((0, 0), (5, 5), G)
+        assert route[1] == pytest.approx(Dijkstra().plan((0, 0), (5, 5), G)[1])
+
+
+def test_networkx_graphs_without_cell_weights_are_rejected():
+    array = np.ones((4, 4), dtype=int)
+    G = arr2grid(array, diagonal=True, weight=np.arange(16).reshape(4, 4) + 1)
+    with pytest.raises(TypeError):
+        DStarLite().plan((0, 0), (3, 3), G)
+
+
+def test_cells_out_of_the_grid_are_rejected():
+    array = np.ones((5, 5), dtype=int)
+    planner = DStarLite()
+    planner.plan((0, 0), (4, 4), array)
+    with pytest.raises(ValueError):
+        planner.update_cells([((2, 2), BLOCKED), ((-1, 2), BLOCKED)])
+    # no cell was changed
+    checkRoute(planner.update_cells([]), (0, 0), (4, 4), array, array.astype(float), True)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from routeplanner import CSRGraph, Dijkstra, arr2grid, load_grid, save_grid
+from routeplanner.utils.misc import DIAG_FACTOR
+
+
+def edgeSet(graph):
+    """ {(u, v): weight} of a CSRGraph with grid nodes"""
+    edges = {}
+    for i in range(len(graph)):
+        for j, weight in graph.neighbors(i):
+            edges[(graph.to_node(i), graph.to_node(j))] = weight
+    return edges
+
+
+@pytest.mark.parametrize('diagonal', [True, False])
+def test_csr_and_networkx_grids_agree(diagonal):
+    nx = pytest.importorskip('networkx')
+    rng = np.random.default_rng(0)
+    array = (rng.random((9, 11)) > 0.3).astype(int)
+    weight = np.round(rng.random((9, 11))*3 + 1, 1)
+    G = arr2grid(array, diagonal=diagonal, weight=weight)
+    C = arr2grid(array, diagonal=diagonal, weight=weight, create_using=CSRGraph)
+    assert set(G.nodes) == set(C)
+    assert G.number_of_edges() == C.number_of_edges()
+    expected = {}
+    for u, v, w in G.edges(data='weight'):
+        expected[(u, v)] = expected[(v, u)] = w
+    assert edgeSet(C) == pytest.approx(expected)
+    directed = arr2grid(array, diagonal=diagonal, weight=weight, create_using=nx.DiGraph)
+    assert directed.number_of_edges() == 2*G.number_of_edges()
+
+
+def test_edge_weights_average_the_cells():
+    weight = np.array([[1, 3], [5, 7]])
+    graph = arr2grid(np.ones((2, 2), dtype=int), diagonal=True, weight=weight,
+                     create_using=CSRGraph)
+    edges = edgeSet(graph)
+    assert edges[((0, 0), (0, 1))] == pytest.approx(2)
+    assert edges[((0, 0), (1, 0))] == pytest.approx(3)
+    assert edges[((0, 0), (1, 1))] == pytest.approx(4*DIAG_FACTOR)
+    assert (0, 1) not in arr2grid([[1, 0]], create_using=CSRGraph)
+
+
+@pytest.mark.parametrize('mmap_mode', [None, 'r'])
+def test_save_and_load(tmp_path, mmap_mode):
+    rng = np.random.default_rng(1)
+    array = (rng.random((12, 12)) > 0.2).astype(int)
+    graph = arr2grid(array, diagonal=True, weight=rng.random((12, 12)) + 1, create_using=CSRGraph)
+    save_grid(graph, str(tmp_path))
+    loaded = load_grid(str(tmp_path), mmap_mode=mmap_mode)
+    assert edgeSet(loaded) == edgeSet(graph)
+    assert loaded.digest() == graph.digest()
+    assert loaded.diagonal == graph.diagonal
+    np.testing.assert_array_equal(loaded.cellweight, graph.cellweight)
+    assert loaded.path == (None if mmap_mode is None else str(tmp_path))
+    cells = list(graph)
+    assert Dijkstra().plan(cells[0], cells[-1], loaded) == Dijkstra().plan(cells[0], cells[-1], graph)
@@ -0,0 +1,110 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import (BreadthFirst, CSRGraph, Dijkstra, GridMap, HPAStar, JumpPointSearch,
+                          arr2grid, load_grid, save_grid)
+
+
+def cost(source, target, graph):
+    return Dijkstra(alpha=2).plan(source, target, graph)[1]
+
+
+@pytest.mark.parametrize('planner', [JumpPointSearch, lambda: HPAStar(size=5), BreadthFirst])
+@pytest.mark.parametrize('seed', range(5))
+def test_grid_planners_follow_blocks(planner, seed):
+    rng = np.random.default_rng(seed)
+    grid = GridMap((rng.random((20, 20)) > 0.2).astype(int), diagonal=True)
+    random.seed(seed)
+    source, target = random.sample(list(grid), 2)
+    planner = planner()
+    planner.plan(source, target, grid)
+    path = Dijkstra(alpha=2).plan(source, target, grid)[0]
+    grid.block(path[2:-2])
+
+    route = planner.plan(source, target, grid)
+    assert not any(grid.blocked[cell] for cell in route[0])
+    expected = cost(source, target, grid)
+    assert (route[1] is None) == (expected is None)
+    if isinstance(planner, JumpPointSearch) and expected is not None:
+        assert route[1] == pytest.approx(expected, rel=1e-9)
+
+
+def test_jps_follows_array_changed_in_place():
+    array = np.ones((8, 8), dtype=int)
+    planner = JumpPointSearch(diagonal=False)
+    planner.plan((0, 0), (0, 7), array)
+    array[0, 1:7] = 0
+    path, weight = planner.plan((0, 0), (0, 7), array)
+    assert all(array[cell] for cell in path)
+    assert weight == pytest.approx(9)
+
+
+def test_gridmap_save_keeps_blocks(tmp_path):
+    grid = GridMap(np.ones((4, 4), dtype=int))
+    grid.block([(1, 1)])
+    save_grid(grid, str(tmp_path))
+
+    loaded = load_grid(str(tmp_path), mmap_mode=None)
+    assert isinstance(loaded, GridMap)
+    assert (1, 1) not in loaded
+    assert loaded.digest() == grid.digest()
+    assert cost((0, 0), (2, 2), loaded) == pytest.approx(cost((0, 0), (2, 2), grid))
+    loaded.unblock([(1, 1)])
+    assert cost((0, 0), (2, 2), loaded) == pytest.approx(4)
+
+
+def test_gridmap_rejects_cells_out_of_the_grid():
+    grid = GridMap(np.ones((4, 4), dtype=int))
+    with pytest.raises(ValueError):
+        grid.block([(-1, 0)])
+    with pytest.raises(ValueError):
+        grid.set_weights([(0, 4)], 2)
+
+
+
+def edgeSet(graph):
+    """ {(u, v): weight} of the finite edges of a grid graph"""
+    edges = {}
+    for u in graph:
+        for j, weight in graph.neighbors(graph.to_id(u)):
+            if weight != float('inf'):
+                edges[(u, graph.to_node(j))] = weight
+    return edges
+
+
+@pytest.mark.parametrize('diagonal', [True, False])
+def test_updates_match_a_new_grid(diagonal):
+    rng = np.random.default_rng(3)
+    array = (rng.random((12, 12)) > 0.2).astype(int)
+    weight = np.round(rng.random((12, 12))*3 + 1, 1)
+    grid = GridMap(array, diagonal=diagonal, weight=weight)
+    for step in range(10):
+        cells = rng.integers(0, 12, (5, 2))
+        version = grid.version
+        if step % 3 == 0:
+            grid.block(cells)
+            array[cells[:, 0], cells[:, 1]] = 0
+        elif step % 3 == 1:
+            grid.unblock(cells)
+            array[cells[:, 0], cells[:, 1]] = 1
+        else:
+            values = np.round(rng.random(5)*3 + 1, 1)
+            grid.set_weights(cells, values)
+            weight[cells[:, 0], cells[:, 1]] = values
+        assert grid.version > version
+        expected = arr2grid(array, diagonal=diagonal, weight=weight, create_using=CSRGraph)
+        assert set(grid) == set(expected)
+        assert grid.number_of_edges() == expected.number_of_edges()
+        assert edgeSet(grid) == pytest.approx(edgeSet(expected))
+
+
+def test_gridmap_edges_follow_the_cells():
+    grid = GridMap(np.ones((3, 3), dtype=int))
+    with pytest.raises(ValueError):
+        grid.set_weight(0, 1, 5)
+    planner = Dijkstra()
+    assert planner.plan((0, 0), (0, 2), grid)[1] == pytest.approx(2)
+    grid.set_weights([(0, 1)], 5)
+    assert planner.plan((0, 0), (0, 2), grid)[1] == pytest.approx(4)
@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import CSRGraph, Dijkstra, GridMap, HPAStar, arr2grid, load_grid, save_grid
+from routeplanner.utils.abstraction import ClusterAbstraction
+
+
+def content(abstraction):
+    transitions = {key: sorted(edges) for key, edges in abstraction.transitions.items() if edges}
+    graph = {cell: sorted(edges) for cell, edges in abstraction.graph().items()}
+    return transitions, abstraction.intra, graph
+
+
+def randomGrid(seed, shape=(37, 45)):
+    rng = np.random.default_rng(seed)
+    array = (rng.random(shape) > 0.25).astype(int)
+    return GridMap(array, diagonal=bool(seed % 2), weight=np.round(rng.random(shape)*3 + 1, 1))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_paths_are_valid_and_near_optimal(seed):
+    grid = randomGrid(seed)
+    planner = HPAStar(size=8)
+    random.seed(seed)
+    cells = list(grid)
+    for _ in range(10):
+        source, target = random.sample(cells, 2)
+        path, weight = planner.plan(source, target, grid)
+        best = Dijkstra(alpha=2).plan(source, target, grid)[1]
+        if best is None:
+            assert weight is None
+            continue
+        assert path[0] == source and path[-1] == target
+        assert weight >= best - 1e-9
+        steps = [dict(grid.neighbors(grid.to_id(u)))[grid.to_id(v)]
+                 for u, v in zip(path[:-1], path[1:])]
+        assert weight == pytest.approx(sum(steps))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_update_matches_a_new_build(seed):
+    grid = randomGrid(seed)
+    abstraction = ClusterAbstraction(grid, 8)
+    abstraction.graph()
+    random.seed(seed)
+    cells = [(r, c) for r in range(grid.shape[0]) for c in range(grid.shape[1])]
+    for op in ('block', 'set_weights', 'unblock', 'block'):
+        changed = random.sample(cells, 5)
+        if op == 'set_weights':
+            grid.set_weights(changed, 2.5)
+        else:
+            getattr(grid, op)(changed)
+        abstraction.update(grid)
+        assert content(abstraction) == content(ClusterAbstraction(grid, 8))
+
+
+def test_save_round_trip(tmp_path, monkeypatch):
+    rng = np.random.default_rng(3)
+    array = (rng.random((40, 40)) > 0.2).astype(int)
+    array[0, 0] = array[-1, -1] = 1
+    save_grid(arr2grid(array, diagonal=True, create_using=CSRGraph), str(tmp_path))
+    planner = HPAStar(size=8)
+    route = planner.plan((0, 0), (39, 39), load_grid(str(tmp_path)))
+    planner.save()
+
+    def build(*args, **kwargs):
+        raise AssertionError('the saved abstraction is built again')
+    monkeypatch.setattr(ClusterAbstraction, 'build', build)
+    other = HPAStar(size=8)
+    assert other.plan((0, 0), (39, 39), load_grid(str(tmp_path))) == route
+    assert content(other.abstraction) == content(planner.abstraction)
+
+
+def test_save_needs_a_directory():
+    planner = HPAStar(size=8)
+    with pytest.raises(ValueError):
+        planner.save()
+    planner.plan((0, 0), (3, 3), arr2grid(np.ones((4, 4), dtype=int), create_using=CSRGraph))
+    with pytest.raises(ValueError):
+        planner.save()
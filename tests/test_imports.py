@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import routeplanner
+from routeplanner.benchmark.imports import HEAVY, MODULES, _probe, check
+
+
+def run(code):
+    """ run code in a new interpreter, return the words it prints"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(routeplanner.__file__)))
+    return subprocess.run([sys.executable, '-c', code], cwd=root, check=True,
+                          capture_output=True, text=True).stdout.split()
+
+
+def test_package_import_is_lazy():
+    loaded = run('import sys, routeplanner; print(" ".join(sorted(sys.modules)))')
+    assert not [name for name in loaded if name.startswith('routeplanner.planner')]
+    assert not set(HEAVY) & set(loaded)
+    loaded = run('import sys, routeplanner; routeplanner.Dijkstra; '
+                 'print(" ".join(sorted(sys.modules)))')
+    assert 'routeplanner.planner.dijkstra' in loaded
+    assert 'routeplanner.planner.jps' not in loaded
+    assert not set(HEAVY) & set(loaded)
+
+
+def test_exported_names():
+    for name in routeplanner.__all__:
+        assert getattr(routeplanner, name).__name__ == name
+    assert set(routeplanner.__all__) <= set(dir(routeplanner))
+    with pytest.raises(AttributeError):
+        routeplanner.NotAPlanner
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_modules_do_not_import_heavy_dependencies(module):
+    assert _probe(module)['heavy'] == []
+
+
+def test_check_reports_regressions():
+    results = [{'module': 'a', 'seconds': 0.1, 'overhead': 0.05, 'heavy': ['networkx']},
+               {'module': 'b', 'seconds': 0.1, 'overhead': 0.001, 'heavy': []}]
+    problems = check(results, 0.01)
+    assert len(problems) == 2
+    assert problems[0] == 'a imports networkx'
+    assert check(results[1:], 0.01) == []
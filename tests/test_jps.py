@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import CSRGraph, Dijkstra, JumpPointSearch, RouteCache, arr2grid
+
+
+def randomArray(seed, size=25):
+    rng = np.random.default_rng(seed)
+    return (rng.random((size, size)) > 0.3).astype(int)
+
+
+@pytest.mark.parametrize('diagonal', [True, False])
+@pytest.mark.parametrize('seed', range(3))
+def test_costs_match_dijkstra(diagonal, seed):
+    array = randomArray(seed)
+    graph = arr2grid(array, diagonal=diagonal, create_using=CSRGraph)
+    planner = JumpPointSearch(diagonal=diagonal)
+    random.seed(seed)
+    cells = list(graph)
+    for _ in range(30):
+        source, target = random.sample(cells, 2)
+        cost = Dijkstra(alpha=2).plan(source, target, graph)[1]
+        # the jump points may sum the steps of a path in another order
+        path, weight = planner.plan(source, target, array)
+        if cost is None:
+            assert weight is None
+            continue
+        assert weight == pytest.approx(cost, rel=1e-9)
+        assert path[0] == source and path[-1] == target
+        for u, v in zip(path[:-1], path[1:]):
+            assert graph.to_id(v) in dict(graph.neighbors(graph.to_id(u)))
+
+
+def test_networkx_graphs_with_uniform_weights():
+    nx = pytest.importorskip('networkx')
+    array = randomArray(4)
+    G = arr2grid(array, diagonal=True, weight=2)
+    source, target = random.Random(4).sample(list(G.nodes), 2)
+    try:
+        cost = nx.dijkstra_path_length(G, source, target)
+    except nx.NetworkXNoPath:
+        cost = None
+    assert JumpPointSearch().plan(source, target, G)[1] == pytest.approx(cost, rel=1e-9)
+
+
+def test_non_uniform_weights_are_rejected():
+    graph = arr2grid(np.ones((4, 4), dtype=int), weight=np.arange(16).reshape(4, 4) + 1,
+                     create_using=CSRGraph)
+    with pytest.raises(ValueError):
+        JumpPointSearch().plan((0, 0), (3, 3), graph)
+
+
+def test_numpy_coordinates():
+    array = np.ones((10, 10), dtype=int)
+    array[4, 1:9] = 0
+    cells = np.argwhere(array)
+    source, target = tuple(cells[0]), tuple(cells[-1])
+    graph = arr2grid(array, diagonal=True, create_using=CSRGraph)
+    cost = Dijkstra().plan(source, target, graph)[1]
+    for grid in (array, graph):
+        path, weight = JumpPointSearch().plan(source, target, grid)
+        assert weight == pytest.approx(cost, rel=1e-9)
+        assert path[0] == source and path[-1] == target
+    route = JumpPointSearch().plan(source, [target, tuple(cells[-5])], array)
+    assert route[0][-1] in (target, tuple(cells[-5]))
+
+
+def test_routes_are_cached():
+    array = randomArray(2)
+    planner = JumpPointSearch()
+    planner.cache = RouteCache()
+    source, target = random.Random(2).sample(list(map(tuple, np.argwhere(array))), 2)
+    route = planner.plan(source, target, array)
+    assert planner.plan(source, target, array) == route
+    assert planner.cache.hits == 1
@@ -0,0 +1,75 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import AStar, BiAStar, BiDijkstra, CSRGraph, Dijkstra, arr2grid
+from routeplanner.utils import kernel
+
+PLANNERS = {
+    'dijkstra': lambda: Dijkstra(alpha=2),
+    'astar': lambda: AStar(heuristic='octile'),
+    'manhattan': lambda: AStar(heuristic='manhattan'),
+    'bidijkstra': lambda: BiDijkstra(heuristic='null'),
+    'biastar': lambda: BiAStar(heuristic='euclidean'),
+}
+
+
+def randomGraph(seed, size=20):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.25).astype(int)
+    weight = np.round(rng.random((size, size))*3 + 1, 1)
+    return arr2grid(array, diagonal=True, weight=weight, create_using=CSRGraph)
+
+
+def compareEngines(name, graph, seed):
+    random.seed(seed)
+    cells = list(graph)
+    python, compiled = PLANNERS[name](), PLANNERS[name]()
+    compiled.engine = 'numba'
+    for _ in range(20):
+        source = random.choice(cells)
+        target = random.sample(cells, 3) if random.random() < 0.3 else random.choice(cells)
+        expected = python.plan(source, target, graph)
+        route = compiled.plan(source, target, graph)
+        # the kernels pop the nodes in the order of priorq
+        assert route == expected
+
+
+@pytest.mark.parametrize('name', list(PLANNERS))
+@pytest.mark.parametrize('seed', range(2))
+def test_kernels_match_the_python_searches(name, seed, monkeypatch):
+    # without Numba the kernels run as Python functions, which the planners use
+    # once they believe them compiled
+    monkeypatch.setattr(kernel, 'HAVE_NUMBA', True)
+    compareEngines(name, randomGraph(seed), seed)
+
+
+@pytest.mark.parametrize('name', list(PLANNERS))
+def test_compiled_kernels(name):
+    pytest.importorskip('numba')
+    compareEngines(name, randomGraph(5), 5)
+
+
+def test_searches_the_kernels_do_not_cover(monkeypatch):
+    monkeypatch.setattr(kernel, 'HAVE_NUMBA', True)
+    calls = []
+    search = kernel.search
+    monkeypatch.setattr(kernel, 'search', lambda *args: calls.append(1) or search(*args))
+    graph = randomGraph(1)
+    planner = Dijkstra(alpha=2)
+    planner.engine = 'numba'
+    cells = list(graph)
+    planner.plan(cells[0], cells[-1], graph)
+    assert calls == [1]
+    planner.profile = True
+    planner.plan(cells[0], cells[-2], graph)
+    assert calls == [1] and planner.stats.expanded > 0
+
+
+def test_coordinates_of_labelled_graphs():
+    graph = CSRGraph.from_edges(3, [0, 1], [1, 2], [1, 1], labels=[(0, 0), (0, 1), (1, 1)])
+    rows, cols = kernel.coordinates(graph)
+    np.testing.assert_array_equal(rows, [0, 0, 1])
+    np.testing.assert_array_equal(cols, [0, 1, 1])
+    assert kernel.coordinates(CSRGraph.from_edges(2, [0], [1], [1], labels=['a', 'b'])) is None
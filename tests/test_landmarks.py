@@ -0,0 +1,108 @@
+import os
+import pickle
+import random
+import shutil
+
+import numpy as np
+import pytest
+
+from routeplanner import AStar, CSRGraph, Dijkstra, Landmarks, arr2grid, load_grid, save_grid
+from routeplanner.utils.landmarks import _oneToAll
+
+
+def cost(source, target, graph):
+    return Dijkstra(alpha=2).plan(source, target, graph)[1]
+
+
+def randomGraph(seed, size=15):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.2).astype(int)
+    weight = np.round(rng.random((size, size))*3 + 1, 1)
+    return arr2grid(array, diagonal=True, weight=weight, create_using=CSRGraph)
+
+
+def lowerWeights(graph, seed, count=30):
+    """ lower the weights of random edges, so that old tables overestimate"""
+    random.seed(seed)
+    for _ in range(count):
+        u = random.randrange(len(graph))
+        neighbors = list(graph.neighbors(u))
+        if neighbors:
+            graph.set_weight(u, neighbors[0][0], 0.1)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_estimates_are_lower_bounds(seed):
+    graph = randomGraph(seed)
+    landmarks = Landmarks.build(graph, k=4, seed=seed)
+    random.seed(seed)
+    for u in random.sample(range(len(graph)), 5):
+        dist = _oneToAll(graph, u)
+        for v in range(len(graph)):
+            assert landmarks.estimate(u, v) <= dist[v] + 1e-9
+            if v in landmarks.nodes and np.isfinite(dist[v]):
+                # the estimate of a landmark is exact
+                assert landmarks.estimate(u, v) == pytest.approx(dist[v])
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_astar_with_landmarks_is_exact(seed):
+    graph = randomGraph(seed)
+    planner = AStar(heuristic='landmarks')
+    random.seed(seed)
+    cells = list(graph)
+    for _ in range(20):
+        source, target = random.sample(cells, 2)
+        weight = planner.plan(source, target, graph)[1]
+        expected = cost(source, target, graph)
+        assert (weight is None) == (expected is None)
+        if expected is not None:
+            assert weight == pytest.approx(expected)
+
+
+def test_tables_are_memory_mapped_from_the_map_directory(tmp_path, monkeypatch):
+    graph = randomGraph(3)
+    save_grid(graph, str(tmp_path))
+    built = Landmarks.build(graph, k=4, path=str(tmp_path))
+    assert isinstance(built.dist, np.memmap)
+    # pickles reopen the tables instead of copying them
+    copy = pickle.loads(pickle.dumps(built))
+    assert isinstance(copy.dist, np.memmap)
+    np.testing.assert_array_equal(copy.dist, built.dist)
+    assert copy.digest == graph.digest()
+
+    def build(*args, **kwargs):
+        raise AssertionError('the saved tables were not used')
+    monkeypatch.setattr(Landmarks, 'build', build)
+    loaded = load_grid(str(tmp_path))
+    planner = AStar(heuristic='landmarks')
+    cells = list(loaded)
+    assert planner.plan(cells[0], cells[-1], loaded)[1] == pytest.approx(cost(cells[0], cells[-1], loaded))
+    assert planner.landmarks.path == str(tmp_path)
+
+
+def test_landmarks_follow_mutations():
+    weight = np.arange(64).reshape(8, 8) + 1
+    graph = arr2grid(np.ones((8, 8), dtype=int), weight=weight, create_using=CSRGraph)
+    planner = AStar(heuristic='landmarks')
+    planner.plan((0, 0), (7, 7), graph)
+    built = planner.landmarks
+    lowerWeights(graph, 0)
+    assert planner.plan((0, 0), (7, 7), graph)[1] == pytest.approx(cost((0, 0), (7, 7), graph))
+    assert planner.landmarks is not built
+    assert planner.landmarks.digest == graph.digest()
+
+
+def test_landmarks_of_another_map_are_not_loaded(tmp_path):
+    array = np.ones((5, 5), dtype=int)
+    first, second = str(tmp_path / 'first'), str(tmp_path / 'second')
+    save_grid(arr2grid(array, weight=np.arange(25).reshape(5, 5) + 1, create_using=CSRGraph), first)
+    save_grid(arr2grid(array, create_using=CSRGraph), second)
+    Landmarks.build(load_grid(first), path=first)
+    for name in ('landmarks.npy', 'landmark_nodes.npy', 'landmarks.json'):
+        shutil.copy(os.path.join(first, name), second)
+
+    graph = load_grid(second)
+    planner = AStar(heuristic='landmarks')
+    assert planner.plan((0, 0), (4, 4), graph)[1] == pytest.approx(cost((0, 0), (4, 4), graph))
+    assert planner.landmarks.digest == graph.digest()
@@ -0,0 +1,67 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import AStar, CSRGraph, Dijkstra, RouteCache, arr2grid
+
+
+def randomGraph(seed, size=20):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.25).astype(int)
+    weight = np.round(rng.random((size, size))*3 + 1, 1)
+    return arr2grid(array, diagonal=True, weight=weight, create_using=CSRGraph)
+
+
+def randomPairs(graph, seed, count=40):
+    random.seed(seed)
+    cells = list(graph)
+    sources = random.sample(cells, 3)
+    return [(random.choice(sources), random.choice(cells)) for _ in range(count)]
+
+
+def checkRoutes(routes, pairs, graph):
+    assert len(routes) == len(pairs)
+    for (source, target), (path, weight) in zip(pairs, routes):
+        expected = Dijkstra(alpha=2).plan(source, target, graph)[1]
+        if expected is None:
+            assert path == [] and weight is None
+            continue
+        assert weight == pytest.approx(expected)
+        assert path[0] == source and path[-1] == target
+        steps = [dict(graph.neighbors(graph.to_id(u)))[graph.to_id(v)]
+                 for u, v in zip(path[:-1], path[1:])]
+        assert sum(steps) == pytest.approx(weight)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_shared_search_trees_match_single_plans(seed):
+    graph = randomGraph(seed)
+    pairs = randomPairs(graph, seed)
+    checkRoutes(Dijkstra(alpha=2).multi_plan(pairs, graph), pairs, graph)
+
+
+def test_heuristic_searches_plan_each_pair():
+    graph = randomGraph(3)
+    pairs = randomPairs(graph, 3, count=10)
+    checkRoutes(AStar(alpha=1).multi_plan(pairs, graph), pairs, graph)
+
+
+def test_cached_pairs_and_target_sets():
+    graph = randomGraph(4)
+    pairs = randomPairs(graph, 4, count=10)
+    planner = Dijkstra(alpha=2)
+    planner.cache = RouteCache()
+    routes = planner.multi_plan(pairs, graph)
+    assert planner.multi_plan(pairs, graph) == routes
+    assert planner.cache.hits >= len(pairs)
+    source, target = pairs[0]
+    targets = {target, pairs[1][1]}
+    route = planner.multi_plan([(source, targets)], graph)[0]
+    assert route == Dijkstra(alpha=2).plan(source, targets, graph)
+
+
+def test_invalid_pairs_are_rejected():
+    graph = randomGraph(5)
+    with pytest.raises(ValueError):
+        Dijkstra(alpha=2).multi_plan([((0, 0), (50, 50))], graph)
@@ -0,0 +1,83 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import (ARAStar, AStar, BiAStar, BiDijkstra, CHPlanner, CSRGraph, Dijkstra,
+                          DStarLite, HPAStar, JumpPointSearch, arr2grid)
+
+PLANNERS = {
+    'dijkstra': lambda: Dijkstra(alpha=2),
+    'astar': lambda: AStar(heuristic='octile'),
+    'bidijkstra': lambda: BiDijkstra(heuristic='null'),
+    'biastar': lambda: BiAStar(heuristic='octile'),
+    'arastar': lambda: ARAStar(heuristic='octile'),
+    'ch': CHPlanner,
+    'landmarks': lambda: AStar(heuristic='landmarks'),
+    'dstarlite': DStarLite,
+}
+
+
+def randomMap(seed, size=20):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.25).astype(int)
+    array[0, 0] = 1
+    weight = np.round(rng.random((size, size))*3 + 1, 1)
+    return array, weight
+
+
+def nearest(source, targets, graph):
+    costs = [Dijkstra(alpha=2).plan(source, t, graph)[1] for t in targets]
+    costs = [c for c in costs if c is not None]
+    return min(costs) if costs else None
+
+
+@pytest.mark.parametrize('name', list(PLANNERS))
+@pytest.mark.parametrize('seed', range(3))
+def test_nearest_target(name, seed):
+    array, weight = randomMap(seed)
+    graph = arr2grid(array, diagonal=True, weight=weight, create_using=CSRGraph)
+    random.seed(seed)
+    targets = random.sample(list(graph)[1:], 5)
+    cost = nearest((0, 0), targets, graph)
+    for target in (targets, set(targets)):
+        path, found = PLANNERS[name]().plan((0, 0), target, graph)
+        if cost is None:
+            assert path == [] and found is None
+            continue
+        assert found == pytest.approx(cost, rel=1e-9)
+        assert path[0] == (0, 0) and path[-1] in targets
+        steps = [dict(graph.neighbors(graph.to_id(u)))[graph.to_id(v)]
+                 for u, v in zip(path[:-1], path[1:])]
+        assert sum(steps) == pytest.approx(found, rel=1e-9)
+
+
+def test_nearest_target_on_uniform_grids():
+    array = randomMap(3)[0]
+    graph = arr2grid(array, diagonal=True, create_using=CSRGraph)
+    random.seed(3)
+    targets = random.sample(list(graph)[1:], 5)
+    path, found = JumpPointSearch().plan((0, 0), targets, array)
+    assert found == pytest.approx(nearest((0, 0), targets, graph), rel=1e-9)
+    assert path[-1] in targets
+
+
+def test_one_search_settles_the_nearest_target():
+    graph = arr2grid(np.ones((30, 30), dtype=int), diagonal=True, create_using=CSRGraph)
+    targets = [(29, 29), (5, 5), (0, 29)]
+    planner = Dijkstra(alpha=2)
+    planner.profile = True
+    assert planner.plan((0, 0), targets, graph)[0][-1] == (5, 5)
+    expanded = planner.stats.expanded
+    planner.plan((0, 0), (5, 5), graph)
+    assert expanded == planner.stats.expanded
+
+
+def test_invalid_target_sets():
+    graph = arr2grid(np.ones((5, 5), dtype=int), create_using=CSRGraph)
+    with pytest.raises(ValueError, match='No target'):
+        Dijkstra().plan((0, 0), [], graph)
+    with pytest.raises(ValueError, match='Target not in the graph'):
+        AStar().plan((0, 0), [(1, 1), (9, 9)], graph)
+    with pytest.raises(ValueError):
+        HPAStar(size=5).plan((0, 0), [(1, 1), (2, 2)], graph)
@@ -0,0 +1,64 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import CSRGraph, Dijkstra, GridMap, arr2grid, load_grid, save_grid
+from routeplanner.utils.parallel import _publishedPath
+
+
+def randomPairs(graph, seed, count=24):
+    random.seed(seed)
+    cells = list(graph)
+    sources = random.sample(cells, 4)
+    return [(random.choice(sources), random.choice(cells)) for _ in range(count)]
+
+
+def serial(pairs, graph):
+    return [Dijkstra(alpha=2).plan(source, target, graph) for source, target in pairs]
+
+
+def costs(routes):
+    return [weight for _, weight in routes]
+
+
+def test_workers_match_a_serial_run():
+    rng = np.random.default_rng(0)
+    array = (rng.random((20, 20)) > 0.2).astype(int)
+    graph = arr2grid(array, diagonal=True, weight=np.round(rng.random((20, 20))*3 + 1, 1),
+                     create_using=CSRGraph)
+    pairs = randomPairs(graph, 0)
+    routes = Dijkstra(alpha=2).multi_plan(pairs, graph, workers=2)
+    assert costs(routes) == pytest.approx(costs(serial(pairs, graph)))
+
+
+@pytest.mark.parametrize('mmap_mode', ['r', 'c'])
+def test_loaded_maps_changed_in_memory_are_published_again(tmp_path, mmap_mode):
+    grid = GridMap(np.ones((12, 12), dtype=int), diagonal=True)
+    save_grid(grid, str(tmp_path))
+    loaded = load_grid(str(tmp_path), mmap_mode=mmap_mode)
+    assert _publishedPath(loaded) == str(tmp_path)
+
+    pairs = randomPairs(loaded, 1)
+    if mmap_mode == 'c':
+        loaded.set_weights([(r, c) for r in range(12) for c in range(3, 9)], 5)
+        assert _publishedPath(loaded) is None
+    routes = Dijkstra(alpha=2).multi_plan(pairs, loaded, workers=2)
+    assert costs(routes) == pytest.approx(costs(serial(pairs, loaded)))
+
+
+def test_maps_saved_over_are_published_again(tmp_path):
+    array = np.ones((8, 8), dtype=int)
+    save_grid(arr2grid(array, create_using=CSRGraph), str(tmp_path))
+    loaded = load_grid(str(tmp_path))
+    save_grid(arr2grid(array, weight=3, create_using=CSRGraph), str(tmp_path))
+    assert _publishedPath(loaded) is None
+    pairs = randomPairs(loaded, 2, count=8)
+    routes = Dijkstra(alpha=2).multi_plan(pairs, loaded, workers=2)
+    assert costs(routes) == pytest.approx(costs(serial(pairs, loaded)))
+
+
+def test_worker_errors_are_reported():
+    graph = arr2grid(np.ones((5, 5), dtype=int), create_using=CSRGraph)
+    with pytest.raises(RuntimeError, match='planning failed'):
+        Dijkstra().multi_plan([((0, 0), (4, 4)), ((0, 0), (9, 9))], graph, workers=2)
@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import (AStar, ARAStar, BiAStar, BiDijkstra, CHPlanner, CSRGraph,
+                          Dijkstra, arr2grid)
+
+nx = pytest.importorskip('networkx')
+
+PLANNERS = {
+    'dijkstra': Dijkstra,
+    'astar': lambda: AStar(heuristic='octile'),
+    'bidijkstra': BiDijkstra,
+    'biastar': BiAStar,
+    'arastar': ARAStar,
+    'ch': CHPlanner,
+    'landmarks': lambda: AStar(heuristic='landmarks'),
+}
+
+
+def weightedGrid(seed, size=15):
+    """ a random grid with blocks and non-integer cell weights"""
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.25).astype(int)
+    weight = np.round(rng.random((size, size))*4 + 1, 2)
+    return array, weight
+
+
+def reference(G, source, target):
+    try:
+        return nx.dijkstra_path_length(G, source, target)
+    except nx.NetworkXNoPath:
+        return None
+
+
+def checkRoute(G, route, source, target, cost):
+    """ the route is a path of G from source to target whose weight is cost"""
+    path, weight = route
+    if cost is None:
+        assert path == [] and weight is None
+        return
+    assert weight == pytest.approx(cost, rel=1e-9)
+    assert path[0] == source and path[-1] == target
+    total = sum(G[u][v]['weight'] for u, v in zip(path[:-1], path[1:]))
+    assert total == pytest.approx(cost, rel=1e-9)
+
+
+@pytest.mark.parametrize('name', sorted(PLANNERS))
+@pytest.mark.parametrize('seed', range(4))
+def test_planners_match_networkx(name, seed):
+    array, weight = weightedGrid(seed)
+    diagonal = bool(seed % 2)
+    G = arr2grid(array, diagonal=diagonal, weight=weight)
+    C = arr2grid(array, diagonal=diagonal, weight=weight, create_using=CSRGraph)
+    planner = PLANNERS[name]()
+    random.seed(seed)
+    cells = list(G.nodes)
+    for _ in range(10):
+        source, target = random.sample(cells, 2)
+        cost = reference(G, source, target)
+        for graph in (G, C):
+            checkRoute(G, planner.plan(source, target, graph), source, target, cost)
+
+
+def test_networkx_graph_mutated_in_place():
+    array = np.ones((6, 6), dtype=int)
+    G = arr2grid(array, diagonal=False)
+    planner = Dijkstra()
+    assert planner.plan((0, 0), (0, 5), G)[1] == pytest.approx(5)
+    for v in range(1, 5):
+        G.remove_node((0, v))
+    assert planner.plan((0, 0), (0, 5), G)[1] == pytest.approx(reference(G, (0, 0), (0, 5)))
+
+
+def test_networkx_conversion_is_shared_and_refreshed():
+    array = np.ones((6, 6), dtype=int)
+    G = arr2grid(array, diagonal=False)
+    planner, other = Dijkstra(), AStar()
+    planner.plan((0, 0), (0, 5), G)
+    other.plan((0, 0), (0, 5), G)
+    # converted once for both planners
+    assert planner.graph is other.graph
+    converted = planner.graph
+    planner.plan((1, 1), (2, 2), G)
+    assert planner.graph is converted
+
+    G[(0, 0)][(0, 1)]['weight'] = 50
+    planner.refresh()
+    assert planner.plan((0, 0), (0, 5), G)[1] == pytest.approx(reference(G, (0, 0), (0, 5)))
+    # a refresh without change keeps the conversion
+    graph = planner.graph
+    planner.refresh(G)
+    assert planner.graph is graph
@@ -0,0 +1,106 @@
+import functools
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import AStar, BiDijkstra, CSRGraph, Dijkstra, arr2grid
+from routeplanner.utils.priorq import BucketQueue, IndexedHeap, priorq
+
+
+def randomOperations(seed, count=300):
+    """ adds, updates and removes of 50 nodes with integer priorities"""
+    random.seed(seed)
+    ops = []
+    for _ in range(count):
+        node = random.randrange(50)
+        if random.random() < 0.1:
+            ops.append(('remove', node))
+        else:
+            ops.append(('add', node, random.randrange(1000)))
+    return ops
+
+
+def drain(queue, ops):
+    present = set()
+    for op in ops:
+        if op[0] == 'add':
+            queue.add(op[1], op[2])
+            present.add(op[1])
+        elif op[1] in present:
+            queue.remove(op[1])
+            present.discard(op[1])
+    assert queue.cnt == len(present)
+    assert all(node in queue for node in present)
+    order = []
+    while queue.cnt > 0:
+        priority, node = queue.peek()
+        assert queue.pop() == node
+        order.append(node)
+    with pytest.raises(KeyError):
+        queue.pop()
+    return order
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_indexed_heap_pops_like_priorq(seed):
+    ops = randomOperations(seed)
+    assert drain(IndexedHeap(), ops) == drain(priorq(), ops)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_bucket_queue_pops_in_bucket_order(seed):
+    ops = randomOperations(seed)
+    priorities = {}
+    for op in ops:
+        if op[0] == 'add':
+            priorities[op[1]] = op[2]
+        else:
+            priorities.pop(op[1], None)
+    order = drain(BucketQueue(resolution=10), ops)
+    assert sorted(order) == sorted(priorities)
+    buckets = [priorities[node]//10 for node in order]
+    assert buckets == sorted(buckets)
+
+
+def test_bucket_queue_peek_is_a_lower_bound():
+    queue = BucketQueue(resolution=2)
+    queue.add('a', 5.5)
+    queue.add('b', 4.5)
+    queue.add('c', 9)
+    priority, node = queue.peek()
+    assert priority == 4.5 and node == 'a'
+    assert queue.pop() == 'a'
+    # lower priorities go to the bucket last popped
+    queue.add('d', 1)
+    assert queue.peek()[1] in ('b', 'd')
+    assert sorted([queue.pop(), queue.pop()]) == ['b', 'd']
+    assert queue.pop() == 'c'
+    with pytest.raises(KeyError):
+        queue.peek()
+
+
+# bucket queues are exact for the f values of Dijkstra's algorithm only
+@pytest.mark.parametrize('queue, planner', [
+    (IndexedHeap, lambda: Dijkstra(alpha=2)),
+    (IndexedHeap, lambda: AStar(heuristic='octile')),
+    (IndexedHeap, lambda: BiDijkstra(heuristic='null')),
+    (functools.partial(BucketQueue, resolution=1), lambda: Dijkstra(alpha=2)),
+    (functools.partial(BucketQueue, resolution=1), lambda: BiDijkstra(heuristic='null')),
+])
+def test_searches_stay_optimal(queue, planner):
+    rng = np.random.default_rng(0)
+    array = (rng.random((20, 20)) > 0.2).astype(int)
+    graph = arr2grid(array, diagonal=True, weight=rng.integers(1, 5, (20, 20)),
+                     create_using=CSRGraph)
+    planner = planner()
+    planner.queue = queue
+    random.seed(0)
+    cells = list(graph)
+    for _ in range(15):
+        source, target = random.sample(cells, 2)
+        expected = Dijkstra(alpha=2).plan(source, target, graph)[1]
+        weight = planner.plan(source, target, graph)[1]
+        assert (weight is None) == (expected is None)
+        if expected is not None:
+            assert weight == pytest.approx(expected, rel=1e-9)
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from routeplanner import ReservationTable
+
+
+def test_reservations_match_a_dictionary():
+    random.seed(0)
+    table = ReservationTable(50, capacity=16)
+    expected = {}
+    for _ in range(2000):
+        node, time, agent = random.randrange(50), random.randrange(100), random.randrange(20)
+        table.reserve(node, time, agent)
+        expected[(node, time)] = agent
+    # the slots were doubled several times
+    assert len(table) == len(expected)
+    assert 2*len(table) <= len(table._keys)
+    for node in range(50):
+        for time in range(101):
+            assert table.owner(node, time) == expected.get((node, time), -1)
+    assert table.horizon == max(time for _, time in expected)
+    assert table.last[7] == max(time for node, time in expected if node == 7)
+
+
+def test_parked_agents_occupy_their_goal():
+    table = ReservationTable(10)
+    table.reserve_path([1, 2, 2, 3], agent=4, start=5)
+    assert [table.owner(node, t) for node, t in [(1, 5), (2, 6), (2, 7), (3, 8)]] == [4]*4
+    assert table.owner(1, 6) == -1
+    # parked agents are not counted as reservations
+    assert len(table) == 4
+    assert table.owner(3, 7) == -1
+    assert table.owner(3, 1000) == 4 and table.parked(3) == 4
+    table.unpark(3)
+    assert table.owner(3, 1000) == -1 and table.parked(3) == -1
+    assert table.owner(3, 8) == 4
+
+
+@pytest.mark.parametrize('capacity', [1, 1024])
+def test_clear(capacity):
+    table = ReservationTable(5, capacity=capacity)
+    table.reserve_path([0, 1], agent=0)
+    table.clear()
+    assert len(table) == 0 and table.horizon == 0
+    assert table.owner(0, 0) == -1 and table.owner(1, 50) == -1
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from routeplanner import AsyncPlanner, CSRGraph, Dijkstra, PlanClient, PlanServer, arr2grid
+from routeplanner.utils.service import worker_pool
+
+
+def grid():
+    rng = np.random.default_rng(0)
+    array = (rng.random((15, 15)) > 0.2).astype(int)
+    array[0, 0] = 1
+    return arr2grid(array, diagonal=True, weight=np.round(rng.random((15, 15))*3 + 1, 1),
+                    create_using=CSRGraph)
+
+
+class SlowDijkstra(Dijkstra):
+    def _multiPlan(self, pairs):
+        time.sleep(0.2)
+        return super()._multiPlan(pairs)
+
+
+def test_requests_are_coalesced_and_batched():
+    graph = grid()
+    cells = list(graph)
+    targets = cells[-5:]
+
+    async def main():
+        async with AsyncPlanner(Dijkstra(alpha=2), graph, batch_window=0.01) as service:
+            requests = [service.plan((0, 0), cells[-1]) for _ in range(10)]
+            requests += [service.plan((0, 0), target) for target in targets[:-1]]
+            routes = await asyncio.gather(*requests)
+            return routes, service.info()
+
+    routes, info = asyncio.run(main())
+    expected = [Dijkstra(alpha=2).plan((0, 0), t, graph) for t in [cells[-1]]*10 + targets[:-1]]
+    assert [r[1] for r in routes] == pytest.approx([r[1] for r in expected])
+    assert info == {'requests': 14, 'coalesced': 9, 'batches': 1, 'timeouts': 0, 'inflight': 0}
+
+
+def test_invalid_requests_are_rejected():
+    async def main():
+        async with AsyncPlanner(Dijkstra(), grid()) as service:
+            with pytest.raises(ValueError, match='source'):
+                await service.plan((-1, 0), (1, 1))
+            with pytest.raises(ValueError, match='No target'):
+                await service.plan((0, 0), [])
+            return service.requests
+    assert asyncio.run(main()) == 2
+
+
+def test_timed_out_queries_keep_running():
+    graph = grid()
+    target = list(graph)[-1]
+
+    async def main():
+        async with AsyncPlanner(SlowDijkstra(alpha=2), graph, batch_window=0) as service:
+            with pytest.raises(asyncio.TimeoutError):
+                await service.plan((0, 0), target, timeout=0.01)
+            # answered by the query still in flight
+            route = await service.plan((0, 0), target)
+            return route, service.info()
+
+    route, info = asyncio.run(main())
+    assert route == Dijkstra(alpha=2).plan((0, 0), target, graph)
+    assert info['timeouts'] == 1 and info['coalesced'] == 1 and info['batches'] == 1
+
+
+def test_process_pools():
+    graph = grid()
+    cells = list(graph)
+    planner = Dijkstra(alpha=2)
+    planner._setGraph(graph)
+
+    async def main():
+        with worker_pool(planner, 2) as pool:
+            service = AsyncPlanner(planner, executor=pool, batch_window=0)
+            routes = await asyncio.gather(*[service.plan(cells[i], cells[-1]) for i in range(4)])
+            await service.close()
+            return routes
+
+    routes = asyncio.run(main())
+    assert routes == [Dijkstra(alpha=2).plan(cells[i], cells[-1], graph) for i in range(4)]
+
+
+def test_server_and_client():
+    graph = grid()
+    cells = list(graph)
+
+    async def main():
+        async with AsyncPlanner(Dijkstra(alpha=2), graph) as service:
+            async with PlanServer(service) as server:
+                async with await PlanClient.connect(port=server.port) as client:
+                    one, several = await asyncio.gather(
+                        client.plan((0, 0), cells[-1]), client.plan((0, 0), set(cells[-3:])))
+                    with pytest.raises(ValueError, match='Target not in the graph'):
+                        await client.plan((0, 0), (99, 99))
+                    return one, several
+
+    one, several = asyncio.run(main())
+    assert one == Dijkstra(alpha=2).plan((0, 0), cells[-1], graph)
+    assert several[1] == pytest.approx(Dijkstra(alpha=2).plan((0, 0), cells[-3:], graph)[1])
+    assert several[0][-1] in cells[-3:]
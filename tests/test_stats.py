@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from routeplanner import (AStar, CHPlanner, CSRGraph, Dijkstra, DStarLite, HPAStar,
+                          JumpPointSearch, arr2grid)
+from routeplanner.utils.priorq import IndexedHeap, priorq
+from routeplanner.utils.stats import ProfiledQueue, SearchStats, profiled
+
+
+def randomGraph(seed, size=20):
+    rng = np.random.default_rng(seed)
+    array = (rng.random((size, size)) > 0.2).astype(int)
+    array[0, 0] = array[-1, -1] = 1
+    weight = np.round(rng.random((size, size))*3 + 1, 1)
+    return arr2grid(array, diagonal=True, weight=weight, create_using=CSRGraph)
+
+
+def test_profiled_searches_count_their_work():
+    graph = randomGraph(0)
+    planner = AStar(heuristic='octile')
+    route = planner.plan((0, 0), (19, 19), graph)
+    assert planner.stats is None
+
+    planner.profile = True
+    assert planner.plan((0, 0), (19, 19), graph) == route
+    stats = planner.stats
+    assert stats.expanded > 0
+    assert stats.relax_calls >= stats.relaxed > 0
+    # every push but the source comes from a successful relaxation
+    assert stats.pushes == stats.relaxed + 1
+    assert stats.heuristic_calls > 0 and stats.heuristic_time > 0
+    assert 0 < stats.peak_open <= stats.pushes
+    assert set(stats.as_dict()) == set(SearchStats.__slots__)
+
+    planner.profile = False
+    planner.plan((0, 0), (19, 19), graph)
+    assert planner.stats is stats
+    assert '_relax' not in planner.__dict__
+
+
+def test_on_expand_sees_every_expansion():
+    graph = randomGraph(1)
+    expanded = []
+    planner = Dijkstra(alpha=2)
+    planner.on_expand = lambda node, priority: expanded.append((node, priority))
+    path, weight = planner.plan((0, 0), (19, 19), graph)
+    assert len(expanded) == planner.stats.expanded
+    assert expanded[0] == ((0, 0), 0)
+    assert expanded[-1][0] == (19, 19)
+    priorities = [priority for _, priority in expanded]
+    assert priorities == sorted(priorities)
+    assert all(node in graph for node, _ in expanded)
+
+
+@pytest.mark.parametrize('planner', [JumpPointSearch, lambda: HPAStar(size=5), CHPlanner,
+                                     DStarLite])
+def test_other_planners_are_profiled(planner):
+    array = np.ones((15, 15), dtype=int)
+    array[7, 1:14] = 0
+    planner = planner()
+    expanded = []
+    planner.on_expand = lambda node, priority: expanded.append(node)
+    graph = array if isinstance(planner, (JumpPointSearch, DStarLite)) else \
+        arr2grid(array, diagonal=True, create_using=CSRGraph)
+    planner.plan((0, 0), (14, 14), graph)
+    assert planner.stats.expanded == len(expanded) > 0
+
+
+@pytest.mark.parametrize('queue', [priorq, IndexedHeap])
+def test_profiled_queues_count_tombstones(queue):
+    stats = SearchStats()
+    expanded = set()
+    pops = []
+    q = ProfiledQueue(queue(), stats, expanded, lambda node, priority: pops.append(priority))
+    for node, priority in [('a', 3), ('b', 2), ('c', 5), ('a', 1), ('b', 4)]:
+        q.add(node, priority)
+    assert q.cnt == 3 and 'a' in q
+    assert q.peek() == (1, 'a')
+    assert [q.pop() for _ in range(3)] == ['a', 'b', 'c']
+    assert pops == [1, 4, 5]
+    assert stats.expanded == 3 and stats.pushes == 5 and stats.peak_open == 3
+    # priorq leaves a REMOVED entry behind every update, IndexedHeap none
+    assert stats.stale == (2 if queue is priorq else 0)
+    q.add('a', 0)
+    assert stats.reopened == 1
+
+
+def test_profiled_heuristics_are_timed():
+    stats = SearchStats()
+    h = profiled(lambda u, v: abs(u - v), stats)
+    assert h(3, 5) == 2 and h(1, 1) == 0
+    assert stats.heuristic_calls == 2
+    assert 'heuristic_calls=2' in repr(stats)
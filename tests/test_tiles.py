@@ -0,0 +1,74 @@
+import pickle
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import (AStar, CSRGraph, Dijkstra, JumpPointSearch, TiledGraph, TiledRaster,
+                          arr2grid)
+
+
+def randomMap(seed, shape=(23, 17)):
+    rng = np.random.default_rng(seed)
+    array = (rng.random(shape) > 0.2).astype(int)
+    weight = np.round(rng.random(shape)*3 + 1, 1)
+    return array, weight
+
+
+@pytest.mark.parametrize('diagonal', [True, False])
+def test_edges_match_csr_grids(tmp_path, diagonal):
+    array, weight = randomMap(0)
+    raster = TiledRaster.from_array(array, str(tmp_path), weight=weight, tile=5, max_tiles=4)
+    tiled = TiledGraph(raster, diagonal=diagonal)
+    graph = arr2grid(array, diagonal=diagonal, weight=weight, create_using=CSRGraph)
+    assert len(tiled) == array.size
+    for r in range(array.shape[0]):
+        for c in range(array.shape[1]):
+            assert ((r, c) in tiled) == ((r, c) in graph)
+            if (r, c) not in graph:
+                continue
+            expected = {graph.to_node(j): w for j, w in graph.neighbors(graph.to_id((r, c)))}
+            edges = {tiled.to_node(j): w for j, w in tiled.neighbors(tiled.to_id((r, c)))}
+            assert edges == pytest.approx(expected)
+    assert len(raster._open) <= 4
+    assert (-1, 0) not in tiled and (0, 99) not in tiled
+
+
+@pytest.mark.parametrize('planner', [lambda: Dijkstra(alpha=2), lambda: AStar(heuristic='octile')])
+def test_plans_match_csr_grids(tmp_path, planner):
+    array, weight = randomMap(1, shape=(30, 30))
+    tiled = TiledGraph(TiledRaster.from_array(array, str(tmp_path), weight=weight, tile=8),
+                       diagonal=True)
+    graph = arr2grid(array, diagonal=True, weight=weight, create_using=CSRGraph)
+    random.seed(1)
+    cells = list(graph)
+    planner = planner()
+    for _ in range(15):
+        source, target = random.sample(cells, 2)
+        expected = Dijkstra(alpha=2).plan(source, target, graph)[1]
+        path, cost = planner.plan(source, target, tiled)
+        assert (cost is None) == (expected is None)
+        if expected is not None:
+            assert cost == pytest.approx(expected)
+            assert path[0] == source and path[-1] == target
+
+
+def test_rasters_are_reopened_from_their_directory(tmp_path):
+    array, weight = randomMap(2)
+    raster = TiledRaster.from_array(array, str(tmp_path), weight=weight, tile=6,
+                                    dtype=np.float32)
+    assert raster.value(3, 4) == pytest.approx(weight[3, 4] if array[3, 4] else 0, rel=1e-6)
+    opened = TiledRaster(str(tmp_path))
+    assert (opened.shape, opened.tile, opened.dtype) == ((23, 17), 6, np.float32)
+    tiled = TiledGraph(opened, diagonal=True)
+    cell = tuple(np.argwhere(array)[0])
+    neighbors = tiled.neighbors(tiled.to_id(cell))
+    copy = pickle.loads(pickle.dumps(tiled))
+    assert len(copy.raster._open) == 0
+    assert copy.neighbors(copy.to_id(cell)) == neighbors
+
+
+def test_planners_needing_the_whole_grid_refuse_views(tmp_path):
+    tiled = TiledGraph(TiledRaster.from_array(np.ones((6, 6)), str(tmp_path), tile=4))
+    with pytest.raises((TypeError, ValueError)):
+        JumpPointSearch().plan((0, 0), (5, 5), tiled)
@@ -0,0 +1,62 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from routeplanner import AStar, BiDijkstra, CSRGraph, Dijkstra, TiledGraph, TiledRaster, arr2grid
+from routeplanner.utils.workspace import DictTable, SearchTable
+
+
+@pytest.mark.parametrize('table', [lambda: SearchTable(10), DictTable])
+def test_reset_forgets_the_last_search(table):
+    table = table()
+    table.set(3, 2.0, 5.0, None)
+    table.set(4, 3.0, 6.0, 3)
+    table.closed.add(3)
+    assert 4 in table and len(table) == 2 and sorted(table.reached()) == [3, 4]
+    assert (table.g(4), table.f(4), table.parent(4), table.parent(3)) == (3.0, 6.0, 3, None)
+    assert 3 in table.closed
+    table.reset()
+    assert 3 not in table and 4 not in table and len(table) == 0
+    assert table.g(4) == math.inf and table.f(4) == math.inf and table.parent(4) is None
+    assert 3 not in table.closed
+    table.set(4, 1.0, 1.0, None)
+    assert table.reached() == [4] and table.parent(4) is None
+    table.closed.add(4)
+    table.closed.discard(4)
+    assert 4 not in table.closed
+
+
+@pytest.mark.parametrize('planner', [lambda: Dijkstra(alpha=2), lambda: AStar(heuristic='octile'),
+                                     lambda: BiDijkstra(heuristic='null')])
+def test_reused_tables_give_the_results_of_new_planners(planner):
+    rng = np.random.default_rng(0)
+    array = (rng.random((20, 20)) > 0.25).astype(int)
+    graph = arr2grid(array, diagonal=True, weight=np.round(rng.random((20, 20))*3 + 1, 1),
+                     create_using=CSRGraph)
+    reused = planner()
+    random.seed(0)
+    cells = list(graph)
+    for _ in range(30):
+        source, target = random.sample(cells, 2)
+        assert reused.plan(source, target, graph) == planner().plan(source, target, graph)
+    # one allocation for all the queries
+    tables = reused._tables[2]
+    reused.plan(cells[0], cells[1], graph)
+    assert reused._tables[2] is tables
+    assert all(isinstance(table, SearchTable) and table.size == len(graph) for table in tables)
+    assert tables[0].generation > 30
+
+
+def test_tables_follow_the_graph(tmp_path):
+    planner = Dijkstra(alpha=2)
+    small = arr2grid(np.ones((4, 4), dtype=int), create_using=CSRGraph)
+    large = arr2grid(np.ones((8, 8), dtype=int), create_using=CSRGraph)
+    assert planner.plan((0, 0), (3, 3), small)[1] == pytest.approx(6)
+    assert planner.plan((0, 0), (7, 7), large)[1] == pytest.approx(14)
+    assert planner._tables[2][0].size == 64
+    # graph views get dictionaries
+    tiled = TiledGraph(TiledRaster.from_array(np.ones((8, 8)), str(tmp_path), tile=4))
+    assert planner.plan((0, 0), (7, 7), tiled)[1] == pytest.approx(14)
+    assert isinstance(planner._tables[2][0], DictTable)